@@ -0,0 +1,167 @@
+"""
+Qwen3-TTS Generation Artifacts
+Generated audio persisted under outputs/artifacts/ and served back by ID, so
+clients can fetch, seek, resume and cache large outputs instead of receiving
+them inline. Each artifact is the encoded file (<id>.<ext>) plus a small JSON
+sidecar with its media type and a strong ETag (the SHA-256 of the content).
+Artifacts never change once written; old ones are removed by age and when
+the store is over its disk limit.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches etag (weak comparison, as RFC 9110 asks for)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+class ArtifactStore:
+    """Files of generated audio keyed by random ID, oldest removed first past max_bytes or ttl_seconds."""
+
+    def __init__(self, root_dir: Path, max_bytes: int = 4 * 1024 ** 3, ttl_seconds: Optional[float] = None):
+        self.root_dir = Path(root_dir)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._index: Optional["OrderedDict[str, dict]"] = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted = 0
+
+    def _meta_path(self, artifact_id: str) -> Path:
+        return self.root_dir / f"{artifact_id}.json"
+
+    def _load_index(self) -> "OrderedDict[str, dict]":
+        """Artifacts on disk, oldest first (built on first use; caller holds the lock)."""
+        if self._index is None:
+            entries = []
+            if self.root_dir.exists():
+                for meta_path in self.root_dir.glob("*.json"):
+                    try:
+                        with open(meta_path, encoding="utf-8") as f:
+                            meta = json.load(f)
+                    except (OSError, ValueError) as e:
+                        logger.warning(f"Skipping unreadable artifact {meta_path.name}: {e}")
+                        continue
+                    if (self.root_dir / meta["file"]).exists():
+                        entries.append(meta)
+            entries.sort(key=lambda meta: meta["created"])
+            self._index = OrderedDict((meta["id"], meta) for meta in entries)
+            self._bytes = sum(meta["bytes"] for meta in entries)
+        return self._index
+
+    def create(self, content: bytes, extension: str, media_type: str, filename: str, **info) -> dict:
+        """Write content as a new artifact and return its metadata."""
+        artifact_id = uuid.uuid4().hex
+        meta = {
+            "id": artifact_id,
+            "file": f"{artifact_id}.{extension}",
+            "filename": f"{filename}.{extension}",
+            "media_type": media_type,
+            "bytes": len(content),
+            "etag": f'"{hashlib.sha256(content).hexdigest()}"',
+            "created": time.time(),
+            **info,
+        }
+        with self._lock:
+            self._load_index()  # before writing, so the index does not pick the new file up twice
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        for path, data in ((self.root_dir / meta["file"], content),
+                           (self._meta_path(artifact_id), json.dumps(meta).encode("utf-8"))):
+            tmp_path = path.with_name(path.name + ".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        with self._lock:
+            self._load_index()[artifact_id] = meta
+            self._bytes += meta["bytes"]
+            self.created += 1
+            self._prune()
+        return meta
+
+    def get(self, artifact_id: str) -> Optional[dict]:
+        """Metadata of an artifact plus its "path", or None if it does not exist or has expired."""
+        if not ARTIFACT_ID.fullmatch(artifact_id):
+            return None
+        with self._lock:
+            meta = self._load_index().get(artifact_id)
+            if meta is None or self._expired(meta, time.time()):
+                return None
+            return {**meta, "path": self.root_dir / meta["file"]}
+
+    def recent(self, limit: int = 50) -> List[dict]:
+        with self._lock:
+            return list(reversed(self._load_index().values()))[:limit]
+
+    def delete(self, artifact_id: str) -> bool:
+        if not ARTIFACT_ID.fullmatch(artifact_id):
+            return False
+        with self._lock:
+            meta = self._load_index().pop(artifact_id, None)
+            if meta is None:
+                return False
+            self._remove(meta)
+        return True
+
+    def _expired(self, meta: dict, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - meta["created"] > self.ttl_seconds
+
+    def _remove(self, meta: dict):
+        self._bytes -= meta["bytes"]
+        for path in (self.root_dir / meta["file"], self._meta_path(meta["id"])):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _prune(self):
+        """Drop expired artifacts, then the oldest until under max_bytes (caller holds the lock).
+
+        The newest artifact is always kept, so the one just created can be
+        fetched. A response already sending a removed file keeps its open file.
+        """
+        index = self._load_index()
+        now = time.time()
+        while len(index) > 1:
+            meta = next(iter(index.values()))
+            if not self._expired(meta, now) and self._bytes <= self.max_bytes:
+                break
+            index.popitem(last=False)
+            self._remove(meta)
+            self.evicted += 1
+
+    def prune(self):
+        with self._lock:
+            self._prune()
+
+    def stats(self) -> dict:
+        with self._lock:
+            index = self._load_index()
+            return {
+                "artifacts": len(index),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "created": self.created,
+                "evicted": self.evicted,
+            }
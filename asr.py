@@ -0,0 +1,246 @@
+"""
+Qwen3-TTS Reference Transcription
+Speech recognition for reference clips (to fill in ref_text). The Whisper
+model is loaded once and stays resident; transcripts are cached by the
+content hash of the uploaded audio; clips longer than Whisper's 30 s window
+are cut at pauses found by a frame-energy VAD and transcribed as one batch.
+
+The recognizer sits behind a small backend interface like the TTS engine:
+"mlx" runs mlx-whisper on Apple Silicon, "fake" returns deterministic text so
+the server can be tested anywhere.
+"""
+import hashlib
+import logging
+import importlib.util
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ASR_SAMPLE_RATE = 16000
+
+
+class TranscriptionBackend:
+    """Interface between the transcriber and a speech recognition runtime."""
+
+    name = "base"
+
+    def load(self, model_name: str):
+        """Load a model by name (e.g. a Hugging Face repo) and return it."""
+        raise NotImplementedError
+
+    def transcribe(self, model, audio: np.ndarray, language: Optional[str] = None) -> str:
+        """Text of 16 kHz mono float32 audio."""
+        raise NotImplementedError
+
+    def transcribe_batch(self, model, audios: List[np.ndarray], language: Optional[str] = None) -> List[str]:
+        """Text of several clips. Backends with batched decoding override this."""
+        return [self.transcribe(model, audio, language) for audio in audios]
+
+
+class MlxWhisperBackend(TranscriptionBackend):
+    """Runs Whisper through mlx-whisper, decoding clips of up to 30 s as one batch."""
+
+    name = "mlx"
+
+    def __init__(self):
+        if importlib.util.find_spec("mlx_whisper") is None:
+            raise ImportError("mlx_whisper is not installed")
+
+    def load(self, model_name: str):
+        import mlx.core as mx
+        from mlx_whisper.load_models import load_model
+        return load_model(model_name, dtype=mx.float16)
+
+    def transcribe(self, model, audio: np.ndarray, language: Optional[str] = None) -> str:
+        return self.transcribe_batch(model, [audio], language)[0]
+
+    def transcribe_batch(self, model, audios: List[np.ndarray], language: Optional[str] = None) -> List[str]:
+        import mlx.core as mx
+        from mlx_whisper.audio import N_FRAMES, log_mel_spectrogram, pad_or_trim
+        from mlx_whisper.decoding import DecodingOptions, decode
+
+        # Each clip fills one 30 s window, as in mlx_whisper.transcribe
+        mels = mx.stack([
+            pad_or_trim(log_mel_spectrogram(mx.array(audio), n_mels=model.dims.n_mels), N_FRAMES, axis=-2)
+            for audio in audios
+        ]).astype(mx.float16)
+        results = decode(model, mels, DecodingOptions(language=language, without_timestamps=True))
+        return [result.text.strip() for result in results]
+
+
+class FakeTranscriptionBackend(TranscriptionBackend):
+    """Deterministic stand-in that describes the audio instead of recognizing it."""
+
+    name = "fake"
+
+    def load(self, model_name: str):
+        return model_name
+
+    def transcribe(self, model, audio: np.ndarray, language: Optional[str] = None) -> str:
+        digest = hashlib.sha256(np.asarray(audio, dtype=np.float32).tobytes()).hexdigest()[:8]
+        return f"Speech {digest} of {len(audio) / ASR_SAMPLE_RATE:.2f} seconds."
+
+
+BACKENDS = {
+    "mlx": MlxWhisperBackend,
+    "fake": FakeTranscriptionBackend,
+}
+
+
+def get_backend(name: str = "mlx") -> TranscriptionBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown ASR backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+def whisper_repo(model: str) -> str:
+    """Hugging Face repo for a Whisper size ("tiny", "small", ...) or the repo name itself."""
+    return model if "/" in model else f"mlx-community/whisper-{model}"
+
+
+def split_on_silence(audio: np.ndarray, sr: int = ASR_SAMPLE_RATE, max_seconds: float = 30.0,
+                     frame_ms: int = 30, min_silence_ms: int = 300,
+                     threshold_db: float = -40.0) -> List[Tuple[int, int]]:
+    """Speech regions (start, end sample) found from frame energy, each at most max_seconds long.
+
+    Frames quieter than threshold_db below the loudest frame are silence;
+    pauses shorter than min_silence_ms do not split. Regions still too long
+    are cut at their quietest frame.
+    """
+    frame = max(1, int(sr * frame_ms / 1000))
+    n = len(audio) // frame
+    if n == 0:
+        return [(0, len(audio))] if len(audio) else []
+
+    rms = np.sqrt(np.mean(audio[:n * frame].reshape(n, frame) ** 2, axis=1)) + 1e-10
+    voiced = 20 * np.log10(rms / rms.max()) > threshold_db
+
+    gap = max(1, min_silence_ms // frame_ms)
+    regions = []
+    start, silent = None, 0
+    for i, is_voiced in enumerate(voiced):
+        if is_voiced:
+            if start is None:
+                start = i
+            silent = 0
+        elif start is not None:
+            silent += 1
+            if silent >= gap:
+                regions.append((start, i - silent + 1))
+                start, silent = None, 0
+    if start is not None:
+        regions.append((start, n - silent))
+
+    max_frames = max(1, int(max_seconds * 1000 / frame_ms))
+    segments = []
+    for start, end in regions:
+        while end - start > max_frames:
+            low = start + max_frames // 2
+            cut = low + int(np.argmin(rms[low:start + max_frames]))
+            segments.append((start, cut))
+            start = cut
+        segments.append((start, end))
+
+    # One frame of padding keeps word onsets and endings
+    return [(max(0, (s - 1) * frame), min(len(audio), (e + 1) * frame)) for s, e in segments]
+
+
+class Transcriber:
+    """Resident recognizer plus an LRU of transcripts keyed by audio content hash."""
+
+    def __init__(self, backend: TranscriptionBackend, model_name: str, cache_entries: int = 512,
+                 segment_seconds: float = 30.0):
+        self.backend = backend
+        self.model_name = model_name
+        self.cache_entries = cache_entries
+        self.segment_seconds = segment_seconds
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._cache: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.transcribed_seconds = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self):
+        """Load the model if it is not resident yet (call on the inference worker)."""
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    logger.info(f"Loading ASR model {self.model_name} ({self.backend.name})")
+                    self._model = self.backend.load(self.model_name)
+        return self._model
+
+    def key(self, data: bytes) -> str:
+        return f"{self.model_name}:{hashlib.sha256(data).hexdigest()}"
+
+    def cached(self, key: str) -> Optional[dict]:
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return result
+
+    def store(self, key: str, result: dict):
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def segments(self, audio: np.ndarray) -> List[Tuple[int, int]]:
+        """Whole clip if it fits Whisper's window, else VAD segments."""
+        if len(audio) <= self.segment_seconds * ASR_SAMPLE_RATE:
+            return [(0, len(audio))]
+        return split_on_silence(audio, ASR_SAMPLE_RATE, max_seconds=self.segment_seconds) or [(0, len(audio))]
+
+    def transcribe_batch(self, audios: List[np.ndarray], language: Optional[str] = None) -> List[dict]:
+        """Transcribe 16 kHz clips in one backend call over all of their segments (runs on the worker)."""
+        model = self.load()
+        spans = [self.segments(audio) for audio in audios]
+        pieces = [audio[start:end] for audio, clip in zip(audios, spans) for start, end in clip]
+        texts = iter(self.backend.transcribe_batch(model, pieces, language) if pieces else [])
+
+        results = []
+        for audio, clip in zip(audios, spans):
+            segments = [{"start": round(start / ASR_SAMPLE_RATE, 2), "end": round(end / ASR_SAMPLE_RATE, 2),
+                         "text": next(texts).strip()} for start, end in clip]
+            results.append({
+                "text": " ".join(s["text"] for s in segments if s["text"]),
+                "duration": round(len(audio) / ASR_SAMPLE_RATE, 2),
+                "segments": segments,
+            })
+            self.transcribed_seconds += len(audio) / ASR_SAMPLE_RATE
+        return results
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._cache)
+            self._cache.clear()
+            self.hits = self.misses = 0
+        return count
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "model": self.model_name,
+            "loaded": self.loaded,
+            "cache_entries": len(self._cache),
+            "max_cache_entries": self.cache_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate_percent": (self.hits / lookups * 100) if lookups else 0.0,
+            "transcribed_seconds": round(self.transcribed_seconds, 1),
+        }
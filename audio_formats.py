@@ -0,0 +1,230 @@
+"""
+Qwen3-TTS Output Formats
+Incremental audio encoders for responses: each encoder takes float32 audio
+piece by piece and returns the bytes that are ready to send, so a stream can
+be compressed as it is generated and a whole file needs no second pass.
+
+- wav: 16-bit PCM (streamed with an open-ended header)
+- opus: Ogg/Opus, the default for audio streams
+- mp3: MPEG layer III
+- flac: lossless
+- mulaw: raw 8 kHz G.711 mu-law (audio/basic) for telephony
+
+Opus, MP3 and FLAC are encoded by libsndfile through soundfile. Streamed
+files carry "unknown" in header fields that are only known at the end
+(FLAC's total sample count), which decoders accept.
+"""
+import io
+import struct
+from typing import Dict, Optional
+
+import numpy as np
+
+from engine import to_pcm16, pcm16_to_wav_bytes
+
+
+class _StreamSink:
+    """Write-only file object that hands out bytes as soon as they are written.
+
+    Encoders that seek back on close to patch their header (FLAC's total
+    sample count) rewrite bytes that were already sent; those rewrites are
+    dropped, which leaves the field at its valid "unknown" value. Only unsent
+    bytes are buffered, so memory stays flat on long streams.
+    """
+
+    def __init__(self):
+        self._pos = 0
+        self._length = 0
+        self._sent = 0
+        self._pending = bytearray()
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        end = self._pos + len(data)
+        if end > self._sent:
+            skip = max(0, self._sent - self._pos)
+            offset = self._pos + skip - self._sent
+            if offset > len(self._pending):
+                self._pending.extend(bytes(offset - len(self._pending)))
+            self._pending[offset:offset + len(data) - skip] = data[skip:]
+        self._pos = end
+        self._length = max(self._length, end)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        base = {0: 0, 1: self._pos, 2: self._length}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        return b""
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = bytes(self._pending)
+        self._sent += len(data)
+        self._pending.clear()
+        return data
+
+
+class AudioEncoder:
+    """Encodes mono float32 audio incrementally: write() and close() return bytes ready to send."""
+
+    name = "base"
+    media_type = "application/octet-stream"
+    extension = "bin"
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+
+    def write(self, audio: np.ndarray) -> bytes:
+        raise NotImplementedError
+
+    def close(self) -> bytes:
+        return b""
+
+
+class WavEncoder(AudioEncoder):
+    """16-bit PCM WAV. The header declares the maximum length, which players read as "until EOF"."""
+
+    name = "wav"
+    media_type = "audio/wav"
+    extension = "wav"
+
+    def __init__(self, sample_rate: int):
+        super().__init__(sample_rate)
+        self._header_sent = False
+
+    def write(self, audio: np.ndarray) -> bytes:
+        data = to_pcm16(audio).astype("<i2").tobytes()
+        if self._header_sent:
+            return data
+        self._header_sent = True
+        header = struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 0xFFFFFFFF, b"WAVE", b"fmt ", 16, 1, 1,
+                             self.sample_rate, self.sample_rate * 2, 2, 16, b"data", 0xFFFFFFFF)
+        return header + data
+
+
+class SoundFileEncoder(AudioEncoder):
+    """Container formats written by libsndfile into a streaming sink."""
+
+    format = ""
+    subtype = ""
+    options: dict = {}
+
+    def __init__(self, sample_rate: int):
+        super().__init__(sample_rate)
+        import soundfile as sf
+        self._sink = _StreamSink()
+        self._file = sf.SoundFile(self._sink, mode="w", samplerate=sample_rate, channels=1,
+                                  format=self.format, subtype=self.subtype, **self.options)
+
+    def write(self, audio: np.ndarray) -> bytes:
+        self._file.write(np.asarray(audio, dtype=np.float32))
+        return self._sink.take()
+
+    def close(self) -> bytes:
+        self._file.close()
+        return self._sink.take()
+
+
+class OpusEncoder(SoundFileEncoder):
+    name = "opus"
+    media_type = "audio/ogg; codecs=opus"
+    extension = "opus"
+    format = "OGG"
+    subtype = "OPUS"
+
+
+class Mp3Encoder(SoundFileEncoder):
+    name = "mp3"
+    media_type = "audio/mpeg"
+    extension = "mp3"
+    format = "MP3"
+    subtype = "MPEG_LAYER_III"
+    # Constant bitrate (about 56 kbps at 24 kHz): without the VBR header, which can only be
+    # written after the fact, players estimate a VBR stream's length wrongly
+    options = {"bitrate_mode": "CONSTANT", "compression_level": 0.7}
+
+
+class FlacEncoder(SoundFileEncoder):
+    name = "flac"
+    media_type = "audio/flac"
+    extension = "flac"
+    format = "FLAC"
+    subtype = "PCM_16"
+
+
+def mulaw_encode(pcm: np.ndarray) -> np.ndarray:
+    """G.711 mu-law bytes of int16 samples."""
+    x = pcm.astype(np.int32)
+    sign = (x < 0).astype(np.int32) << 7
+    magnitude = np.minimum(np.abs(x), 32635) + 0x84
+    exponent = np.clip(np.floor(np.log2(magnitude)).astype(np.int32) - 7, 0, 7)
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8)
+
+
+class MulawEncoder(AudioEncoder):
+    """Raw 8 kHz mu-law, resampled with a streaming soxr filter so chunk edges leave no artifacts."""
+
+    name = "mulaw"
+    media_type = "audio/basic"
+    extension = "ulaw"
+    target_rate = 8000
+
+    def __init__(self, sample_rate: int):
+        super().__init__(sample_rate)
+        import soxr
+        self._resampler = soxr.ResampleStream(sample_rate, self.target_rate, 1, dtype="float32", quality="HQ")
+
+    def _encode(self, audio: np.ndarray, last: bool) -> bytes:
+        resampled = self._resampler.resample_chunk(np.asarray(audio, dtype=np.float32), last=last)
+        return mulaw_encode(to_pcm16(resampled)).tobytes()
+
+    def write(self, audio: np.ndarray) -> bytes:
+        return self._encode(audio, last=False)
+
+    def close(self) -> bytes:
+        return self._encode(np.zeros(0, dtype=np.float32), last=True)
+
+
+ENCODERS: Dict[str, type] = {
+    "wav": WavEncoder,
+    "opus": OpusEncoder,
+    "mp3": Mp3Encoder,
+    "flac": FlacEncoder,
+    "mulaw": MulawEncoder,
+}
+
+
+def get_encoder(name: str, sample_rate: int) -> AudioEncoder:
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown audio format '{name}'. Choose from: {', '.join(ENCODERS)}")
+    return ENCODERS[name](sample_rate)
+
+
+def encoder_class(name: str) -> Optional[type]:
+    return ENCODERS.get(name)
+
+
+def encode_audio(audio: np.ndarray, sample_rate: int, name: str) -> bytes:
+    """A whole clip in one format, with complete headers (exact length, FLAC checksum)."""
+    if name == "wav":
+        return pcm16_to_wav_bytes(to_pcm16(audio), sample_rate)
+    encoder = encoder_class(name)
+    if encoder is None:
+        raise ValueError(f"Unknown audio format '{name}'. Choose from: {', '.join(ENCODERS)}")
+    if issubclass(encoder, SoundFileEncoder):
+        import soundfile as sf
+        buffer = io.BytesIO()
+        sf.write(buffer, np.asarray(audio, dtype=np.float32), sample_rate, format=encoder.format,
+                 subtype=encoder.subtype, **encoder.options)
+        return buffer.getvalue()
+    stream = encoder(sample_rate)
+    return stream.write(audio) + stream.close()
@@ -0,0 +1,175 @@
+"""
+Qwen3-TTS Reference Audio Ingest
+Decodes uploaded reference audio from memory and normalizes it to the
+models' 24 kHz mono float32, without temp files and without librosa.
+Decoders are tried from cheapest to most general: WAV (stdlib), soundfile
+(FLAC, OGG, MP3), miniaudio (MP3, FLAC, Vorbis), then ffmpeg over pipes for
+anything else (M4A/AAC, ...). Normalized audio is cached by content hash.
+"""
+import io
+import wave
+import hashlib
+import logging
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TARGET_SAMPLE_RATE = 24000
+
+
+class AudioDecodeError(ValueError):
+    """Raised when no decoder can read the audio."""
+
+
+def _decode_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    with wave.open(io.BytesIO(data), "rb") as wav_file:
+        channels = wav_file.getnchannels()
+        width = wav_file.getsampwidth()
+        sr = wav_file.getframerate()
+        frames = wav_file.readframes(wav_file.getnframes())
+
+    if width == 1:
+        audio = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        audio = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16))
+        audio = (np.where(ints >= 1 << 23, ints - (1 << 24), ints)).astype(np.float32) / float(1 << 23)
+    elif width == 4:
+        audio = np.frombuffer(frames, dtype="<i4").astype(np.float32) / float(1 << 31)
+    else:
+        raise AudioDecodeError(f"Unsupported WAV sample width: {width} bytes")
+    return audio.reshape(-1, channels), sr
+
+
+def _decode_soundfile(data: bytes) -> Tuple[np.ndarray, int]:
+    import soundfile as sf
+    audio, sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    return audio, sr
+
+
+def _decode_miniaudio(data: bytes) -> Tuple[np.ndarray, int]:
+    import miniaudio
+    decoded = miniaudio.decode(data, output_format=miniaudio.SampleFormat.FLOAT32)
+    audio = np.asarray(decoded.samples, dtype=np.float32).reshape(-1, decoded.nchannels)
+    return audio, decoded.sample_rate
+
+
+def _decode_ffmpeg(data: bytes) -> Tuple[np.ndarray, int]:
+    # ffmpeg also downmixes and resamples, so its output needs no further work
+    cmd = ["ffmpeg", "-v", "error", "-i", "pipe:0", "-f", "f32le", "-ac", "1",
+           "-ar", str(TARGET_SAMPLE_RATE), "pipe:1"]
+    result = subprocess.run(cmd, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    return np.frombuffer(result.stdout, dtype="<f4").reshape(-1, 1), TARGET_SAMPLE_RATE
+
+
+def decode_audio(data: bytes) -> Tuple[np.ndarray, int]:
+    """Decode audio bytes to float32 samples shaped (frames, channels) and the sample rate."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        decoders = [_decode_wav, _decode_soundfile, _decode_miniaudio, _decode_ffmpeg]
+    else:
+        decoders = [_decode_soundfile, _decode_miniaudio, _decode_ffmpeg]
+
+    errors = []
+    for decoder in decoders:
+        try:
+            audio, sr = decoder(data)
+        except (ImportError, FileNotFoundError) as e:
+            errors.append(f"{decoder.__name__[8:]}: unavailable ({e})")
+            continue
+        except Exception as e:
+            errors.append(f"{decoder.__name__[8:]}: {e}")
+            continue
+        if audio.size == 0:
+            errors.append(f"{decoder.__name__[8:]}: no samples")
+            continue
+        return audio, sr
+    raise AudioDecodeError("Could not decode reference audio (" + "; ".join(errors) + ")")
+
+
+def resample(audio: np.ndarray, sr: int, target_sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """Resample mono float32 audio with soxr (scipy's polyphase filter if soxr is missing)."""
+    if sr == target_sr:
+        return audio
+    try:
+        import soxr
+        return soxr.resample(audio, sr, target_sr, quality="HQ").astype(np.float32, copy=False)
+    except ImportError:
+        from math import gcd
+        from scipy.signal import resample_poly
+        g = gcd(sr, target_sr)
+        return resample_poly(audio, target_sr // g, sr // g).astype(np.float32)
+
+
+def normalize_audio(data: bytes, target_sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """Decode audio bytes to mono float32 at target_sr, the form the models take."""
+    audio, sr = decode_audio(data)
+    mono = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    return np.ascontiguousarray(resample(mono, sr, target_sr), dtype=np.float32)
+
+
+class ReferenceAudioCache:
+    """LRU of normalized reference audio keyed by the SHA-256 of the uploaded bytes."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 ** 2, target_sr: int = TARGET_SAMPLE_RATE):
+        self.max_bytes = max_bytes
+        self.target_sr = target_sr
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: str) -> Optional[np.ndarray]:
+        """Cached audio for a content hash, counted as a hit or a miss."""
+        with self._lock:
+            audio = self._entries.get(digest)
+            if audio is not None:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return audio
+
+    def ingest(self, data: bytes) -> Tuple[str, np.ndarray]:
+        """(content hash, normalized audio) for uploaded bytes, decoding only on a cache miss."""
+        digest = hashlib.sha256(data).hexdigest()
+        audio = self.get(digest)
+        if audio is not None:
+            return digest, audio
+
+        audio = normalize_audio(data, self.target_sr)
+        audio.setflags(write=False)  # shared between requests
+        if audio.nbytes <= self.max_bytes:
+            with self._lock:
+                if digest not in self._entries:
+                    self._entries[digest] = audio
+                    self._bytes += audio.nbytes
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= evicted.nbytes
+        return digest, audio
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate_percent": (self.hits / lookups * 100) if lookups else 0.0,
+            }
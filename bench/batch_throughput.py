@@ -0,0 +1,116 @@
+"""
+Dynamic batching benchmark: throughput against max batch size.
+
+Drives the InferenceScheduler with bursts of short custom-voice style
+requests on the fake backend (no MLX needed) and reports requests/sec,
+generated audio seconds per wall second, and per-request latency for each
+max batch size.
+
+    python bench/batch_throughput.py
+    python bench/batch_throughput.py --batch-sizes 1 4 16 --requests 128 --json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import FakeBackend, GenerationEngine  # noqa: E402
+from scheduler import InferenceScheduler  # noqa: E402
+
+SENTENCES = [
+    "Hello there, how are you today?",
+    "The weather is lovely this afternoon.",
+    "Please remember to bring your umbrella.",
+    "Our meeting starts in five minutes.",
+    "Thanks for calling, have a great day!",
+    "Turn left at the next intersection.",
+]
+SPEAKERS = ["Vivian", "Ryan"]
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def run(batch_size, requests, clients, max_wait_ms, real_time_factor, batch_item_cost):
+    engine = GenerationEngine(FakeBackend(real_time_factor=real_time_factor, batch_item_cost=batch_item_cost))
+    model = engine.load("fake")
+    scheduler = InferenceScheduler(max_queue=requests, max_batch_size=batch_size,
+                                   max_batch_wait=max_wait_ms / 1000)
+    scheduler.start()
+
+    def generate(texts, voice):
+        return engine.generate_batch(model, texts, voice=voice, instruct="Normal tone")
+
+    latencies = []
+    audio_seconds = []
+    lock = threading.Lock()
+
+    def client(offset):
+        for i in range(offset, requests, clients):
+            text = SENTENCES[i % len(SENTENCES)]
+            voice = SPEAKERS[i % len(SPEAKERS)]
+            start = time.perf_counter()
+            job = scheduler.submit(generate, text, batch_key=voice, voice=voice)
+            audio, sr = job.future.result()
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                audio_seconds.append(len(audio) / sr)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    stats = scheduler.stats()
+    scheduler.stop()
+
+    return {
+        "max_batch_size": batch_size,
+        "requests": requests,
+        "wall_seconds": round(wall, 3),
+        "requests_per_second": round(requests / wall, 2),
+        "audio_seconds_per_second": round(sum(audio_seconds) / wall, 2),
+        "latency_p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "latency_p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "mean_batch_size": stats["mean_batch_size"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput vs. max batch size on the fake backend")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--requests", type=int, default=64, help="Requests per run")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--max-wait-ms", type=float, default=20.0, help="Batch collection window")
+    parser.add_argument("--rtf", type=float, default=0.05,
+                        help="Fake real-time factor (generation seconds per audio second)")
+    parser.add_argument("--batch-item-cost", type=float, default=0.15,
+                        help="Fake cost of each extra batch item, relative to the longest item")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = [
+        run(size, args.requests, args.clients, args.max_wait_ms, args.rtf, args.batch_item_cost)
+        for size in args.batch_sizes
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'batch':>5} {'req/s':>8} {'audio s/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'mean batch':>10}")
+    for r in results:
+        print(f"{r['max_batch_size']:>5} {r['requests_per_second']:>8} {r['audio_seconds_per_second']:>10} "
+              f"{r['latency_p50_ms']:>8} {r['latency_p95_ms']:>8} {r['mean_batch_size']!s:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Endpoint benchmark suite: latency, time to first chunk, RTF and throughput.
+
+Drives the real FastAPI app in-process through its ASGI interface (no
+network, no uvicorn) for every generation endpoint, across text lengths and
+concurrency levels. The fake backend (default) produces deterministic audio
+and runs on any machine; --backend mlx uses the installed models.
+
+    python bench/suite.py
+    python bench/suite.py --concurrency 1 4 8 --requests 16 --out bench-$(git rev-parse --short HEAD).json
+    python bench/suite.py --backend mlx --endpoints custom_voice prompt_stream --lengths short
+
+Results are written as JSON so runs from two commits can be diffed.
+"""
+import os
+import io
+import sys
+import json
+import time
+import wave
+import base64
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+TEXTS = {
+    "short": "Hello there, how are you doing today?",
+    "medium": (
+        "The quarterly report is ready for review. Revenue grew steadily across every region, "
+        "and the new product line exceeded its targets. Please send any comments before Friday."
+    ),
+    "long": " ".join([
+        "Once upon a time, in a small village at the edge of a vast forest, there lived an old clockmaker.",
+        "Every morning he opened the shutters of his shop and wound each of the hundred clocks on the walls.",
+        "The villagers said that as long as his clocks kept ticking, nothing bad could happen to the village.",
+        "One winter night a storm swept down from the mountains, and one by one the clocks began to stop.",
+        "The clockmaker lit a lantern, gathered his tools, and set to work by the trembling light.",
+        "By dawn the storm had passed, and every clock in the shop was ticking once again, in perfect time.",
+        "The villagers never learned how close they had come to silence, but the clockmaker remembered.",
+        "He smiled, poured himself a cup of tea, and opened the shutters just as he always had.",
+    ]),
+}
+
+# Start of an audio chunk event in the SSE stream
+CHUNK_MARKER = b'"type": "chunk"'
+
+ENDPOINTS = ["custom_voice", "voice_design", "clone", "prompt", "clone_stream", "prompt_stream"]
+
+# Model each endpoint needs, to skip endpoints whose model is not installed
+ENDPOINT_MODELS = {
+    "custom_voice": "custom_voice",
+    "voice_design": "voice_design",
+    "clone": "base",
+    "prompt": "base",
+    "clone_stream": "base",
+    "prompt_stream": "base",
+}
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return round(peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def wav_seconds(data: bytes) -> float:
+    with wave.open(io.BytesIO(data), "rb") as wav_file:
+        return wav_file.getnframes() / wav_file.getframerate()
+
+
+def reference_wav_base64(seconds: float = 3.0, sample_rate: int = 24000) -> str:
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pcm = (0.3 * np.sin(2 * np.pi * 180 * t) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm.tobytes())
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+async def asgi_request(app, method: str, path: str, payload=None, first_marker: bytes = b""):
+    """One request straight into the ASGI app.
+
+    Returns (status, body bytes, seconds until the first body message
+    containing first_marker, total seconds), so streamed responses report
+    time to first audio chunk rather than to the start event.
+    """
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("bench", 0),
+        "server": ("bench", 80),
+    }
+    done = asyncio.Event()
+    request_sent = False
+    status = None
+    chunks = []
+    first = None
+    start = time.perf_counter()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, first
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            data = message.get("body", b"")
+            if data:
+                if first is None and first_marker in data:
+                    first = time.perf_counter() - start
+                chunks.append(data)
+            if not message.get("more_body", False):
+                done.set()
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        done.set()
+    return status, b"".join(chunks), first, time.perf_counter() - start
+
+
+def audio_seconds(endpoint: str, body: bytes) -> float:
+    """Seconds of audio in a response: a base64 WAV, or the chunk events of an SSE stream."""
+    if not endpoint.endswith("_stream"):
+        return wav_seconds(base64.b64decode(json.loads(body)["audio"]))
+    total = 0.0
+    for line in body.decode("utf-8").splitlines():
+        if not line.startswith("data: "):
+            continue
+        event = json.loads(line[6:])
+        if event.get("type") == "chunk":
+            total += wav_seconds(base64.b64decode(event["audio"]))
+        elif event.get("type") == "error":
+            raise RuntimeError(event.get("error") or event)
+    return total
+
+
+def endpoint_request(endpoint: str, text: str, ref_audio: str, prompt_id: str):
+    if endpoint == "custom_voice":
+        return "/api/v1/custom-voice/generate", {"text": text, "speaker": "Vivian"}
+    if endpoint == "voice_design":
+        return "/api/v1/voice-design/generate", {"text": text, "instruct": "A calm, warm narrator voice"}
+    if endpoint == "clone":
+        return "/api/v1/base/clone", {"text": text, "ref_audio_base64": ref_audio, "ref_text": "Reference."}
+    if endpoint == "prompt":
+        return "/api/v1/base/generate-with-prompt", {"text": text, "prompt_id": prompt_id}
+    if endpoint == "clone_stream":
+        return "/api/v1/base/clone/stream", {"text": text, "ref_audio_base64": ref_audio, "ref_text": "Reference."}
+    return "/api/v1/base/generate-with-prompt/stream", {"text": text, "prompt_id": prompt_id}
+
+
+async def run_scenario(app, endpoint, length, concurrency, requests, ref_audio, prompt_id):
+    path, payload = endpoint_request(endpoint, TEXTS[length], ref_audio, prompt_id)
+    latencies, first_chunks, rtfs, audio = [], [], [], []
+    errors = []
+    pending = iter(range(requests))
+
+    async def client():
+        for _ in pending:
+            try:
+                status, body, first, total = await asgi_request(app, "POST", path, payload, CHUNK_MARKER)
+                if status != 200:
+                    raise RuntimeError(f"HTTP {status}: {body[:200].decode('utf-8', 'replace')}")
+                seconds = audio_seconds(endpoint, body)
+            except Exception as e:
+                errors.append(str(e))
+                continue
+            latencies.append(total)
+            if endpoint.endswith("_stream") and first is not None:
+                first_chunks.append(first)
+            audio.append(seconds)
+            if seconds:
+                rtfs.append(total / seconds)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    def ms(values, p):
+        value = percentile(values, p)
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "endpoint": endpoint,
+        "length": length,
+        "chars": len(TEXTS[length]),
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "latency_p50_ms": ms(latencies, 0.50),
+        "latency_p95_ms": ms(latencies, 0.95),
+        "latency_p99_ms": ms(latencies, 0.99),
+        "ttfc_p50_ms": ms(first_chunks, 0.50),
+        "ttfc_p95_ms": ms(first_chunks, 0.95),
+        "ttfc_p99_ms": ms(first_chunks, 0.99),
+        "rtf_p50": round(percentile(rtfs, 0.50), 4) if rtfs else None,
+        "rtf_mean": round(sum(rtfs) / len(rtfs), 4) if rtfs else None,
+        "requests_per_second": round(len(latencies) / wall, 2) if wall else None,
+        "audio_seconds_per_second": round(sum(audio) / wall, 2) if wall else None,
+        "wall_seconds": round(wall, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_suite(server, args):
+    app = server.app
+    ref_audio = reference_wav_base64()
+    results = []
+    async with server.lifespan(app):
+        status, body, _, _ = await asgi_request(app, "POST", "/api/v1/base/create-prompt", {
+            "ref_audio_base64": ref_audio, "ref_text": "Reference.", "name": "bench",
+        })
+        prompt_id = json.loads(body)["prompt_id"] if status == 200 else None
+        try:
+            for endpoint in args.endpoints:
+                try:
+                    server.resolve_model_key(ENDPOINT_MODELS[endpoint])
+                except server.HTTPException as e:
+                    print(f"Skipping {endpoint}: {e.detail}", file=sys.stderr)
+                    continue
+                # One untimed request loads the model, so scenarios measure generation only
+                path, payload = endpoint_request(endpoint, TEXTS["short"], ref_audio, prompt_id)
+                await asgi_request(app, "POST", path, payload)
+
+                for length in args.lengths:
+                    for concurrency in args.concurrency:
+                        result = await run_scenario(app, endpoint, length, concurrency,
+                                                    max(args.requests, concurrency), ref_audio, prompt_id)
+                        ttfc = f" ttfc {result['ttfc_p50_ms']}ms" if result["ttfc_p50_ms"] is not None else ""
+                        print(f"{endpoint:>14} {length:>6} c={concurrency:<3} p50 {result['latency_p50_ms']}ms"
+                              f"{ttfc} rtf {result['rtf_p50']} "
+                              f"{result['requests_per_second']} req/s errors {result['errors']}", file=sys.stderr)
+                        results.append(result)
+        finally:
+            if prompt_id is not None:
+                await asgi_request(app, "DELETE", f"/api/v1/base/prompts/{prompt_id}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every generation endpoint in-process")
+    parser.add_argument("--backend", default="fake", choices=["fake", "mlx"])
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS, choices=ENDPOINTS)
+    parser.add_argument("--lengths", nargs="+", default=list(TEXTS), choices=list(TEXTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--requests", type=int, default=8, help="Requests per scenario (at least the concurrency)")
+    parser.add_argument("--fake-rtf", type=float, default=0.01,
+                        help="Fake backend real-time factor (generation seconds per audio second)")
+    parser.add_argument("--out", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    # Configure the server before importing it; repeated bench texts must not hit the result cache.
+    # Outputs, the job database and saved voices go to a scratch directory, so a run neither
+    # writes into the real outputs/ nor resumes queued bulk jobs
+    scratch = tempfile.TemporaryDirectory(prefix="qwen-tts-bench-")
+    os.environ["QWEN_TTS_BACKEND"] = args.backend
+    os.environ["QWEN_TTS_RESULT_CACHE"] = "0"
+    os.environ["QWEN_TTS_OUTPUTS_DIR"] = os.path.join(scratch.name, "outputs")
+    os.environ["QWEN_TTS_VOICES_DIR"] = os.path.join(scratch.name, "voices")
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+    import server
+
+    if args.backend == "fake":
+        server.engine.backend.real_time_factor = args.fake_rtf
+        # Empty folders stand in for the models; the fake backend never reads them
+        models_dir = os.path.join(scratch.name, "models")
+        for folder in server.MODEL_PATHS.values():
+            os.makedirs(os.path.join(models_dir, folder))
+        server.MODELS_DIR = server.Path(models_dir)
+
+    started = time.time()
+    with scratch:
+        results = asyncio.run(run_suite(server, args))
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "backend": args.backend,
+            "fake_rtf": args.fake_rtf if args.backend == "fake" else None,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "started_at": started,
+            "duration_seconds": round(time.time() - started, 1),
+            "max_batch_size": server.MAX_BATCH_SIZE,
+        },
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+        print(f"Wrote {len(results)} results to {args.out}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""
+Qwen3-TTS Generation Engine
+Runs the model in memory and hands back waveforms as numpy arrays, so no
+intermediate WAV files are written and audio is converted to int16 only once.
+"""
+import io
+import time
+import inspect
+import threading
+import importlib.util
+import wave
+import zlib
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 24000
+
+# Match the sampling defaults mlx_audio's generate_audio applies
+GENERATE_DEFAULTS = {
+    "temperature": 0.7,
+    "max_tokens": 1200,
+}
+
+
+class ModelBackend:
+    """Interface for the runtime that loads and runs TTS models."""
+
+    name = "base"
+    # Whether generate_batch runs one padded forward pass rather than a loop
+    supports_batching = False
+
+    def load(self, model_path: str):
+        """Load a model from a local path."""
+        raise NotImplementedError
+
+    def generate(self, model, text: str, **kwargs) -> Iterator[Tuple[np.ndarray, int]]:
+        """Yield (float32 waveform, sample_rate) segments for the text."""
+        raise NotImplementedError
+
+    def generate_stream(self, model, text: str, interval: float, **kwargs) -> Iterator[Tuple[np.ndarray, int]]:
+        """Yield consecutive waveform segments while the model is still generating.
+
+        Backends without incremental decoding fall back to a single segment.
+        """
+        return self.generate(model, text, **kwargs)
+
+    def generate_batch(self, model, texts: List[str], **kwargs) -> List[Tuple[np.ndarray, int]]:
+        """Generate several texts with shared settings, returning one waveform per text.
+
+        The default runs them one after another; backends with batched
+        inference override this.
+        """
+        results = []
+        for text in texts:
+            segments = list(self.generate(model, text, **kwargs))
+            if not segments:
+                raise Exception("Audio generation failed - model produced no audio")
+            results.append((np.concatenate([audio for audio, _ in segments]), segments[-1][1]))
+        return results
+
+    def extract_prompt_features(self, model, ref_audio, ref_text: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """Precompute reusable reference features for voice cloning.
+
+        The result always contains the decoded reference waveform under
+        "ref_audio" and can be passed back to generate() as voice_prompt.
+        """
+        raise NotImplementedError
+
+    def seed(self, value: int):
+        """Seed the backend's random number generator."""
+
+
+class MlxBackend(ModelBackend):
+    """Runs Qwen3-TTS models through mlx_audio on Apple Silicon."""
+
+    name = "mlx"
+
+    def __init__(self):
+        # mlx_audio takes seconds to import; check it is installed now and import it on first use
+        if importlib.util.find_spec("mlx_audio") is None:
+            raise ImportError("mlx_audio is not installed")
+        self._imported = False
+        self._import_lock = threading.Lock()
+
+    def _import_runtime(self):
+        with self._import_lock:
+            if self._imported:
+                return
+            import mlx.core as mx
+            from mlx_audio.tts.utils import load_model
+            from mlx_audio.tts.generate import load_audio
+
+            self._mx = mx
+            self._load_model = load_model
+            self._load_audio = load_audio
+            self._imported = True
+
+    def load(self, model_path: str):
+        self._import_runtime()
+        return self._load_model(str(model_path))
+
+    def _reference_audio(self, model, ref_audio):
+        if isinstance(ref_audio, str):
+            return self._load_audio(ref_audio, sample_rate=model.sample_rate)
+        if isinstance(ref_audio, np.ndarray):
+            return self._mx.array(ref_audio)
+        return ref_audio
+
+    def _accepted_params(self, model) -> set:
+        try:
+            return set(inspect.signature(model.generate).parameters)
+        except (TypeError, ValueError):
+            return set()
+
+    def extract_prompt_features(self, model, ref_audio, ref_text: Optional[str] = None) -> Dict[str, np.ndarray]:
+        audio = self._reference_audio(model, ref_audio)
+        features = {"ref_audio": np.asarray(audio, dtype=np.float32)}
+
+        # Models that expose their speaker encoder / speech tokenizer let us
+        # precompute the embedding and reference codes instead of redoing it per request
+        encode_speaker = getattr(model, "extract_speaker_embedding", None)
+        if callable(encode_speaker):
+            features["speaker_embedding"] = np.asarray(encode_speaker(audio), dtype=np.float32)
+        tokenizer = getattr(model, "speech_tokenizer", None)
+        if tokenizer is not None and callable(getattr(tokenizer, "encode", None)):
+            features["ref_codes"] = np.asarray(tokenizer.encode(audio[None]))
+        return features
+
+    def generate(self, model, text: str, **kwargs) -> Iterator[Tuple[np.ndarray, int]]:
+        voice_prompt = kwargs.pop("voice_prompt", None)
+        if voice_prompt is not None:
+            kwargs["ref_audio"] = voice_prompt["ref_audio"]
+            accepted = self._accepted_params(model)
+            for name in ("speaker_embedding", "ref_codes"):
+                if name in voice_prompt and name in accepted:
+                    kwargs[name] = self._mx.array(voice_prompt[name])
+
+        if kwargs.get("ref_audio") is not None:
+            kwargs["ref_audio"] = self._reference_audio(model, kwargs["ref_audio"])
+
+        params = dict(GENERATE_DEFAULTS)
+        params.update({k: v for k, v in kwargs.items() if v is not None})
+
+        for result in model.generate(text=text, verbose=False, **params):
+            audio = np.asarray(result.audio, dtype=np.float32).reshape(-1)
+            yield audio, getattr(result, "sample_rate", model.sample_rate)
+
+    def generate_batch(self, model, texts: List[str], **kwargs) -> List[Tuple[np.ndarray, int]]:
+        # mlx_audio's Qwen3-TTS generate() takes a single text; models that
+        # expose a padded batch_generate() get one forward pass for the batch
+        batch_generate = getattr(model, "batch_generate", None)
+        if not callable(batch_generate) or len(texts) == 1:
+            return super().generate_batch(model, texts, **kwargs)
+
+        params = dict(GENERATE_DEFAULTS)
+        params.update({k: v for k, v in kwargs.items() if v is not None})
+        results = batch_generate(texts=texts, verbose=False, **params)
+        return [
+            (np.asarray(result.audio, dtype=np.float32).reshape(-1), getattr(result, "sample_rate", model.sample_rate))
+            for result in results
+        ]
+
+    def generate_stream(self, model, text: str, interval: float, **kwargs) -> Iterator[Tuple[np.ndarray, int]]:
+        # The 12Hz codec is decoded every `interval` seconds of generated audio
+        return self.generate(model, text, stream=True, streaming_interval=interval, **kwargs)
+
+    def seed(self, value: int):
+        self._import_runtime()
+        self._mx.random.seed(value)
+
+
+class FakeModel:
+    """Stand-in model produced by FakeBackend."""
+
+    def __init__(self, model_path: str):
+        self.model_path = str(model_path)
+        self.sample_rate = SAMPLE_RATE
+
+
+class FakeBackend(ModelBackend):
+    """Deterministic backend that synthesizes tones instead of speech.
+
+    Audio length scales with the text and generation takes
+    ``real_time_factor`` times the audio duration, which makes it useful for
+    benchmarking the serving path on machines without MLX. A batch costs as
+    much as its longest item plus ``batch_item_cost`` of that for every
+    additional item, like a padded forward pass that is mostly
+    memory-bandwidth bound.
+    """
+
+    name = "fake"
+    supports_batching = True
+
+    def __init__(self, seconds_per_char: float = 0.06, real_time_factor: float = 0.0,
+                 load_seconds: float = 0.0, batch_item_cost: float = 0.15):
+        self.seconds_per_char = seconds_per_char
+        self.real_time_factor = real_time_factor
+        self.load_seconds = load_seconds
+        self.batch_item_cost = batch_item_cost
+        self._seed = 0
+
+    def load(self, model_path: str):
+        if self.load_seconds:
+            time.sleep(self.load_seconds)
+        return FakeModel(model_path)
+
+    def extract_prompt_features(self, model, ref_audio, ref_text: Optional[str] = None) -> Dict[str, np.ndarray]:
+        if isinstance(ref_audio, str):
+            with wave.open(ref_audio, 'rb') as wav_file:
+                frames = wav_file.readframes(wav_file.getnframes())
+            ref_audio = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32767.0
+        audio = np.asarray(ref_audio, dtype=np.float32)
+        embedding = np.array([audio.mean(), audio.std(), np.abs(audio).max(initial=0.0)], dtype=np.float32)
+        return {"ref_audio": audio, "speaker_embedding": embedding}
+
+    def _synthesize(self, text: str, **kwargs) -> np.ndarray:
+        voice_prompt = kwargs.get("voice_prompt")
+        if voice_prompt is not None:
+            kwargs["voice"] = f"prompt-{voice_prompt['speaker_embedding'].tobytes().hex()}"
+
+        duration = max(0.1, len(text) * self.seconds_per_char) / max(kwargs.get("speed") or 1.0, 0.1)
+        n = int(duration * SAMPLE_RATE)
+        key = f"{text}|{kwargs.get('voice')}|{kwargs.get('instruct')}|{self._seed}"
+        freq = 180.0 + (zlib.crc32(key.encode("utf-8")) % 200)
+        t = np.arange(n, dtype=np.float32) / SAMPLE_RATE
+        return (0.3 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+    def generate(self, model, text: str, **kwargs) -> Iterator[Tuple[np.ndarray, int]]:
+        audio = self._synthesize(text, **kwargs)
+        if self.real_time_factor:
+            time.sleep(len(audio) / SAMPLE_RATE * self.real_time_factor)
+        yield audio, SAMPLE_RATE
+
+    def generate_batch(self, model, texts: List[str], **kwargs) -> List[Tuple[np.ndarray, int]]:
+        audios = [self._synthesize(text, **kwargs) for text in texts]
+        if self.real_time_factor:
+            longest = max(len(audio) for audio in audios) / SAMPLE_RATE
+            time.sleep(longest * self.real_time_factor * (1 + self.batch_item_cost * (len(texts) - 1)))
+        return [(audio, SAMPLE_RATE) for audio in audios]
+
+    def generate_stream(self, model, text: str, interval: float, **kwargs) -> Iterator[Tuple[np.ndarray, int]]:
+        segment = max(1, int(interval * SAMPLE_RATE))
+        audio = self._synthesize(text, **kwargs)
+        for start in range(0, len(audio), segment):
+            piece = audio[start:start + segment]
+            if self.real_time_factor:
+                time.sleep(len(piece) / SAMPLE_RATE * self.real_time_factor)
+            yield piece, SAMPLE_RATE
+
+    def seed(self, value: int):
+        self._seed = value
+
+
+BACKENDS = {
+    "mlx": MlxBackend,
+    "fake": FakeBackend,
+}
+
+
+def get_backend(name: str = "mlx") -> ModelBackend:
+    """Instantiate a backend by name."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+class GenerationEngine:
+    """Produces waveforms from a model without touching the filesystem."""
+
+    def __init__(self, backend: ModelBackend):
+        self.backend = backend
+
+    def load(self, model_path: str):
+        return self.backend.load(model_path)
+
+    def seed(self, value: Optional[int]):
+        if value is not None:
+            self.backend.seed(value)
+
+    def extract_prompt_features(self, model, ref_audio, ref_text: Optional[str] = None) -> Dict[str, np.ndarray]:
+        return self.backend.extract_prompt_features(model, ref_audio, ref_text)
+
+    def generate(self, model, text: str, **kwargs) -> Tuple[np.ndarray, int]:
+        """Generate the full waveform for the text as float32 in [-1, 1]."""
+        segments: List[np.ndarray] = []
+        sample_rate = SAMPLE_RATE
+        for audio, sample_rate in self.backend.generate(model, text, **kwargs):
+            segments.append(audio)
+
+        if not segments:
+            raise Exception("Audio generation failed - model produced no audio")
+        if len(segments) == 1:
+            return segments[0], sample_rate
+        return np.concatenate(segments), sample_rate
+
+    def generate_batch(self, model, texts: List[str], **kwargs) -> List[Tuple[np.ndarray, int]]:
+        """Generate several texts with shared settings in one call; one waveform per text, in order."""
+        results = self.backend.generate_batch(model, texts, **kwargs)
+        if len(results) != len(texts):
+            raise Exception(f"Batch generation returned {len(results)} waveforms for {len(texts)} texts")
+        return results
+
+    def stream(self, model, text: str, interval: float = 0.25, **kwargs) -> Iterator[Tuple[np.ndarray, int]]:
+        """Yield short waveform segments as soon as the model decodes them.
+
+        Segments are consecutive and do not overlap, so they are passed on
+        unchanged; joined, they are the same audio as generate().
+        """
+        produced = False
+        for audio, sample_rate in self.backend.generate_stream(model, text, interval, **kwargs):
+            produced = True
+            if len(audio):
+                yield audio, sample_rate
+
+        if not produced:
+            raise Exception("Audio generation failed - model produced no audio")
+
+
+def to_pcm16(audio_data: np.ndarray) -> np.ndarray:
+    """Convert a float waveform to int16 PCM (no-op for int16 input)."""
+    if audio_data.dtype == np.int16:
+        return audio_data
+    return (np.clip(audio_data, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def pcm16_to_wav_bytes(pcm: np.ndarray, sample_rate: int) -> bytes:
+    """Wrap int16 PCM samples in a mono WAV container."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm.tobytes())
+    return buffer.getvalue()
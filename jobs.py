@@ -0,0 +1,498 @@
+"""
+Qwen3-TTS Bulk Jobs
+Asynchronous batch synthesis: a job is a list of rows (text plus voice
+settings) submitted as JSONL or CSV, persisted in SQLite and worked through
+in the background. Each row is written to outputs/<job_id>/<output>.wav and
+a manifest.json describes the finished job. Jobs survive a restart: rows
+that were in flight go back to pending and the job resumes.
+"""
+import io
+import os
+import re
+import csv
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from engine import pcm16_to_wav_bytes, to_pcm16
+from scheduler import SchedulerError, QueueFull
+
+logger = logging.getLogger(__name__)
+
+ROW_FIELDS = ["text", "mode", "voice", "prompt_id", "instruct", "output", "language", "speed", "seed", "model_size"]
+ROW_ALIASES = {"speaker": "voice", "output_name": "output", "name": "output"}
+MODES = ["custom_voice", "voice_design", "prompt"]
+JOB_FINAL = ("completed", "failed", "cancelled")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    total_rows INTEGER NOT NULL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS rows (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    group_key TEXT NOT NULL,
+    output_name TEXT NOT NULL,
+    params TEXT NOT NULL,
+    output_path TEXT,
+    error TEXT,
+    seconds REAL,
+    audio_seconds REAL,
+    finished_at REAL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS rows_claim ON rows (job_id, status, group_key, idx);
+"""
+
+
+def safe_output_name(name: str) -> str:
+    """File stem for a row output: path separators and unusual characters become underscores."""
+    stem = re.sub(r"[^A-Za-z0-9._-]+", "_", name.strip()).strip("._")
+    return stem[:120]
+
+
+def _clean_row(raw: dict, line: int) -> dict:
+    row = {}
+    for key, value in raw.items():
+        if key is None:
+            raise ValueError(f"Line {line}: more values than header columns")
+        key = ROW_ALIASES.get(key.strip().lower(), key.strip().lower())
+        if key not in ROW_FIELDS:
+            raise ValueError(f"Line {line}: unknown column '{key}'")
+        if isinstance(value, str):
+            value = value.strip()
+        if value not in (None, ""):
+            row[key] = value
+
+    if not row.get("text"):
+        raise ValueError(f"Line {line}: text is required")
+    try:
+        if "speed" in row:
+            row["speed"] = float(row["speed"])
+        if "seed" in row:
+            row["seed"] = int(row["seed"])
+    except (TypeError, ValueError):
+        raise ValueError(f"Line {line}: speed must be a number and seed an integer")
+
+    if "mode" not in row:
+        if "prompt_id" in row:
+            row["mode"] = "prompt"
+        elif "voice" not in row and "instruct" in row:
+            row["mode"] = "voice_design"
+        else:
+            row["mode"] = "custom_voice"
+    if row["mode"] not in MODES:
+        raise ValueError(f"Line {line}: invalid mode '{row['mode']}'. Choose from: {', '.join(MODES)}")
+    if row["mode"] == "prompt" and "prompt_id" not in row:
+        raise ValueError(f"Line {line}: prompt rows need a prompt_id")
+    if row["mode"] == "voice_design" and "instruct" not in row:
+        raise ValueError(f"Line {line}: voice_design rows need an instruct")
+    return row
+
+
+def parse_rows(body: str, fmt: str) -> List[dict]:
+    """Rows of a job submission, in "jsonl" (one object per line) or "csv" (with a header) format.
+
+    Rows without an output name are numbered; raises ValueError naming the
+    offending line.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(body))
+        if not reader.fieldnames:
+            raise ValueError("CSV needs a header row")
+        rows = [_clean_row(raw, reader.line_num) for raw in reader]
+    elif fmt == "jsonl":
+        rows = []
+        for line, text in enumerate(body.splitlines(), start=1):
+            if not text.strip():
+                continue
+            try:
+                raw = json.loads(text)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {line}: invalid JSON ({e.msg})")
+            if not isinstance(raw, dict):
+                raise ValueError(f"Line {line}: expected a JSON object")
+            rows.append(_clean_row(raw, line))
+    else:
+        raise ValueError(f"Unknown job format '{fmt}'. Choose from: jsonl, csv")
+
+    if not rows:
+        raise ValueError("No rows to synthesize")
+
+    seen = set()
+    for index, row in enumerate(rows):
+        name = safe_output_name(str(row.get("output", ""))) or f"{index:05d}"
+        if name in seen:
+            raise ValueError(f"Row {index}: duplicate output name '{name}'")
+        seen.add(name)
+        row["output"] = name
+    return rows
+
+
+class JobStore:
+    """SQLite store of jobs and their rows, shared by the API and the runner threads."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+            self._db.commit()
+
+    def _execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            self._db.commit()
+            return cursor
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def create(self, rows: List[dict], group_keys: List[str], name: Optional[str] = None) -> str:
+        job_id = f"job-{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, name, status, created_at, total_rows) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, name, time.time(), len(rows)),
+            )
+            self._db.executemany(
+                "INSERT INTO rows (job_id, idx, status, group_key, output_name, params) VALUES (?, ?, 'pending', ?, ?, ?)",
+                [(job_id, i, group_keys[i], row["output"], json.dumps(row)) for i, row in enumerate(rows)],
+            )
+            self._db.commit()
+        return job_id
+
+    def recover(self) -> int:
+        """Put work interrupted by a restart back in the queue. Returns the number of jobs resumed."""
+        with self._lock:
+            self._db.execute("UPDATE rows SET status = 'pending' WHERE status = 'running'")
+            cursor = self._db.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+            self._db.commit()
+            return cursor.rowcount
+
+    def queued_jobs(self) -> List[str]:
+        return [r["id"] for r in self._query("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at")]
+
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None):
+        now = time.time()
+        if status == "running":
+            # Only a queued job starts, so a cancel that raced the dispatcher sticks
+            self._execute("UPDATE jobs SET status = ?, started_at = COALESCE(started_at, ?), finished_at = NULL, "
+                          "error = NULL WHERE id = ? AND status = 'queued'", (status, now, job_id))
+        elif status in JOB_FINAL:
+            self._execute("UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+                          (status, now, error, job_id))
+        else:
+            self._execute("UPDATE jobs SET status = ?, error = ? WHERE id = ?", (status, error, job_id))
+
+    def claim_row(self, job_id: str) -> Optional[dict]:
+        """Mark the next pending row running and return it; rows are taken grouped by model."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT idx, output_name, params FROM rows WHERE job_id = ? AND status = 'pending' "
+                "ORDER BY group_key, idx LIMIT 1", (job_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE rows SET status = 'running' WHERE job_id = ? AND idx = ?", (job_id, row["idx"]))
+            self._db.commit()
+        return {"index": row["idx"], "output": row["output_name"], "params": json.loads(row["params"])}
+
+    def finish_row(self, job_id: str, index: int, status: str, output_path: Optional[str] = None,
+                   error: Optional[str] = None, seconds: Optional[float] = None,
+                   audio_seconds: Optional[float] = None):
+        self._execute(
+            "UPDATE rows SET status = ?, output_path = ?, error = ?, seconds = ?, audio_seconds = ?, "
+            "finished_at = ? WHERE job_id = ? AND idx = ?",
+            (status, output_path, error, seconds, audio_seconds, time.time(), job_id, index),
+        )
+
+    def release_row(self, job_id: str, index: int):
+        """Return a claimed row to pending (the job was paused or interrupted)."""
+        self._execute("UPDATE rows SET status = 'pending' WHERE job_id = ? AND idx = ? AND status = 'running'",
+                      (job_id, index))
+
+    def cancel_pending(self, job_id: str):
+        self._execute("UPDATE rows SET status = 'cancelled' WHERE job_id = ? AND status = 'pending'", (job_id,))
+
+    def reset_rows(self, job_id: str) -> int:
+        """Make failed and cancelled rows pending again. Returns how many were reset."""
+        cursor = self._execute(
+            "UPDATE rows SET status = 'pending', error = NULL WHERE job_id = ? AND status IN ('failed', 'cancelled')",
+            (job_id,),
+        )
+        return cursor.rowcount
+
+    def job(self, job_id: str) -> Optional[dict]:
+        rows = self._query("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        job = dict(rows[0])
+        counts = {r["status"]: r["n"] for r in self._query(
+            "SELECT status, COUNT(*) AS n FROM rows WHERE job_id = ? GROUP BY status", (job_id,))}
+        totals = self._query(
+            "SELECT COALESCE(SUM(audio_seconds), 0) AS audio, COALESCE(SUM(seconds), 0) AS busy "
+            "FROM rows WHERE job_id = ? AND status = 'done'", (job_id,))[0]
+        done = counts.get("done", 0)
+        elapsed = None
+        if job["started_at"]:
+            elapsed = (job["finished_at"] or time.time()) - job["started_at"]
+        job["rows"] = {status: counts.get(status, 0)
+                       for status in ("pending", "running", "done", "failed", "cancelled")}
+        job["audio_seconds"] = round(totals["audio"], 3)
+        job["elapsed_seconds"] = round(elapsed, 3) if elapsed is not None else None
+        job["rows_per_second"] = round(done / elapsed, 3) if elapsed else 0.0
+        job["real_time_factor"] = round(totals["busy"] / totals["audio"], 3) if totals["audio"] else None
+        return job
+
+    def jobs(self, limit: int = 50) -> List[dict]:
+        ids = [r["id"] for r in self._query("SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))]
+        return [self.job(job_id) for job_id in ids]
+
+    def rows(self, job_id: str, status: Optional[str] = None, offset: int = 0, limit: int = 100) -> List[dict]:
+        sql = ("SELECT idx, status, output_name, params, output_path, error, seconds, audio_seconds "
+               "FROM rows WHERE job_id = ?")
+        params: list = [job_id]
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        sql += " ORDER BY idx LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        return [
+            {
+                "index": r["idx"],
+                "status": r["status"],
+                "output": r["output_name"],
+                "file": r["output_path"],
+                "params": json.loads(r["params"]),
+                "error": r["error"],
+                "seconds": r["seconds"],
+                "audio_seconds": r["audio_seconds"],
+            }
+            for r in self._query(sql, params)
+        ]
+
+
+class JobRunner:
+    """Background executor for stored jobs.
+
+    Up to max_jobs jobs run at once, each with row_concurrency rows in
+    flight. Rows are generated through generate_row(params, cancel), which
+    submits batch-priority work to the scheduler, so interactive requests
+    still go first. Rows are claimed grouped by model to keep the model pool
+    warm, and concurrent rows for the same voice can share a batched call.
+    """
+
+    def __init__(self, store: JobStore, generate_row: Callable, output_root: Path,
+                 max_jobs: int = 1, row_concurrency: int = 4):
+        self.store = store
+        self.generate_row = generate_row
+        self.output_root = Path(output_root)
+        self.max_jobs = max(1, max_jobs)
+        self.row_concurrency = max(1, row_concurrency)
+        self._running: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            resumed = self.store.recover()
+            if resumed:
+                logger.info(f"Resuming {resumed} interrupted bulk job(s)")
+            self._thread = threading.Thread(target=self._dispatch, name="job-runner", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop taking rows; rows in flight finish and the rest stay pending for the next start."""
+        self._stop.set()
+        self._wake.set()
+        with self._lock:
+            events = list(self._running.values())
+        for event in events:
+            event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wake(self):
+        self._wake.set()
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job. Returns False if it had already finished."""
+        job = self.store.job(job_id)
+        if job is None or job["status"] in JOB_FINAL:
+            return False
+        with self._lock:
+            event = self._running.get(job_id)
+        self.store.set_status(job_id, "cancelled")
+        self.store.cancel_pending(job_id)
+        if event is not None:
+            event.set()
+        return True
+
+    def retry(self, job_id: str) -> int:
+        """Requeue a finished job's failed and cancelled rows. Returns how many rows were requeued."""
+        job = self.store.job(job_id)
+        if job is None or job["status"] not in JOB_FINAL:
+            return 0
+        reset = self.store.reset_rows(job_id)
+        if reset:
+            self.store.set_status(job_id, "queued")
+            self.wake()
+        return reset
+
+    def _dispatch(self):
+        while not self._stop.is_set():
+            with self._lock:
+                free = self.max_jobs - len(self._running)
+                running = set(self._running)
+            if free > 0:
+                for job_id in [j for j in self.store.queued_jobs() if j not in running][:free]:
+                    cancel = threading.Event()
+                    with self._lock:
+                        self._running[job_id] = cancel
+                    threading.Thread(target=self._run_job, args=(job_id, cancel),
+                                     name=f"job-{job_id}", daemon=True).start()
+            self._wake.wait(1.0)
+            self._wake.clear()
+
+    def _run_job(self, job_id: str, cancel: threading.Event):
+        logger.info(f"Starting bulk job {job_id}")
+        out_dir = self.output_root / job_id
+        try:
+            self.store.set_status(job_id, "running")
+            if self.store.job(job_id)["status"] != "running":
+                return
+            out_dir.mkdir(parents=True, exist_ok=True)
+            workers = [threading.Thread(target=self._work_rows, args=(job_id, out_dir, cancel), daemon=True)
+                       for _ in range(self.row_concurrency)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+            job = self.store.job(job_id)
+            if self._stop.is_set() and job["status"] == "running":
+                # Shutting down: leave the job queued so it resumes on restart
+                self.store.set_status(job_id, "queued")
+            elif job["status"] == "running":
+                failed = job["rows"]["failed"]
+                self.store.set_status(job_id, "failed" if failed else "completed",
+                                      error=f"{failed} row(s) failed" if failed else None)
+            job = self.store.job(job_id)
+            self._write_manifest(job, out_dir)
+            logger.info(f"Bulk job {job_id} {job['status']}: {job['rows']['done']}/{job['total_rows']} rows, "
+                        f"{job['rows_per_second']} rows/s")
+        except Exception as e:
+            logger.error(f"Bulk job {job_id} failed: {e}")
+            self.store.set_status(job_id, "failed", error=str(e))
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+            self._wake.set()
+
+    def _work_rows(self, job_id: str, out_dir: Path, cancel: threading.Event):
+        while not cancel.is_set():
+            row = self.store.claim_row(job_id)
+            if row is None:
+                return
+            index = row["index"]
+            start = time.perf_counter()
+            try:
+                while True:
+                    try:
+                        audio, sr = self.generate_row(row["params"], cancel)
+                        break
+                    except QueueFull as e:
+                        # Interactive traffic has the queue; back off and try again
+                        if cancel.wait(e.retry_after):
+                            raise
+            except SchedulerError as e:
+                if cancel.is_set():
+                    self.store.release_row(job_id, index)
+                    if self.store.job(job_id)["status"] == "cancelled":
+                        self.store.cancel_pending(job_id)
+                    return
+                self.store.finish_row(job_id, index, "failed", error=str(e))
+                continue
+            except Exception as e:
+                logger.warning(f"Bulk job {job_id} row {index} failed: {e}")
+                self.store.finish_row(job_id, index, "failed", error=str(e))
+                continue
+
+            path = out_dir / f"{row['output']}.wav"
+            tmp_path = path.with_name(path.name + ".tmp")
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(pcm16_to_wav_bytes(to_pcm16(audio), sr))
+                os.replace(tmp_path, path)
+            except OSError as e:
+                # Full disk or permissions: fail the row rather than the worker thread
+                logger.warning(f"Bulk job {job_id} row {index} could not be written: {e}")
+                self.store.finish_row(job_id, index, "failed", error=f"Could not write output: {e}")
+                try:
+                    tmp_path.unlink()
+                except OSError:
+                    pass
+                continue
+            self.store.finish_row(job_id, index, "done", output_path=path.name,
+                                  seconds=time.perf_counter() - start, audio_seconds=len(audio) / sr)
+
+    def _write_manifest(self, job: dict, out_dir: Path):
+        rows = []
+        offset = 0
+        while True:
+            page = self.store.rows(job["id"], offset=offset, limit=1000)
+            rows += page
+            offset += len(page)
+            if len(page) < 1000:
+                break
+        manifest = dict(job, items=[
+            {
+                "index": r["index"],
+                "output": r["output"],
+                "file": r["file"],
+                "status": r["status"],
+                "text": r["params"]["text"],
+                "mode": r["params"]["mode"],
+                "audio_seconds": r["audio_seconds"],
+                "error": r["error"],
+            }
+            for r in rows
+        ])
+        tmp_path = out_dir / "manifest.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, out_dir / "manifest.json")
+
+    def stats(self) -> dict:
+        with self._lock:
+            running = list(self._running)
+        return {
+            "max_jobs": self.max_jobs,
+            "row_concurrency": self.row_concurrency,
+            "running": running,
+            "queued": len(self.store.queued_jobs()),
+        }
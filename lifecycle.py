@@ -0,0 +1,191 @@
+"""
+Qwen3-TTS Server Lifecycle
+Tracks whether the server is starting, serving or draining, and counts the
+HTTP requests in flight (a streaming response counts until its last chunk is
+sent) and the WebSocket sessions that are generating. On SIGTERM the server
+stops admitting new work, closes idle WebSockets, waits for in-flight work to
+finish within a deadline, and only then lets uvicorn close its sockets and
+run the lifespan shutdown.
+"""
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Lifecycle:
+    """Serving state plus an in-flight counter that a drain can wait on."""
+
+    def __init__(self):
+        self.state = "starting"  # starting, serving, draining, stopped
+        self._inflight = 0
+        self._cond = threading.Condition()
+        self._drain_started: Optional[float] = None
+        self._on_drain: List[Callable[[], None]] = []
+        self._drain_waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self.rejected = 0
+
+    @property
+    def draining(self) -> bool:
+        return self.state in ("draining", "stopped")
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def serving(self):
+        self.state = "serving"
+        self._drain_started = None
+
+    def stopped(self):
+        self.state = "stopped"
+
+    def on_drain(self, fn: Callable[[], None]):
+        """Register fn to run once when draining starts (e.g. pause background jobs)."""
+        self._on_drain.append(fn)
+        return fn
+
+    def enter(self):
+        with self._cond:
+            self._inflight += 1
+
+    def exit(self):
+        with self._cond:
+            self._inflight -= 1
+            self._cond.notify_all()
+
+    def begin_drain(self):
+        """Stop admitting new work. Safe to call more than once."""
+        with self._cond:
+            if self.draining:
+                return
+            self.state = "draining"
+            self._drain_started = time.monotonic()
+            waiters = list(self._drain_waiters)
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+        logger.info(f"Draining: waiting for {self._inflight} in-flight requests")
+        for fn in self._on_drain:
+            try:
+                fn()
+            except Exception as e:
+                logger.warning(f"Drain hook {getattr(fn, '__name__', fn)} failed: {e}")
+
+    async def wait_draining(self):
+        """Return once draining starts, e.g. for an idle connection to close itself."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            if self.draining:
+                return
+            self._drain_waiters.add(waiter)
+        try:
+            await waiter[1].wait()
+        finally:
+            with self._cond:
+                self._drain_waiters.discard(waiter)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until nothing is in flight. False if the timeout ran out first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._inflight > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self) -> dict:
+        stats = {"state": self.state, "inflight": self._inflight, "rejected": self.rejected}
+        if self._drain_started is not None:
+            stats["draining_seconds"] = round(time.monotonic() - self._drain_started, 1)
+        return stats
+
+
+class DrainMiddleware:
+    """ASGI middleware that counts in-flight requests and turns new ones away while draining.
+
+    Paths in ``exempt`` (health probes, metrics) are always served and do not
+    count as in-flight work. Rejected requests get 503 with Retry-After and
+    Connection: close, so clients and load balancers move to another instance.
+    WebSocket handshakes are refused while draining, but an open session is
+    not counted here: it may sit idle for hours, so the handler counts it
+    only while it is generating.
+    """
+
+    def __init__(self, app, lifecycle: Lifecycle, exempt: Iterable[str] = (), retry_after: int = 5):
+        self.app = app
+        self.lifecycle = lifecycle
+        self.exempt = set(exempt)
+        self.retry_after = retry_after
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or scope["path"] in self.exempt:
+            await self.app(scope, receive, send)
+            return
+
+        if self.lifecycle.draining:
+            self.lifecycle.rejected += 1
+            if scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": 1012})  # service restart
+                return
+            body = json.dumps({"detail": "Server is shutting down"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.retry_after).encode()),
+                    (b"connection", b"close"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        if scope["type"] == "websocket":
+            await self.app(scope, receive, send)
+            return
+
+        self.lifecycle.enter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.lifecycle.exit()
+
+
+def serve(app, lifecycle: Lifecycle, host: str, port: int, drain_timeout: float,
+          shutdown_timeout: float = 5.0):
+    """Run app under uvicorn, draining in-flight work on the first SIGTERM/SIGINT.
+
+    A second signal skips the drain. After the drain uvicorn gets
+    ``shutdown_timeout`` seconds to close connections before the lifespan
+    shutdown releases models.
+    """
+    import uvicorn
+
+    class DrainingServer(uvicorn.Server):
+        drain_thread: Optional[threading.Thread] = None
+
+        def handle_exit(self, sig, frame):
+            # Runs in the signal handler on the event loop, so the drain itself happens on a thread
+            if self.drain_thread is not None:
+                super().handle_exit(sig, frame)
+                return
+            self.drain_thread = threading.Thread(target=self._drain, args=(sig, frame), name="drain", daemon=True)
+            self.drain_thread.start()
+
+        def _drain(self, sig, frame):
+            lifecycle.begin_drain()
+            if not lifecycle.wait_idle(drain_timeout):
+                logger.warning(f"Drain deadline of {drain_timeout:.0f}s passed with "
+                               f"{lifecycle.inflight} requests in flight; closing them")
+            uvicorn.Server.handle_exit(self, sig, frame)
+
+    config = uvicorn.Config(app, host=host, port=port, reload=False,
+                            timeout_graceful_shutdown=shutdown_timeout)
+    DrainingServer(config).run()
@@ -0,0 +1,150 @@
+"""
+Qwen3-TTS Long-form Rendering
+Fans the chunks of a long text out to a pool of worker processes, each with
+its own model instance, and hands the audio back in text order. Every chunk
+is generated with a seed derived from the request seed and the chunk text,
+so the result does not depend on which worker ran it.
+"""
+import sys
+import zlib
+import logging
+import contextlib
+import threading
+import multiprocessing
+import concurrent.futures
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+import longform_worker
+from model_pool import ModelPool, estimate_model_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def derive_seed(seed: int, text: str) -> int:
+    """Seed for one chunk: stable for the same request seed and chunk text, wherever it runs."""
+    return zlib.crc32(f"{seed}|{text}".encode("utf-8")) & 0x7FFFFFFF
+
+
+@contextlib.contextmanager
+def _worker_main():
+    """Have processes spawned in this block start from longform_worker instead of our __main__.
+
+    A spawned process re-runs the parent's main module before it unpickles
+    any work, which for the server means building the whole app again.
+    """
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = longform_worker
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+class LongformRenderer:
+    """Process pool that renders text chunks in parallel and yields them in order.
+
+    Workers start on first use and keep their model loaded between renders.
+    Processes are spawned rather than forked, since Metal state does not
+    survive a fork. With a model_pool, each model the workers load is
+    reserved in its budget (once per worker) until shutdown, so the server
+    evicts its own models to make room rather than overcommitting memory.
+    """
+
+    def __init__(self, backend_name: str, workers: int = 2, backend_options: Optional[dict] = None,
+                 model_pool: Optional[ModelPool] = None):
+        self.backend_name = backend_name
+        self.workers = max(1, workers)
+        self.backend_options = backend_options or {}
+        self.model_pool = model_pool
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._reserved: Set[str] = set()
+        self.renders = 0
+        self.chunks_rendered = 0
+
+    def _pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                logger.info(f"Starting {self.workers} long-form worker processes")
+                executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=longform_worker.init_worker,
+                    initargs=(self.backend_name, self.backend_options),
+                )
+                # Processes are spawned as work is submitted; start them all
+                # now, while the worker module stands in for __main__
+                with _worker_main():
+                    for _ in range(self.workers):
+                        executor.submit(int)
+                self._executor = executor
+            return self._executor
+
+    def _reserve(self, model_path: str):
+        """Count the workers' copies of a model against the model pool budget."""
+        if self.model_pool is None:
+            return
+        with self._lock:
+            if model_path in self._reserved:
+                return
+            self._reserved.add(model_path)
+        self.model_pool.reserve(f"longform:{model_path}", self.workers * estimate_model_bytes(model_path))
+
+    def render(self, model_path: str, texts: List[str], seed: int, **kwargs) -> Iterator[Tuple[np.ndarray, int]]:
+        """Yield (int16 audio, sample_rate) for each text, in order.
+
+        At most twice the worker count of chunks are in flight, so finished
+        audio never piles up far ahead of the consumer. Closing the iterator
+        cancels chunks that have not started.
+        """
+        pool = self._pool()
+        self._reserve(str(model_path))
+        pending = iter(texts)
+        in_flight: deque = deque()
+
+        def submit_next() -> bool:
+            text = next(pending, None)
+            if text is None:
+                return False
+            in_flight.append(pool.submit(longform_worker.render_chunk, str(model_path), text, derive_seed(seed, text), kwargs))
+            return True
+
+        with self._lock:
+            self.renders += 1
+        try:
+            while len(in_flight) < self.workers * 2 and submit_next():
+                pass
+            while in_flight:
+                result = in_flight.popleft().result()
+                submit_next()
+                with self._lock:
+                    self.chunks_rendered += 1
+                yield result
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool next time
+            self.shutdown()
+            raise
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            reserved, self._reserved = self._reserved, set()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        for model_path in reserved:
+            self.model_pool.release(f"longform:{model_path}")
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self._executor is not None,
+            "renders": self.renders,
+            "chunks_rendered": self.chunks_rendered,
+        }
@@ -0,0 +1,36 @@
+"""
+Qwen3-TTS Long-form Worker
+Code run inside the long-form worker processes. It is kept apart from the
+server so a spawned worker imports only this module and the engine, never
+the server's __main__ with its app, caches and job store.
+"""
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from engine import GenerationEngine, get_backend, to_pcm16
+
+logger = logging.getLogger(__name__)
+
+# Per-process state
+_engine: Optional[GenerationEngine] = None
+_models: Dict[str, object] = {}
+
+
+def init_worker(backend_name: str, backend_options: dict):
+    global _engine
+    _engine = GenerationEngine(get_backend(backend_name))
+    for name, value in backend_options.items():
+        setattr(_engine.backend, name, value)
+
+
+def render_chunk(model_path: str, text: str, seed: int, kwargs: dict) -> Tuple[np.ndarray, int]:
+    model = _models.get(model_path)
+    if model is None:
+        logger.info(f"Worker loading model from {model_path}")
+        model = _models[model_path] = _engine.load(model_path)
+    _engine.seed(seed)
+    audio, sr = _engine.generate(model, text, **kwargs)
+    # int16 halves what is pickled back to the parent
+    return to_pcm16(audio), sr
@@ -5,8 +5,13 @@ import time
 import wave
 import gc
 import re
+import json
+import argparse
 import subprocess
 import warnings
+import multiprocessing
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 
 # Suppress harmless library warnings
@@ -18,9 +23,11 @@ try:
     from mlx_audio.tts.utils import load_model
     from mlx_audio.tts.generate import generate_audio
 except ImportError:
-    print("Error: 'mlx_audio' library not found.")
-    print("Run: source .venv/bin/activate")
-    sys.exit(1)
+    # Batch mode can run on the fake backend; the interactive menu checks again
+    load_model = generate_audio = None
+
+from engine import GenerationEngine, get_backend, pcm16_to_wav_bytes, to_pcm16
+from jobs import parse_rows
 
 # Configuration
 BASE_OUTPUT_DIR = os.path.join(os.getcwd(), "outputs")
@@ -51,6 +58,12 @@ SPEAKER_MAP = {
     "Korean": ["Sohee"]
 }
 
+# Model names for batch mode, e.g. "lite_custom"
+BATCH_MODELS = {
+    "pro_custom": "1", "pro_design": "2", "pro_clone": "3",
+    "lite_custom": "4", "lite_design": "5", "lite_clone": "6",
+}
+
 EMOTION_EXAMPLES = [
     "Sad and crying, speaking slowly",
     "Excited and happy, speaking very fast",
@@ -391,6 +404,197 @@ def run_clone_manager(model_key):
     clean_memory()
 
 
+# ============= Batch Mode =============
+
+# Per-process state of batch workers
+_batch_engine = None
+_batch_model = None
+
+
+def batch_worker_init(backend_name, model_path):
+    global _batch_engine, _batch_model
+    _batch_engine = GenerationEngine(get_backend(backend_name))
+    _batch_model = _batch_engine.load(model_path)
+
+
+def batch_render(text, seed, kwargs, out_path):
+    """Generate one line into out_path. Returns (generation seconds, audio seconds)."""
+    start = time.perf_counter()
+    _batch_engine.seed(seed)
+    audio, sr = _batch_engine.generate(_batch_model, text, **kwargs)
+    elapsed = time.perf_counter() - start
+
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pcm16_to_wav_bytes(to_pcm16(audio), sr))
+    os.replace(tmp_path, out_path)
+    return elapsed, len(audio) / sr
+
+
+def read_batch_rows(input_path):
+    """Rows of a batch input: JSONL, CSV with a header, or plain text with one line per row."""
+    with open(input_path, "r", encoding="utf-8-sig") as f:
+        body = f.read()
+    ext = os.path.splitext(input_path)[1].lower()
+    if ext in (".jsonl", ".csv"):
+        return parse_rows(body, ext[1:])
+    lines = [line.strip() for line in body.splitlines() if line.strip()]
+    return parse_rows("\n".join(json.dumps({"text": line}) for line in lines), "jsonl")
+
+
+def batch_generate_kwargs(mode, row, args):
+    """Generation settings for one row: row values first, then the command-line defaults."""
+    if mode == "custom":
+        return {
+            "voice": row.get("voice", args.speaker),
+            "instruct": row.get("instruct") or args.instruct or "Normal tone",
+            "speed": row.get("speed", args.speed),
+        }
+    if mode == "design":
+        instruct = row.get("instruct") or args.instruct
+        if not instruct:
+            raise ValueError("no instruct for voice design (set it per row or with --instruct)")
+        return {"instruct": instruct}
+
+    name = row.get("voice") or args.voice
+    if not name:
+        raise ValueError("no saved voice to clone (set voice per row or --voice)")
+    ref_audio = os.path.join(VOICES_DIR, f"{name}.wav")
+    if not os.path.exists(ref_audio):
+        raise ValueError(f"saved voice not found: {name}")
+    ref_text = "."
+    txt_path = os.path.join(VOICES_DIR, f"{name}.txt")
+    if os.path.exists(txt_path):
+        with open(txt_path, "r", encoding="utf-8") as f:
+            ref_text = f.read().strip() or "."
+    return {"ref_audio": ref_audio, "ref_text": ref_text}
+
+
+def run_batch(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py batch",
+        description="Generate every line of a JSONL, CSV or text file without prompts.",
+    )
+    parser.add_argument("--model", required=True, choices=sorted(BATCH_MODELS))
+    parser.add_argument("--input", required=True, help="JSONL or CSV rows (text, voice, instruct, output, speed, seed) or a .txt with one line per file")
+    parser.add_argument("--out", required=True, help="Output directory; lines whose WAV already exists are skipped")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes, each with its own copy of the model")
+    parser.add_argument("--speaker", default="Vivian", help="Default speaker (custom voice)")
+    parser.add_argument("--instruct", default="", help="Default instruction (custom voice emotion, voice design description)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Default speed (custom voice)")
+    parser.add_argument("--voice", default="", help="Default saved voice from voices/ (voice cloning)")
+    parser.add_argument("--seed", type=int, default=None, help="Default seed for reproducible output")
+    parser.add_argument("--force", action="store_true", help="Regenerate lines whose output already exists")
+    args = parser.parse_args(argv)
+
+    info = MODELS[BATCH_MODELS[args.model]]
+    mode = "clone" if info["mode"] == "clone_manager" else info["mode"]
+    model_path = get_smart_path(info["folder"])
+    if not model_path:
+        print(f"Error: Model not found: {info['folder']}")
+        return 1
+
+    try:
+        rows = read_batch_rows(args.input)
+    except (OSError, ValueError) as e:
+        print(f"Error reading {args.input}: {e}")
+        return 1
+
+    os.makedirs(args.out, exist_ok=True)
+    results = []
+    todo = []
+    for index, row in enumerate(rows):
+        out_path = os.path.join(args.out, f"{row['output']}.wav")
+        result = {"index": index, "output": os.path.basename(out_path), "text": row["text"]}
+        results.append(result)
+        if os.path.exists(out_path) and not args.force:
+            result["status"] = "skipped"
+            continue
+        try:
+            kwargs = batch_generate_kwargs(mode, row, args)
+        except ValueError as e:
+            result.update(status="failed", error=str(e))
+            print(f"  [{index}] {result['output']}: failed: {e}")
+            continue
+        todo.append((result, (row["text"], row.get("seed", args.seed), kwargs, out_path)))
+
+    skipped = sum(1 for r in results if r.get("status") == "skipped")
+    print(f"{args.model}: {len(rows)} lines, {skipped} already done, {len(todo)} to generate")
+
+    backend_name = os.environ.get("QWEN_TTS_BACKEND", "mlx")
+    workers = max(1, min(args.workers, len(todo) or 1))
+    start = time.perf_counter()
+
+    def record(result, outcome):
+        if isinstance(outcome, Exception):
+            result.update(status="failed", error=str(outcome))
+            print(f"  [{result['index']}] {result['output']}: failed: {outcome}")
+            return
+        seconds, audio_seconds = outcome
+        result.update(status="done", seconds=round(seconds, 3), audio_seconds=round(audio_seconds, 3),
+                      real_time_factor=round(seconds / audio_seconds, 3) if audio_seconds else None)
+        print(f"  [{result['index']}] {result['output']}: {audio_seconds:.1f}s audio in {seconds:.1f}s")
+
+    try:
+        if todo and workers == 1:
+            print(f"Loading {info['name']}...")
+            batch_worker_init(backend_name, model_path)
+            for result, job in todo:
+                try:
+                    record(result, batch_render(*job))
+                except Exception as e:
+                    record(result, e)
+        elif todo:
+            print(f"Starting {workers} workers for {info['name']}...")
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=batch_worker_init,
+                initargs=(backend_name, model_path),
+            ) as pool:
+                futures = {pool.submit(batch_render, *job): result for result, job in todo}
+                for future in concurrent.futures.as_completed(futures):
+                    try:
+                        record(futures[future], future.result())
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        record(futures[future], e)
+    except BrokenProcessPool:
+        print("Error: a worker process died (model load failed or out of memory)")
+    except KeyboardInterrupt:
+        print("\nInterrupted; finished lines are kept and skipped on the next run")
+
+    wall = time.perf_counter() - start
+    done = [r for r in results if r.get("status") == "done"]
+    failed = [r for r in results if r.get("status") == "failed"]
+    for r in results:
+        r.setdefault("status", "pending")
+    busy = sum(r["seconds"] for r in done)
+    audio = sum(r["audio_seconds"] for r in done)
+    summary = {
+        "model": args.model,
+        "input": os.path.abspath(args.input),
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+        "workers": workers,
+        "lines": len(rows),
+        "generated": len(done),
+        "skipped": skipped,
+        "failed": len(failed),
+        "wall_seconds": round(wall, 3),
+        "audio_seconds": round(audio, 3),
+        "lines_per_second": round(len(done) / wall, 3) if wall and done else 0.0,
+        "real_time_factor": round(busy / audio, 3) if audio else None,
+        "lines_detail": results,
+    }
+    with open(os.path.join(args.out, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    print(f"Generated {len(done)}, skipped {skipped}, failed {len(failed)} in {wall:.1f}s "
+          f"(RTF {summary['real_time_factor']}). Summary: {os.path.join(args.out, 'summary.json')}")
+    return 0 if not failed and len(done) + skipped == len(rows) else 1
+
+
 def main_menu():
     print("\n" + "=" * 40)
     print(" Qwen3-TTS Manager")
@@ -431,6 +635,14 @@ def main_menu():
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        sys.exit(run_batch(sys.argv[2:]))
+
+    if load_model is None:
+        print("Error: 'mlx_audio' library not found.")
+        print("Run: source .venv/bin/activate")
+        sys.exit(1)
+
     try:
         os.makedirs(BASE_OUTPUT_DIR, exist_ok=True)
         while True:
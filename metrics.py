@@ -0,0 +1,267 @@
+"""
+Qwen3-TTS Metrics
+Counters, gauges and histograms rendered in the Prometheus text format, and a
+per-request context that labels pipeline stage timings with the endpoint and
+model they belong to. The context is a contextvar, so it follows work onto
+the scheduler worker and stream threads that copy the submitting context.
+"""
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from tracing import span, record_span
+
+# Seconds; spans sub-millisecond encodes to multi-minute generations
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets=STAGE_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics plus collectors that read live values (queue depth etc.) at scrape time."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets=STAGE_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def collector(self, fn: Callable[[], None]):
+        """Register fn to refresh gauges right before each scrape."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            fn()
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "qwen_tts_stage_seconds", "Time spent in each stage of the generation pipeline",
+    ["stage", "endpoint", "model", "tier"],
+)
+REQUESTS = registry.counter(
+    "qwen_tts_requests_total", "HTTP requests served", ["endpoint", "method", "status"],
+)
+REQUEST_SECONDS = registry.histogram(
+    "qwen_tts_request_seconds", "HTTP request duration, until the last byte is sent", ["endpoint"],
+)
+RESPONSE_BYTES = registry.counter(
+    "qwen_tts_response_bytes_total", "Response body bytes sent", ["endpoint"],
+)
+AUDIO_SECONDS = registry.counter(
+    "qwen_tts_audio_seconds_total", "Seconds of audio generated", ["endpoint", "model", "tier"],
+)
+LAST_AUDIO_SECONDS = registry.gauge(
+    "qwen_tts_last_audio_seconds", "Length of the most recent generation", ["model", "tier"],
+)
+REAL_TIME_FACTOR = registry.gauge(
+    "qwen_tts_real_time_factor", "Generation seconds per audio second of the most recent generation",
+    ["model", "tier"],
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Labels of the request being served; a mutable dict so worker threads can fill in the model
+_request: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("qwen_tts_request", default=None)
+
+
+def begin_request(endpoint: str) -> contextvars.Token:
+    return _request.set({"endpoint": endpoint, "model": "", "tier": ""})
+
+
+def end_request(token: contextvars.Token):
+    _request.reset(token)
+
+
+def current_labels() -> dict:
+    labels = _request.get()
+    return dict(labels) if labels is not None else {"endpoint": "", "model": "", "tier": ""}
+
+
+def set_model(model_key: str, tier: str):
+    """Record which model the current request uses, for the labels of later stages."""
+    labels = _request.get()
+    if labels is not None:
+        labels["model"] = model_key
+        labels["tier"] = tier
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage, **current_labels())
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as a pipeline stage of the current request (also traced as a span)."""
+    start = time.perf_counter()
+    try:
+        with span(name):
+            yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+def record_stage(name: str, start_ns: int, end_ns: int):
+    """Record a stage timed elsewhere, e.g. once for a whole batch, for the current request."""
+    record_span(name, start_ns, end_ns)
+    observe_stage(name, (end_ns - start_ns) / 1e9)
+
+
+def record_generation(model_key: str, tier: str, seconds: float, audio_seconds: float):
+    AUDIO_SECONDS.inc(audio_seconds, endpoint=current_labels()["endpoint"], model=model_key, tier=tier)
+    LAST_AUDIO_SECONDS.set(audio_seconds, model=model_key, tier=tier)
+    if audio_seconds:
+        REAL_TIME_FACTOR.set(seconds / audio_seconds, model=model_key, tier=tier)
+
+
+class MetricsMiddleware:
+    """ASGI middleware that counts requests and response bytes and opens the per-request label context.
+
+    ``endpoint_for(scope)`` names the route (its path template), so ids in
+    URLs do not explode label cardinality.
+    """
+
+    def __init__(self, app, endpoint_for: Callable[[dict], str]):
+        self.app = app
+        self.endpoint_for = endpoint_for
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = self.endpoint_for(scope)
+        token = begin_request(endpoint)
+        start = time.perf_counter()
+        status = {"code": 500}
+        sent = {"bytes": 0}
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                sent["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, counting_send)
+        finally:
+            REQUESTS.inc(endpoint=endpoint, method=scope["method"], status=status["code"])
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+            RESPONSE_BYTES.inc(sent["bytes"], endpoint=endpoint)
+            end_request(token)
@@ -0,0 +1,196 @@
+"""
+Qwen3-TTS Model Pool
+Keeps several models resident up to a memory budget and evicts the least
+recently used one when a new model does not fit.
+"""
+import gc
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Fallback footprint for model folders without safetensors files
+DEFAULT_MODEL_BYTES = 2 * 1024 ** 3
+
+
+def estimate_model_bytes(model_path) -> int:
+    """Estimate a model's resident size from its safetensors files."""
+    path = Path(model_path)
+    total = 0
+    for weights in path.rglob("*.safetensors"):
+        try:
+            total += weights.stat().st_size
+        except OSError:
+            continue
+    return total or DEFAULT_MODEL_BYTES
+
+
+class ModelPool:
+    """LRU pool of loaded models bounded by an estimated memory budget."""
+
+    def __init__(self, loader: Callable, budget_bytes: int):
+        self.loader = loader
+        self.budget_bytes = budget_bytes
+        self._models: "OrderedDict[str, object]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._reserved: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def get(self, key: str, model_path) -> object:
+        """Return the model for key, loading it (once) if it is not resident."""
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key]
+            self.misses += 1
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another request may have finished loading while we waited
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key]
+
+            # Reserved until the model is resident, so concurrent loads of
+            # other models see it in the budget
+            size = estimate_model_bytes(model_path)
+            reservation = f"load:{key}"
+            self.reserve(reservation, size)
+            try:
+                logger.info(f"Loading model {key} from {model_path} (~{size / 1024 ** 3:.2f} GB)")
+                start = time.perf_counter()
+                model = self.loader(str(model_path))
+                elapsed = time.perf_counter() - start
+
+                with self._lock:
+                    self._reserved.pop(reservation, None)
+                    self._models[key] = model
+                    self._sizes[key] = size
+                    self.loads += 1
+                    self.load_seconds += elapsed
+            finally:
+                self.release(reservation)
+            logger.info(f"Loaded model {key} in {elapsed:.2f}s")
+            return model
+
+    def reserve(self, name: str, size: int):
+        """Count size bytes held outside the pool against the budget, evicting to make room.
+
+        Used for models being loaded and for model copies living in other
+        processes. Held until release(name); reserving a name again replaces
+        its size.
+        """
+        evicted = False
+        with self._lock:
+            self._reserved.pop(name, None)
+            while self._models and self.resident_bytes + self.reserved_bytes + size > self.budget_bytes:
+                key, _ = self._models.popitem(last=False)
+                self._sizes.pop(key, None)
+                self.evictions += 1
+                evicted = True
+                logger.info(f"Evicted model {key} to stay within memory budget")
+            self._reserved[name] = size
+        if evicted:
+            gc.collect()
+
+    def release(self, name: str):
+        with self._lock:
+            self._reserved.pop(name, None)
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    @property
+    def reserved_bytes(self) -> int:
+        return sum(self._reserved.values())
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self._models
+
+    def clear(self):
+        """Drop every resident model."""
+        with self._lock:
+            self._models.clear()
+            self._sizes.clear()
+        gc.collect()
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "resident": list(self._models.keys()),
+            "resident_bytes": self.resident_bytes,
+            "reserved_bytes": self.reserved_bytes,
+            "budget_bytes": self.budget_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate_percent": (self.hits / requests * 100) if requests else 0.0,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "load_seconds_total": round(self.load_seconds, 3),
+            "load_seconds_avg": round(self.load_seconds / self.loads, 3) if self.loads else 0.0,
+        }
+
+
+class LatencyTracker:
+    """Rolling generation latency and real-time factor per model key."""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float, audio_seconds: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append((seconds, audio_seconds))
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    @staticmethod
+    def _summarize(samples, count: int) -> dict:
+        latencies = sorted(s for s, _ in samples)
+        audio = sum(a for _, a in samples)
+
+        def pct(p: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 4)
+
+        return {
+            "requests": count,
+            "p50_seconds": pct(0.50),
+            "p95_seconds": pct(0.95),
+            "mean_seconds": round(sum(latencies) / len(latencies), 4),
+            "real_time_factor": round(sum(latencies) / audio, 4) if audio else None,
+        }
+
+    def stats(self, group: Callable[[str], str] = lambda key: key) -> dict:
+        """Summaries keyed by group(key), e.g. the model tier."""
+        grouped: Dict[str, list] = {}
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for key, samples in self._samples.items():
+                name = group(key)
+                grouped.setdefault(name, []).extend(samples)
+                counts[name] = counts.get(name, 0) + self._counts[key]
+        return {name: self._summarize(samples, counts[name]) for name, samples in grouped.items()}
+
+
+def budget_from_env(value: Optional[str], default_gb: float) -> int:
+    """Parse a memory budget in GB (as set in an environment variable) into bytes."""
+    try:
+        gb = float(value) if value else default_gb
+    except ValueError:
+        logger.warning(f"Invalid model memory budget '{value}', using {default_gb} GB")
+        gb = default_gb
+    return int(gb * 1024 ** 3)
@@ -0,0 +1,151 @@
+"""
+Qwen3-TTS Voice Prompt Cache
+Keeps reference-audio features (speaker embedding, codec tokens, decoded
+reference waveform) for saved voice prompts in an LRU, and persists them next
+to the prompt as a compact .npz file so they survive restarts. Without a root
+directory the cache is memory-only, as used for ad-hoc clone references.
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+Features = Dict[str, np.ndarray]
+
+
+def features_nbytes(features: Features) -> int:
+    return sum(int(v.nbytes) for v in features.values())
+
+
+class PromptFeatureCache:
+    """LRU cache of per-prompt, per-model reference features with disk persistence."""
+
+    def __init__(self, root_dir: Optional[Path], max_entries: int = 64, max_bytes: int = 256 * 1024 ** 2):
+        self.root_dir = Path(root_dir) if root_dir is not None else None
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], Features]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, prompt_id: str, model_key: str) -> Path:
+        return self.root_dir / prompt_id / f"features_{model_key}.npz"
+
+    def get(self, prompt_id: str, model_key: str) -> Optional[Features]:
+        """Return cached features from memory, then disk, or None."""
+        key = (prompt_id, model_key)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        features = self._load(prompt_id, model_key)
+        with self._lock:
+            if features is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._insert(key, features)
+            return features
+
+    def get_or_compute(self, prompt_id: str, model_key: str, compute: Callable[[], Features]) -> Features:
+        """Return cached features, computing and persisting them on a miss."""
+        features = self.get(prompt_id, model_key)
+        if features is None:
+            features = compute()
+            self.put(prompt_id, model_key, features)
+        return features
+
+    def put(self, prompt_id: str, model_key: str, features: Features, persist: bool = True):
+        with self._lock:
+            self._insert((prompt_id, model_key), features)
+        if persist:
+            self._save(prompt_id, model_key, features)
+
+    def _insert(self, key: Tuple[str, str], features: Features):
+        """Add an entry and evict LRU entries over the limits (caller holds the lock)."""
+        if key in self._entries:
+            self._bytes -= features_nbytes(self._entries.pop(key))
+        self._entries[key] = features
+        self._bytes += features_nbytes(features)
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= features_nbytes(evicted)
+
+    def _load(self, prompt_id: str, model_key: str) -> Optional[Features]:
+        if self.root_dir is None:
+            return None
+        path = self._path(prompt_id, model_key)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return {name: data[name] for name in data.files}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable prompt features {path}: {e}")
+            return None
+
+    def _save(self, prompt_id: str, model_key: str, features: Features):
+        if self.root_dir is None:
+            return
+        path = self._path(prompt_id, model_key)
+        if not path.parent.exists():
+            # Prompt was deleted (or never persisted); keep the features in memory only
+            return
+        tmp_path = path.with_name(path.name + ".tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **features)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not persist prompt features for {prompt_id}: {e}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def invalidate(self, prompt_id: str, remove_files: bool = True):
+        """Forget every cached model variant of a prompt."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == prompt_id]:
+                self._bytes -= features_nbytes(self._entries.pop(key))
+        if remove_files and self.root_dir is not None:
+            prompt_dir = self.root_dir / prompt_id
+            if prompt_dir.exists():
+                for path in prompt_dir.glob("features_*.npz"):
+                    path.unlink()
+
+    def clear(self, remove_files: bool = True) -> int:
+        """Drop all entries (and persisted feature files). Returns the number of entries dropped."""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.disk_hits = self.misses = 0
+        if remove_files and self.root_dir is not None and self.root_dir.exists():
+            for path in self.root_dir.glob("*/features_*.npz"):
+                path.unlink()
+        return count
+
+    def stats(self) -> dict:
+        total = self.hits + self.disk_hits + self.misses
+        return {
+            "enabled": True,
+            "size": len(self._entries),
+            "max_size": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "total_requests": total,
+            "hit_rate_percent": ((self.hits + self.disk_hits) / total * 100) if total else 0.0,
+        }
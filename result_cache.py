@@ -0,0 +1,200 @@
+"""
+Qwen3-TTS Synthesis Result Cache
+Two-tier cache of generated audio: an in-memory LRU of int16 PCM in front of
+a content-addressed store of WAV files (outputs/cache/<ab>/<key>.wav). Keys
+hash everything that determines the output - model, normalized text, voice,
+instruct, speed and seed - so repeated requests skip the model entirely.
+"""
+import os
+import json
+import wave
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+from engine import to_pcm16, pcm16_to_wav_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of the input text: NFC, trimmed, runs of whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def result_key(**parts) -> str:
+    """Content address for a synthesis result from the parameters that determine it."""
+    if "text" in parts:
+        parts["text"] = normalize_text(parts["text"])
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Memory LRU + on-disk content-addressed store of generated waveforms.
+
+    Audio comes back as int16 PCM, which the WAV and stream encoders accept
+    as-is. Both tiers evict least recently used entries past their byte limits.
+    """
+
+    def __init__(self, root_dir: Path, max_memory_bytes: int = 128 * 1024 ** 2,
+                 max_disk_bytes: int = 1024 ** 3):
+        self.root_dir = Path(root_dir)
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, Tuple[np.ndarray, int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: Optional["OrderedDict[str, int]"] = None
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def _path(self, key: str) -> Path:
+        return self.root_dir / key[:2] / f"{key}.wav"
+
+    def _disk_index(self) -> "OrderedDict[str, int]":
+        """Index of files on disk, oldest first (built on first use; caller holds the lock)."""
+        if self._disk is None:
+            files = []
+            if self.root_dir.exists():
+                for path in self.root_dir.glob("*/*.wav"):
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, path.stem, stat.st_size))
+            self._disk = OrderedDict((key, size) for _, key, size in sorted(files))
+            self._disk_bytes = sum(self._disk.values())
+        return self._disk
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, int]]:
+        """Cached (int16 audio, sample_rate) from memory, then disk, or None."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+            on_disk = key in self._disk_index()
+
+        result = self._load(key) if on_disk else None
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self._remember(key, result)
+        return result
+
+    def put(self, key: str, audio: np.ndarray, sample_rate: int):
+        pcm = to_pcm16(audio)
+        with self._lock:
+            self._remember(key, (pcm, sample_rate))
+        self._save(key, pcm, sample_rate)
+
+    def record_bypass(self):
+        """Count a request that could not use the cache (e.g. no seed)."""
+        with self._lock:
+            self.bypassed += 1
+
+    def _remember(self, key: str, result: Tuple[np.ndarray, int]):
+        """Insert into the memory tier and evict past its limit (caller holds the lock)."""
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key)[0].nbytes
+        self._memory[key] = result
+        self._memory_bytes += result[0].nbytes
+        while len(self._memory) > 1 and self._memory_bytes > self.max_memory_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def _load(self, key: str) -> Optional[Tuple[np.ndarray, int]]:
+        path = self._path(key)
+        try:
+            with wave.open(str(path), "rb") as wav_file:
+                sample_rate = wav_file.getframerate()
+                pcm = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+            os.utime(path)
+            return pcm, sample_rate
+        except (OSError, wave.Error, EOFError) as e:
+            logger.warning(f"Dropping unreadable cached result {path}: {e}")
+            with self._lock:
+                self._disk_bytes -= self._disk_index().pop(key, 0)
+            return None
+
+    def _save(self, key: str, pcm: np.ndarray, sample_rate: int):
+        path = self._path(key)
+        tmp_path = path.with_name(path.name + ".tmp")
+        data = pcm16_to_wav_bytes(pcm, sample_rate)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not persist cached result {key}: {e}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+            return
+
+        with self._lock:
+            index = self._disk_index()
+            self._disk_bytes -= index.pop(key, 0)
+            index[key] = len(data)
+            self._disk_bytes += len(data)
+            evict = []
+            while len(index) > 1 and self._disk_bytes > self.max_disk_bytes:
+                old_key, size = index.popitem(last=False)
+                self._disk_bytes -= size
+                evict.append(old_key)
+        for old_key in evict:
+            try:
+                self._path(old_key).unlink()
+            except OSError:
+                pass
+
+    def clear(self, remove_files: bool = True) -> int:
+        """Drop both tiers (or only memory). Returns the number of entries removed from disk."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if not remove_files:
+                return 0
+            index = self._disk_index()
+            keys = list(index)
+            index.clear()
+            self._disk_bytes = 0
+            self.hits = self.disk_hits = self.misses = self.bypassed = 0
+        for key in keys:
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+        return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            disk_entries = len(self._disk_index())
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "max_memory_bytes": self.max_memory_bytes,
+            "disk_entries": disk_entries,
+            "disk_bytes": self._disk_bytes,
+            "max_disk_bytes": self.max_disk_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate_percent": ((self.hits + self.disk_hits) / lookups * 100) if lookups else 0.0,
+        }
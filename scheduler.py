@@ -0,0 +1,420 @@
+"""
+Qwen3-TTS Inference Scheduler
+All model work runs on one dedicated worker thread that owns the device. The
+event loop only enqueues jobs into a bounded priority queue and awaits their
+futures, so health checks and uploads stay responsive during generation.
+Interactive jobs are served before batch jobs; a full queue rejects new work
+with an estimated Retry-After instead of piling up.
+
+Jobs submitted with a ``batch_key`` are batched dynamically: when the worker
+picks one up it also takes queued jobs with the same key, waiting up to
+``max_batch_wait`` (counted from when the first job was queued) for more to
+arrive, and runs them as one call.
+"""
+import time
+import heapq
+import queue
+import asyncio
+import logging
+import threading
+import itertools
+import contextvars
+import concurrent.futures
+from collections import deque
+from typing import Any, Awaitable, Callable, Hashable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+# Jobs of the batch being run on the worker thread
+_batch = threading.local()
+
+
+class SchedulerError(Exception):
+    """Base class for jobs the scheduler could not run. Carries a suggested retry delay."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFull(SchedulerError):
+    """The queue has no room for another job of this priority."""
+
+
+class SchedulerClosed(SchedulerError):
+    """The scheduler is shutting down and accepts no new jobs."""
+
+
+class DeadlineExceeded(SchedulerError):
+    """The job did not finish before its deadline."""
+
+
+class JobCancelled(SchedulerError):
+    """The job was cancelled, usually because the client went away."""
+
+
+def run_in_job(index: int, fn: Callable, *args, **kwargs):
+    """Call fn in the context of the index-th job of the batch being run (directly outside a batch)."""
+    jobs = getattr(_batch, "jobs", None)
+    if not jobs or index == 0:
+        return fn(*args, **kwargs)
+    return jobs[index].context.run(fn, *args, **kwargs)
+
+
+def for_each_job(fn: Callable, *args, **kwargs):
+    """Call fn in the context of every job of the batch being run (once outside a batch).
+
+    A batch runs in its first job's context, so per-request bookkeeping done
+    directly, like metric labels and stage timings, would only reach that job.
+    """
+    jobs = getattr(_batch, "jobs", None)
+    for index in range(len(jobs) if jobs else 1):
+        run_in_job(index, fn, *args, **kwargs)
+
+
+class Job:
+    """A unit of model work waiting for (or running on) the worker."""
+
+    def __init__(self, fn: Callable, args: tuple, kwargs: dict, priority: str, deadline: Optional[float],
+                 batch_key: Optional[Hashable] = None):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.deadline = deadline
+        self.batch_key = batch_key
+        self.enqueued_at = time.monotonic()
+        # Context of the submitter (e.g. request metric labels), so it follows the work onto the worker
+        self.context = contextvars.copy_context()
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        """Drop the job if it is still queued; a running job sees `cancelled` and may stop early."""
+        self.cancelled.set()
+        self.future.cancel()
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+
+class InferenceScheduler:
+    """Single-worker job queue with priority classes, deadlines and backpressure.
+
+    ``max_queue`` bounds the jobs waiting to run. Batch jobs may only use
+    ``batch_share`` of the queue so interactive requests still get in while a
+    long batch is queued. ``max_batch_size`` > 1 enables dynamic batching of
+    jobs submitted with a ``batch_key``.
+    """
+
+    def __init__(self, max_queue: int = 32, batch_share: float = 0.5, name: str = "inference",
+                 max_batch_size: int = 1, max_batch_wait: float = 0.0):
+        self.max_queue = max(1, max_queue)
+        self.batch_queue_limit = max(1, int(self.max_queue * batch_share))
+        self.name = name
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_batch_wait = max(0.0, max_batch_wait)
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._running: Optional[Job] = None
+        self._waits = deque(maxlen=500)
+        self._service = deque(maxlen=500)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.cancelled = 0
+        self.batches = 0
+        self.batch_sizes = {}
+
+    # ---- lifecycle ----
+
+    def start(self):
+        with self._cond:
+            self._closed = False
+            self._ensure_worker()
+
+    def _ensure_worker(self):
+        """Start the worker thread if it is not running (caller holds the lock)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._worker, name=f"{self.name}-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop accepting jobs, let queued ones finish, and join the worker."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # ---- submission ----
+
+    def depth(self, priority: Optional[str] = None) -> int:
+        if priority is None:
+            return len(self._heap)
+        return sum(1 for _, _, job in self._heap if job.priority == priority)
+
+    def retry_after(self) -> float:
+        """Rough seconds until the queue drains, from the recent mean service time."""
+        mean = (sum(self._service) / len(self._service)) if self._service else 1.0
+        return max(1.0, round(mean * (len(self._heap) + 1), 1))
+
+    def check_capacity(self, priority: str = "interactive"):
+        """Raise QueueFull/SchedulerClosed if a job of this priority would be rejected now."""
+        with self._cond:
+            self._admit(priority)
+
+    def _admit(self, priority: str):
+        """Admission control (caller holds the lock)."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}'. Choose from: {', '.join(PRIORITIES)}")
+        if self._closed:
+            raise SchedulerClosed("Server is shutting down", retry_after=self.retry_after())
+        if len(self._heap) >= self.max_queue or (priority == "batch" and self.depth("batch") >= self.batch_queue_limit):
+            self.rejected += 1
+            raise QueueFull(f"Inference queue is full ({len(self._heap)} waiting)", retry_after=self.retry_after())
+
+    def submit(self, fn: Callable, *args, priority: str = "interactive", timeout: Optional[float] = None,
+               batch_key: Optional[Hashable] = None, **kwargs) -> Job:
+        """Queue fn(*args, **kwargs) for the worker. ``timeout`` sets the job's deadline in seconds.
+
+        With ``batch_key``, fn takes a list of items and returns one result per
+        item: the job's single positional argument is its item, and jobs with
+        equal keys may be run together as ``fn([item, ...], **kwargs)``.
+        """
+        if batch_key is not None and len(args) != 1:
+            raise ValueError("Batched jobs take exactly one positional argument (their item)")
+        deadline = time.monotonic() + timeout if timeout else None
+        job = Job(fn, args, kwargs, priority, deadline, batch_key)
+        with self._cond:
+            self._admit(priority)
+            self._ensure_worker()
+            heapq.heappush(self._heap, (PRIORITIES[priority], next(self._seq), job))
+            self.submitted += 1
+            self._cond.notify()
+        return job
+
+    def call(self, fn: Callable, *args, priority: str = "interactive", timeout: Optional[float] = None,
+             cancel: Optional[threading.Event] = None, **kwargs) -> Any:
+        """Run fn on the worker and block the calling thread for the result.
+
+        Setting ``cancel`` (e.g. a stream pipeline's stop event) abandons the job.
+        """
+        job = self.submit(fn, *args, priority=priority, timeout=timeout, **kwargs)
+        while True:
+            try:
+                return job.future.result(timeout=0.1)
+            except concurrent.futures.TimeoutError:
+                if cancel is not None and cancel.is_set():
+                    job.cancel()
+                    raise JobCancelled("Job cancelled")
+                if job.expired():
+                    job.cancel()
+                    raise DeadlineExceeded("Request deadline exceeded", retry_after=self.retry_after())
+            except concurrent.futures.CancelledError:
+                raise JobCancelled("Job cancelled")
+
+    def iterate(self, fn: Callable[..., Iterator], *args, priority: str = "interactive",
+                timeout: Optional[float] = None, cancel: Optional[threading.Event] = None,
+                **kwargs) -> Iterator:
+        """Run the generator fn on the worker, yielding its items to the calling thread as they appear.
+
+        The worker is held for the whole generator, so incremental synthesis
+        of one text chunk is never interleaved with other jobs.
+        """
+        items: "queue.Queue" = queue.Queue()
+        stop = threading.Event()
+        done = object()
+
+        def drain():
+            try:
+                for item in fn(*args, **kwargs):
+                    if stop.is_set():
+                        return
+                    items.put(item)
+            finally:
+                items.put(done)
+
+        job = self.submit(drain, priority=priority, timeout=timeout)
+        try:
+            while True:
+                try:
+                    item = items.get(timeout=0.1)
+                except queue.Empty:
+                    if job.future.cancelled() or (cancel is not None and cancel.is_set()):
+                        raise JobCancelled("Job cancelled")
+                    if job.expired() and not (job.future.running() or job.future.done()):
+                        raise DeadlineExceeded("Request deadline exceeded", retry_after=self.retry_after())
+                    continue
+                if item is done:
+                    # Re-raises the generator's exception, if any
+                    job.future.result()
+                    return
+                yield item
+        finally:
+            stop.set()
+            job.cancel()
+
+    async def run(self, fn: Callable, *args, priority: str = "interactive", timeout: Optional[float] = None,
+                  is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+                  batch_key: Optional[Hashable] = None, **kwargs) -> Any:
+        """Run fn on the worker and await the result without blocking the event loop.
+
+        ``is_disconnected`` (e.g. ``request.is_disconnected``) is polled while
+        waiting so jobs of clients that went away are dropped.
+        """
+        job = self.submit(fn, *args, priority=priority, timeout=timeout, batch_key=batch_key, **kwargs)
+        waiter = asyncio.wrap_future(job.future)
+        try:
+            while True:
+                done, _ = await asyncio.wait({waiter}, timeout=0.25)
+                if done:
+                    return waiter.result()
+                if is_disconnected is not None and await is_disconnected():
+                    job.cancel()
+                    raise JobCancelled("Client disconnected")
+                if job.expired():
+                    job.cancel()
+                    raise DeadlineExceeded("Request deadline exceeded", retry_after=self.retry_after())
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+
+    # ---- worker ----
+
+    def _next_batch(self) -> Optional[List[Job]]:
+        """Pop the next job, plus compatible queued jobs if it is batchable."""
+        with self._cond:
+            while not self._heap:
+                if self._closed:
+                    return None
+                self._cond.wait()
+            _, _, job = heapq.heappop(self._heap)
+            if job.batch_key is None or self.max_batch_size == 1:
+                return [job]
+
+            batch = [job]
+            collect_until = job.enqueued_at + self.max_batch_wait
+            while True:
+                batch.extend(self._take_compatible(job.batch_key, self.max_batch_size - len(batch)))
+                remaining = collect_until - time.monotonic()
+                if len(batch) >= self.max_batch_size or remaining <= 0 or self._closed:
+                    return batch
+                self._cond.wait(remaining)
+
+    def _take_compatible(self, batch_key: Hashable, limit: int) -> List[Job]:
+        """Remove up to limit queued jobs with batch_key, in priority order (caller holds the lock)."""
+        if limit <= 0:
+            return []
+        taken, kept = [], []
+        for entry in sorted(self._heap):
+            if len(taken) < limit and entry[2].batch_key == batch_key:
+                taken.append(entry[2])
+            else:
+                kept.append(entry)
+        if taken:
+            self._heap = kept
+            heapq.heapify(self._heap)
+        return taken
+
+    def _worker(self):
+        logger.info(f"{self.name} worker started")
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            self._execute(batch)
+        logger.info(f"{self.name} worker stopped")
+
+    def _claim(self, job: Job) -> bool:
+        """Mark a job as running; drop it if it was cancelled or its deadline passed."""
+        if job.cancelled.is_set() or not job.future.set_running_or_notify_cancel():
+            self.cancelled += 1
+            return False
+        if job.expired():
+            self.expired += 1
+            job.future.set_exception(DeadlineExceeded("Request deadline passed while queued",
+                                                      retry_after=self.retry_after()))
+            return False
+        return True
+
+    def _execute(self, batch: List[Job]):
+        jobs = [job for job in batch if self._claim(job)]
+        if not jobs:
+            return
+
+        started = time.monotonic()
+        for job in jobs:
+            self._waits.append(started - job.enqueued_at)
+        first = jobs[0]
+        self._running = first
+        try:
+            if first.batch_key is None:
+                results = [first.context.run(first.fn, *first.args, **first.kwargs)]
+            else:
+                _batch.jobs = jobs
+                try:
+                    results = first.context.run(first.fn, [job.args[0] for job in jobs], **first.kwargs)
+                finally:
+                    _batch.jobs = None
+                if len(results) != len(jobs):
+                    raise RuntimeError(f"Batch returned {len(results)} results for {len(jobs)} jobs")
+                self.batches += 1
+                self.batch_sizes[len(jobs)] = self.batch_sizes.get(len(jobs), 0) + 1
+                if len(jobs) > 1:
+                    logger.info(f"Ran batch of {len(jobs)} jobs")
+        except BaseException as e:
+            self.failed += len(jobs)
+            for job in jobs:
+                job.future.set_exception(e)
+        else:
+            self.completed += len(jobs)
+            for job, result in zip(jobs, results):
+                job.future.set_result(result)
+        finally:
+            self._running = None
+            self._service.append(time.monotonic() - started)
+
+    # ---- metrics ----
+
+    @staticmethod
+    def _percentile(samples, p: float) -> Optional[float]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 4)
+
+    def stats(self) -> dict:
+        waits = list(self._waits)
+        service = list(self._service)
+        return {
+            "depth": len(self._heap),
+            "depth_by_priority": {name: self.depth(name) for name in PRIORITIES},
+            "max_queue": self.max_queue,
+            "batch_queue_limit": self.batch_queue_limit,
+            "running": self._running is not None,
+            "running_priority": self._running.priority if self._running else None,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "cancelled": self.cancelled,
+            "wait_p50_seconds": self._percentile(waits, 0.50),
+            "wait_p95_seconds": self._percentile(waits, 0.95),
+            "service_mean_seconds": round(sum(service) / len(service), 4) if service else None,
+            "retry_after_seconds": self.retry_after(),
+            "max_batch_size": self.max_batch_size,
+            "max_batch_wait_ms": round(self.max_batch_wait * 1000, 1),
+            "batches": self.batches,
+            "mean_batch_size": round(sum(n * c for n, c in self.batch_sizes.items()) / self.batches, 2)
+            if self.batches else None,
+            "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+        }
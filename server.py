@@ -4,8 +4,11 @@ FastAPI backend compatible with the beautiful Mac01 UI, using MLX for inference
 """
 import os
 import sys
-import io
-import gc
+import math
+import random
+import functools
+import time
+import asyncio
 import base64
 import logging
 import warnings
@@ -18,19 +21,40 @@ os.environ["TOKENIZERS_PARALLELISM"] = "false"
 warnings.filterwarnings("ignore", category=UserWarning)
 warnings.filterwarnings("ignore", category=FutureWarning)
 
-from fastapi import FastAPI, HTTPException, Response, UploadFile, File
+from fastapi import FastAPI, HTTPException, Request, Response, UploadFile, File, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
 import re
-import json as json_module
 from pydantic import BaseModel, Field
 import numpy as np
 
+from engine import GENERATE_DEFAULTS, GenerationEngine, get_backend, to_pcm16, pcm16_to_wav_bytes
+from model_pool import ModelPool, LatencyTracker, budget_from_env
+from prompt_cache import PromptFeatureCache
+from voice_registry import VoiceRegistry
+from streaming import ChunkPipeline, WebSocketFormat, abort_on_error, get_stream_format, stream_lookahead
+from audio_formats import ENCODERS as AUDIO_ENCODERS, encode_audio
+from artifacts import ArtifactStore, etag_matches
+from scheduler import InferenceScheduler, SchedulerError, QueueFull, PRIORITIES, for_each_job, run_in_job
+from result_cache import ResultCache, result_key
+from longform import LongformRenderer, derive_seed
+from jobs import JobStore, JobRunner, parse_rows
+from metrics import MetricsMiddleware, registry as metrics_registry, stage, set_model, record_stage, record_generation
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from tracing import TracingMiddleware, exporter as trace_exporter, span
+from warmup import Warmup
+from audio_ingest import ReferenceAudioCache, AudioDecodeError, normalize_audio
+from asr import Transcriber, ASR_SAMPLE_RATE, get_backend as get_asr_backend, whisper_repo
+from lifecycle import Lifecycle, DrainMiddleware, serve
+
+# Model backend: "mlx" for real inference, "fake" for benchmarking without MLX
+TTS_BACKEND = os.environ.get("QWEN_TTS_BACKEND", "mlx")
+
 try:
-    import mlx.core as mx
-    from mlx_audio.tts.utils import load_model
-    from mlx_audio.tts.generate import generate_audio
+    engine = GenerationEngine(get_backend(TTS_BACKEND))
 except ImportError:
     print("Error: 'mlx_audio' library not found.")
     print("Please run the install script first.")
@@ -46,11 +70,106 @@ logger = logging.getLogger(__name__)
 # Configuration
 BASE_DIR = Path(__file__).parent
 MODELS_DIR = BASE_DIR / "models"
-VOICES_DIR = BASE_DIR / "voices"
-OUTPUTS_DIR = BASE_DIR / "outputs"
+VOICES_DIR = Path(os.environ.get("QWEN_TTS_VOICES_DIR", BASE_DIR / "voices"))
+OUTPUTS_DIR = Path(os.environ.get("QWEN_TTS_OUTPUTS_DIR", BASE_DIR / "outputs"))
 STATIC_DIR = BASE_DIR / "static"
 SAMPLE_RATE = 24000
 
+# Number of chunks the stream endpoints generate ahead of what has been sent
+STREAM_LOOKAHEAD = stream_lookahead(os.environ.get("QWEN_TTS_STREAM_LOOKAHEAD"))
+
+# Memory budget (GB) for models kept resident at the same time
+MODEL_MEMORY_BUDGET = budget_from_env(os.environ.get("QWEN_TTS_MODEL_BUDGET_GB"), 8.0)
+
+# Inference queue: jobs waiting for the model worker, and the default deadline (seconds) per request
+QUEUE_SIZE = int(os.environ.get("QWEN_TTS_QUEUE_SIZE", "32"))
+REQUEST_TIMEOUT = float(os.environ.get("QWEN_TTS_REQUEST_TIMEOUT", "300"))
+
+# Dynamic batching of short custom-voice / voice-design requests that share a model and voice.
+# Off by default for backends that would only loop over the batch.
+MAX_BATCH_SIZE = int(os.environ.get("QWEN_TTS_MAX_BATCH_SIZE", "8" if engine.backend.supports_batching else "1"))
+MAX_BATCH_WAIT_MS = float(os.environ.get("QWEN_TTS_MAX_BATCH_WAIT_MS", "20"))
+BATCH_MAX_CHARS = int(os.environ.get("QWEN_TTS_BATCH_MAX_CHARS", "300"))
+
+# Worker processes (each with its own model) for long-form stream renders
+LONGFORM_WORKERS = int(os.environ.get("QWEN_TTS_LONGFORM_WORKERS", "2"))
+
+# Cache of generated audio for seeded requests (memory LRU + outputs/cache on disk)
+RESULT_CACHE_ENABLED = os.environ.get("QWEN_TTS_RESULT_CACHE", "1").lower() not in ("0", "false", "no", "off")
+
+# Bulk jobs: how many run at once, rows in flight per job, and rows accepted per submission
+MAX_CONCURRENT_JOBS = int(os.environ.get("QWEN_TTS_MAX_CONCURRENT_JOBS", "1"))
+JOB_CONCURRENCY = int(os.environ.get("QWEN_TTS_JOB_CONCURRENCY", "4"))
+JOB_MAX_ROWS = int(os.environ.get("QWEN_TTS_JOB_MAX_ROWS", "100000"))
+
+# Per-request sampling profiles (?profile=1 or X-Profile: 1), stored in outputs/profiles/; off unless enabled
+PROFILING_ENABLED = os.environ.get("QWEN_TTS_PROFILING", "0").lower() in ("1", "true", "yes", "on")
+PROFILE_INTERVAL_MS = float(os.environ.get("QWEN_TTS_PROFILE_INTERVAL_MS", "5"))
+PROFILE_KEEP = int(os.environ.get("QWEN_TTS_PROFILE_KEEP", "100"))
+
+# Reference transcription: "mlx" (mlx-whisper) or "fake"; model is a Whisper size or a Hugging Face repo
+ASR_BACKEND = os.environ.get("QWEN_TTS_ASR_BACKEND", "fake" if TTS_BACKEND == "fake" else "mlx")
+ASR_MODEL = whisper_repo(os.environ.get("QWEN_TTS_ASR_MODEL", "tiny"))
+ASR_CACHE_ENTRIES = int(os.environ.get("QWEN_TTS_ASR_CACHE_ENTRIES", "512"))
+ASR_MAX_BATCH = int(os.environ.get("QWEN_TTS_ASR_MAX_BATCH", "64"))
+
+# Models to load and run once in the background at start-up, e.g. "custom_voice_lite,base_lite"
+# ("asr" preloads the transcription model)
+WARMUP_MODELS = [key.strip() for key in os.environ.get("QWEN_TTS_WARMUP", "").split(",") if key.strip()]
+WARMUP_TEXT = os.environ.get("QWEN_TTS_WARMUP_TEXT", "Hello.")
+
+# Graceful shutdown: seconds SIGTERM waits for in-flight requests and streams before closing them
+DRAIN_TIMEOUT = float(os.environ.get("QWEN_TTS_DRAIN_TIMEOUT", "300"))
+# /ready reports not ready while the inference queue is at least this full
+READY_QUEUE_FRACTION = float(os.environ.get("QWEN_TTS_READY_QUEUE_FRACTION", "0.8"))
+
+# Generations saved with "artifact": true, served from outputs/artifacts/ by ID
+ARTIFACT_DISK_MB = float(os.environ.get("QWEN_TTS_ARTIFACT_DISK_MB", "4096"))
+ARTIFACT_TTL_HOURS = float(os.environ.get("QWEN_TTS_ARTIFACT_TTL_HOURS", "168"))
+
+
+# Normalized (24 kHz mono) reference audio of clone requests, keyed by content hash
+reference_audio = ReferenceAudioCache(
+    max_bytes=int(float(os.environ.get("QWEN_TTS_REFERENCE_CACHE_MB", "64")) * 1024 ** 2),
+    target_sr=SAMPLE_RATE,
+)
+
+# Speaker features of ad-hoc clone references per model, keyed by the same content hash (memory only)
+reference_features = PromptFeatureCache(
+    None,
+    max_entries=int(os.environ.get("QWEN_TTS_REFERENCE_FEATURE_ENTRIES", "64")),
+    max_bytes=int(float(os.environ.get("QWEN_TTS_REFERENCE_FEATURE_MB", "128")) * 1024 ** 2),
+)
+
+
+# Resident Whisper model for reference transcripts; the TTS server runs without it if it is not installed
+try:
+    transcriber = Transcriber(get_asr_backend(ASR_BACKEND), ASR_MODEL, cache_entries=ASR_CACHE_ENTRIES)
+except ImportError as e:
+    logger.warning(f"Transcription disabled: {e}")
+    transcriber = None
+
+
+def ingest_reference(audio_bytes: bytes):
+    """Decode reference audio in memory to the models' 24 kHz mono float32 (cached by content hash).
+
+    Returns the content hash and the audio.
+    """
+    with stage("reference_decode"):
+        try:
+            return reference_audio.ingest(audio_bytes)
+        except AudioDecodeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
+def get_reference_features(digest: str, audio: np.ndarray, ref_text: Optional[str], model, model_key: str):
+    """Speaker features of an ad-hoc clone reference, extracted once per model and reused by repeat requests."""
+    def compute():
+        logger.info(f"Computing reference features for ad-hoc reference {digest[:12]} ({model_key})")
+        return engine.extract_prompt_features(model, audio, ref_text)
+
+    return reference_features.get_or_compute(digest, model_key, compute)
+
 
 def ensure_wav_bytes(audio_bytes: bytes) -> bytes:
     """Convert any audio format (MP3, M4A, etc.) to proper PCM WAV bytes.
@@ -62,25 +181,9 @@ def ensure_wav_bytes(audio_bytes: bytes) -> bytes:
         return audio_bytes
 
     logger.info("Converting non-WAV audio to WAV format")
-    import tempfile
-    import soundfile as sf
-    import librosa
-
-    # Write original bytes to temp file for librosa to decode
-    with tempfile.NamedTemporaryFile(suffix=".audio", delete=False) as tmp_in:
-        tmp_in.write(audio_bytes)
-        tmp_in_path = tmp_in.name
-
-    try:
-        y, sr = librosa.load(tmp_in_path, sr=None, mono=False)
-        # Write as proper WAV
-        wav_buffer = io.BytesIO()
-        sf.write(wav_buffer, y.T if y.ndim > 1 else y, sr, format="WAV", subtype="PCM_16")
-        wav_buffer.seek(0)
-        return wav_buffer.read()
-    finally:
-        if os.path.exists(tmp_in_path):
-            os.unlink(tmp_in_path)
+    _, audio = ingest_reference(audio_bytes)
+    with stage("wav_encode"):
+        return pcm16_to_wav_bytes(to_pcm16(audio), SAMPLE_RATE)
 
 # Model paths mapping
 MODEL_PATHS = {
@@ -92,9 +195,37 @@ MODEL_PATHS = {
     "base_lite": "Qwen3-TTS-12Hz-0.6B-Base-8bit",
 }
 
-# Global model cache
-loaded_models = {}
-current_model_type = None
+# Model tiers, in the order tried when a request does not choose one
+MODEL_SIZES = ["lite", "pro"]
+
+# Resident models, evicted least-recently-used when over the memory budget
+model_pool = ModelPool(engine.load, MODEL_MEMORY_BUDGET)
+model_latency = LatencyTracker()
+ttfa_latency = LatencyTracker()
+
+# Generated audio keyed on model, text, voice, instruct, speed and seed
+result_cache = ResultCache(
+    OUTPUTS_DIR / "cache",
+    max_memory_bytes=int(float(os.environ.get("QWEN_TTS_RESULT_CACHE_MB", "128")) * 1024 ** 2),
+    max_disk_bytes=int(float(os.environ.get("QWEN_TTS_RESULT_CACHE_DISK_MB", "1024")) * 1024 ** 2),
+)
+
+# Persisted generations, removed after ARTIFACT_TTL_HOURS (0 keeps them) or oldest first past the disk limit
+artifact_store = ArtifactStore(
+    OUTPUTS_DIR / "artifacts",
+    max_bytes=int(ARTIFACT_DISK_MB * 1024 ** 2),
+    ttl_seconds=ARTIFACT_TTL_HOURS * 3600 or None,
+)
+
+# Parallel renderer for long-form streams; processes start on first use
+longform_renderer = LongformRenderer(TTS_BACKEND, workers=LONGFORM_WORKERS, model_pool=model_pool)
+
+# Single worker that owns the device; every model call goes through its queue
+scheduler = InferenceScheduler(
+    max_queue=QUEUE_SIZE,
+    max_batch_size=MAX_BATCH_SIZE,
+    max_batch_wait=MAX_BATCH_WAIT_MS / 1000,
+)
 
 
 def get_model_path(folder_name: str) -> Optional[Path]:
@@ -112,32 +243,40 @@ def get_model_path(folder_name: str) -> Optional[Path]:
     return full_path
 
 
-def get_available_model(model_type: str):
-    """Get the best available model (prefer lite for speed, fall back to pro)."""
-    global loaded_models, current_model_type
+def resolve_model_key(model_type: str, model_size: Optional[str] = None) -> str:
+    """Pick the model key for a request: the requested tier, or lite then pro."""
+    if model_size is not None and model_size not in MODEL_SIZES:
+        raise HTTPException(status_code=400, detail=f"Invalid model_size '{model_size}'. Choose from: {', '.join(MODEL_SIZES)}")
 
-    # Check if we need to switch models
-    if current_model_type != model_type:
-        # Clear previous models to save memory
-        loaded_models.clear()
-        gc.collect()
-        current_model_type = model_type
+    for size in ([model_size] if model_size else MODEL_SIZES):
+        key = f"{model_type}_{size}"
+        if key in MODEL_PATHS and get_model_path(MODEL_PATHS[key]):
+            return key
 
-    if model_type in loaded_models:
-        return loaded_models[model_type]
+    if model_size:
+        raise HTTPException(status_code=404, detail=f"No {model_type} {model_size} model found. Please download the {model_size} models.")
+    raise HTTPException(status_code=500, detail=f"No {model_type} model found. Please run the install script.")
 
-    # Try lite first (faster), then pro
-    for suffix in ["_lite", "_pro"]:
-        key = f"{model_type}{suffix}"
-        if key in MODEL_PATHS:
-            model_path = get_model_path(MODEL_PATHS[key])
-            if model_path:
-                logger.info(f"Loading model from {model_path}")
-                model = load_model(str(model_path))
-                loaded_models[model_type] = model
-                return model
 
-    raise HTTPException(status_code=500, detail=f"No {model_type} model found. Please run the install script.")
+def get_available_model(model_type: str, model_size: Optional[str] = None):
+    """Get the model for the requested tier (default: prefer lite for speed, fall back to pro).
+
+    Returns the model and its key, e.g. "base_lite".
+    """
+    key = resolve_model_key(model_type, model_size)
+    return load_model(key), key
+
+
+def load_model(model_key: str):
+    """Model for a resolved key, loaded through the pool."""
+    set_model(model_key, model_tier(model_key))
+    with stage("model_cached" if model_pool.is_loaded(model_key) else "model_load"):
+        return model_pool.get(model_key, get_model_path(MODEL_PATHS[model_key]))
+
+
+def model_tier(model_key: str) -> str:
+    """Tier name ("lite" or "pro") of a model key."""
+    return model_key.rsplit("_", 1)[-1]
 
 
 # Pydantic models for API
@@ -147,7 +286,12 @@ class CustomVoiceRequest(BaseModel):
     speaker: str = "Vivian"
     instruct: str = ""
     speed: float = 1.0
-    response_format: str = "base64"
+    response_format: str = "base64"  # "base64" (WAV in JSON) or a file: "wav", "opus", "mp3", "flac", "mulaw"
+    artifact: bool = False  # Save the audio (WAV for base64) and return its artifact ID instead of the audio
+    model_size: Optional[str] = None  # "lite" or "pro"; default prefers lite
+    seed: Optional[int] = None  # Fixes sampling; seeded requests are served from the result cache
+    priority: str = "interactive"  # "interactive" or "batch" (served after interactive work)
+    deadline_seconds: Optional[float] = None  # Give up if not done in time; defaults to QWEN_TTS_REQUEST_TIMEOUT
 
 
 class VoiceDesignRequest(BaseModel):
@@ -155,7 +299,12 @@ class VoiceDesignRequest(BaseModel):
     language: str = "Auto"
     instruct: str
     speed: float = 1.0
-    response_format: str = "base64"
+    response_format: str = "base64"  # "base64" (WAV in JSON) or a file: "wav", "opus", "mp3", "flac", "mulaw"
+    artifact: bool = False  # Save the audio (WAV for base64) and return its artifact ID instead of the audio
+    model_size: Optional[str] = None  # "lite" or "pro"; default prefers lite
+    seed: Optional[int] = None  # Fixes sampling; seeded requests are served from the result cache
+    priority: str = "interactive"  # "interactive" or "batch" (served after interactive work)
+    deadline_seconds: Optional[float] = None  # Give up if not done in time; defaults to QWEN_TTS_REQUEST_TIMEOUT
 
 
 class VoiceCloneRequest(BaseModel):
@@ -166,7 +315,11 @@ class VoiceCloneRequest(BaseModel):
     ref_text: Optional[str] = None
     x_vector_only_mode: bool = False
     speed: float = 1.0
-    response_format: str = "base64"
+    response_format: str = "base64"  # "base64" (WAV in JSON) or a file: "wav", "opus", "mp3", "flac", "mulaw"
+    artifact: bool = False  # Save the audio (WAV for base64) and return its artifact ID instead of the audio
+    model_size: Optional[str] = None  # "lite" or "pro"; default prefers lite
+    priority: str = "interactive"  # "interactive" or "batch" (served after interactive work)
+    deadline_seconds: Optional[float] = None  # Give up if not done in time; defaults to QWEN_TTS_REQUEST_TIMEOUT
 
 
 class AudioResponse(BaseModel):
@@ -175,6 +328,16 @@ class AudioResponse(BaseModel):
     format: str = "wav"
 
 
+class ArtifactResponse(BaseModel):
+    artifact_id: str
+    url: str
+    format: str
+    media_type: str
+    bytes: int
+    duration: float
+    sample_rate: int = 24000
+
+
 class SpeakerInfo(BaseModel):
     name: str
     description: str
@@ -210,54 +373,251 @@ SUPPORTED_LANGUAGES = [
 
 def numpy_to_wav_bytes(audio_data: np.ndarray, sample_rate: int) -> bytes:
     """Convert numpy array to WAV bytes."""
-    import wave
-
-    # Normalize and convert to int16
-    audio_data = np.clip(audio_data, -1.0, 1.0)
-    audio_int16 = (audio_data * 32767).astype(np.int16)
-
-    # Create WAV in memory
-    buffer = io.BytesIO()
-    with wave.open(buffer, 'wb') as wav_file:
-        wav_file.setnchannels(1)
-        wav_file.setsampwidth(2)
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(audio_int16.tobytes())
-
-    return buffer.getvalue()
+    with stage("wav_encode"):
+        return pcm16_to_wav_bytes(to_pcm16(audio_data), sample_rate)
 
 
 def numpy_to_base64(audio_data: np.ndarray, sample_rate: int) -> str:
     """Convert numpy array to base64 encoded WAV."""
     wav_bytes = numpy_to_wav_bytes(audio_data, sample_rate)
-    return base64.b64encode(wav_bytes).decode('utf-8')
+    with stage("base64_encode"):
+        return base64.b64encode(wav_bytes).decode('utf-8')
+
+
+def generate_in_memory(model, model_key: str, **kwargs):
+    """Generate audio using MLX and return the waveform without writing files."""
+    text = kwargs.pop("text")
+    start = time.perf_counter()
+    with stage("inference"):
+        audio_data, sr = engine.generate(model, text, **kwargs)
+    elapsed = time.perf_counter() - start
+    model_latency.record(model_key, elapsed, len(audio_data) / sr)
+    record_generation(model_key, model_tier(model_key), elapsed, len(audio_data) / sr)
+    return audio_data, sr
 
 
-def generate_with_temp_dir(model, **kwargs):
-    """Generate audio using MLX and return the audio data."""
-    import shutil
-    import time
+def generate_batch_in_memory(texts: List[str], model_key: str, **kwargs):
+    """Generate several texts that share a model and voice settings in one batched call.
 
-    temp_dir = f"temp_{int(time.time() * 1000)}"
-    os.makedirs(temp_dir, exist_ok=True)
+    Model labels, stage timings and generation metrics are recorded for
+    every request in the batch, not just the one whose context runs it.
+    """
+    for_each_job(set_model, model_key, model_tier(model_key))
+    loaded = model_pool.is_loaded(model_key)
+    start_ns = time.time_ns()
+    model = model_pool.get(model_key, get_model_path(MODEL_PATHS[model_key]))
+    for_each_job(record_stage, "model_cached" if loaded else "model_load", start_ns, time.time_ns())
 
+    start_ns = time.time_ns()
     try:
-        generate_audio(model=model, output_path=temp_dir, **kwargs)
-
-        # Read the generated audio
-        output_file = os.path.join(temp_dir, "audio_000.wav")
-        if os.path.exists(output_file):
-            import wave
-            with wave.open(output_file, 'rb') as wav_file:
-                frames = wav_file.readframes(wav_file.getnframes())
-                sample_rate = wav_file.getframerate()
-                audio_data = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32767.0
-                return audio_data, sample_rate
-
-        raise Exception("Audio generation failed - no output file")
+        results = engine.generate_batch(model, texts, **kwargs)
     finally:
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir, ignore_errors=True)
+        end_ns = time.time_ns()
+        for_each_job(record_stage, "inference", start_ns, end_ns)
+    elapsed = (end_ns - start_ns) / 1e9
+    for index, (audio_data, sr) in enumerate(results):
+        model_latency.record(model_key, elapsed, len(audio_data) / sr)
+        run_in_job(index, record_generation, model_key, model_tier(model_key), elapsed, len(audio_data) / sr)
+    return results
+
+
+def scheduler_http_error(e: SchedulerError) -> HTTPException:
+    """Map a rejected or expired job to 429 (queue full) or 503, with a Retry-After hint."""
+    return HTTPException(
+        status_code=429 if isinstance(e, QueueFull) else 503,
+        detail=str(e),
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
+
+
+def check_response_format(response_format: str):
+    if response_format != "base64" and response_format not in AUDIO_ENCODERS:
+        raise HTTPException(status_code=400, detail=f"Invalid response_format '{response_format}'. "
+                                                    f"Choose from: base64, {', '.join(AUDIO_ENCODERS)}")
+
+
+def encode_output(audio_data: np.ndarray, sample_rate: int, response_format: str) -> bytes:
+    if response_format == "wav":
+        return numpy_to_wav_bytes(audio_data, sample_rate)
+    with stage("audio_encode"):
+        return encode_audio(audio_data, sample_rate, response_format)
+
+
+def save_artifact(audio_data: np.ndarray, sample_rate: int, response_format: str, filename: str) -> dict:
+    encoder = AUDIO_ENCODERS[response_format]
+    content = encode_output(audio_data, sample_rate, response_format)
+    with stage("artifact_write"):
+        return artifact_store.create(content, encoder.extension, encoder.media_type, filename,
+                                     duration=round(len(audio_data) / sample_rate, 3))
+
+
+async def audio_response(request, audio_data: np.ndarray, sample_rate: int, filename: str):
+    """The generated audio as base64 WAV in JSON, as a file in the requested format, or saved as an artifact.
+
+    Encoding runs in the thread pool, so long outputs do not stall the event loop.
+    """
+    if request.artifact:
+        response_format = "wav" if request.response_format == "base64" else request.response_format
+        artifact = await run_in_threadpool(save_artifact, audio_data, sample_rate, response_format, filename)
+        return ArtifactResponse(
+            artifact_id=artifact["id"],
+            url=f"/api/v1/artifacts/{artifact['id']}",
+            format=response_format,
+            media_type=artifact["media_type"],
+            bytes=artifact["bytes"],
+            duration=artifact["duration"],
+            sample_rate=sample_rate,
+        )
+    if request.response_format == "base64":
+        return AudioResponse(
+            audio=await run_in_threadpool(numpy_to_base64, audio_data, sample_rate),
+            sample_rate=sample_rate,
+            format="wav"
+        )
+    encoder = AUDIO_ENCODERS[request.response_format]
+    content = await run_in_threadpool(encode_output, audio_data, sample_rate, request.response_format)
+    return Response(
+        content=content,
+        media_type=encoder.media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}.{encoder.extension}"}
+    )
+
+
+def check_priority(priority: str):
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"Invalid priority '{priority}'. Choose from: {', '.join(PRIORITIES)}")
+
+
+def request_timeout(request) -> float:
+    return request.deadline_seconds or REQUEST_TIMEOUT
+
+
+async def run_model_job(request, http_request: Optional[Request], fn, *args, **kwargs):
+    """Run model work on the scheduler worker with the request's priority and deadline.
+
+    The job is dropped if the client disconnects while it is queued.
+    """
+    check_priority(request.priority)
+    try:
+        with span("scheduler.job", priority=request.priority):
+            return await scheduler.run(
+                fn, *args,
+                priority=request.priority,
+                timeout=request_timeout(request),
+                is_disconnected=http_request.is_disconnected if http_request is not None else None,
+                **kwargs,
+            )
+    except SchedulerError as e:
+        raise scheduler_http_error(e)
+
+
+def result_cache_key(text: str, seed: Optional[int], model_key: str, **parts) -> Optional[str]:
+    """Result cache key for generating text, or None when the output is not reproducible.
+
+    Sampling is random unless the request fixes a seed, so unseeded requests
+    bypass the cache.
+    """
+    if not RESULT_CACHE_ENABLED:
+        return None
+    if seed is None:
+        result_cache.record_bypass()
+        return None
+    return result_key(
+        backend=TTS_BACKEND,
+        model=MODEL_PATHS[model_key],
+        text=text,
+        seed=seed,
+        defaults=GENERATE_DEFAULTS,
+        **parts,
+    )
+
+
+def generation_job(model_type: str, model_key: str, text: str, seed: Optional[int], **kwargs):
+    """Scheduler job (fn, args, submit options) that generates text with a preset-voice model.
+
+    Short unseeded texts become batchable jobs keyed by model and voice
+    settings, so concurrent requests for the same voice share one forward
+    pass. Seeded requests run alone so their output is reproducible.
+    """
+    if seed is None and scheduler.max_batch_size > 1 and len(text) <= BATCH_MAX_CHARS:
+        batch_key = (model_key,) + tuple(sorted(kwargs.items()))
+        return generate_batch_in_memory, (text,), dict(batch_key=batch_key, model_key=model_key, **kwargs)
+
+    def synthesize():
+        model = load_model(model_key)
+        engine.seed(seed)
+        return generate_in_memory(model, model_key, text=text, **kwargs)
+
+    return synthesize, (), {}
+
+
+def prompt_generation_job(prompt_id: str, prompt_data: dict, model_key: str, text: str, seed: Optional[int]):
+    """Scheduler job (fn, args, submit options) that generates text with a saved voice prompt."""
+    def synthesize():
+        model = load_model(model_key)
+        features = get_prompt_features(prompt_id, prompt_data, model, model_key)
+        engine.seed(seed)
+        return generate_in_memory(
+            model,
+            model_key,
+            text=text,
+            voice_prompt=features,
+            ref_text=prompt_data["ref_text"] or ".",
+        )
+
+    return synthesize, (), {}
+
+
+async def cached_generation(request, http_request: Optional[Request], model_key: str, job, **key_parts):
+    """Serve request.text from the result cache, or run the job on the worker and cache the audio."""
+    check_response_format(request.response_format)
+    set_model(model_key, model_tier(model_key))
+    key = result_cache_key(request.text, request.seed, model_key, **key_parts)
+    if key is not None:
+        with span("result_cache.lookup") as lookup:
+            cached = await run_in_threadpool(result_cache.get, key)
+            lookup.set(hit=cached is not None)
+        if cached is not None:
+            logger.info(f"Result cache hit for {model_key}: {len(request.text)} chars")
+            return cached
+
+    fn, args, options = job
+    audio_data, sr = await run_model_job(request, http_request, fn, *args, **options)
+    if key is not None:
+        await run_in_threadpool(result_cache.put, key, audio_data, sr)
+    return audio_data, sr
+
+
+def cached_generation_sync(text: str, seed: Optional[int], model_key: str, job, priority: str = "batch",
+                           timeout: Optional[float] = None, cancel=None, **key_parts):
+    """Blocking cached_generation for background threads such as bulk jobs."""
+    key = result_cache_key(text, seed, model_key, **key_parts)
+    if key is not None:
+        cached = result_cache.get(key)
+        if cached is not None:
+            return cached
+
+    fn, args, options = job
+    audio_data, sr = scheduler.call(fn, *args, priority=priority, timeout=timeout, cancel=cancel, **options)
+    if key is not None:
+        result_cache.put(key, audio_data, sr)
+    return audio_data, sr
+
+
+async def run_generation(request, http_request: Optional[Request], model_type: str, **kwargs):
+    """Generate request.text on the scheduler worker, through the result cache."""
+    model_key = resolve_model_key(model_type, request.model_size)
+    job = generation_job(model_type, model_key, request.text, request.seed, **kwargs)
+    return await cached_generation(request, http_request, model_key, job, mode=model_type, **kwargs)
+
+
+def admit_stream(request):
+    """Reject a stream request up front (before the response starts) when the queue is full."""
+    check_priority(request.priority)
+    try:
+        scheduler.check_capacity(request.priority)
+    except SchedulerError as e:
+        raise scheduler_http_error(e)
 
 
 def chunk_text(text: str, max_chunk_size: int = 500) -> List[str]:
@@ -308,6 +668,222 @@ def chunk_text(text: str, max_chunk_size: int = 500) -> List[str]:
     return chunks
 
 
+def generate_seeded_chunk(model, model_key: str, chunk: str, seed: Optional[int], **kwargs):
+    """Generate one text chunk, reseeding first for a consistent voice across chunks."""
+    engine.seed(seed)
+    return generate_in_memory(model, model_key, text=chunk, **kwargs)
+
+
+def seeded_chunks(prepared, model_key: str, seed: Optional[int]):
+    """Generate function for chunked streams, using the lazily prepared model and kwargs."""
+    def generate_chunk(chunk: str):
+        model, kwargs = prepared()
+        return generate_seeded_chunk(model, model_key, chunk, seed, **kwargs)
+
+    return generate_chunk
+
+
+def stream_chunk_key(request, model_key: str, **parts):
+    """Per-chunk result cache key function for a stream request.
+
+    Chunks share the voice, seed and model context of the request, so an
+    edited document only regenerates the chunks whose text changed.
+    """
+    if request.longform:
+        # Long-form chunks are generated with their own seed derived from the request seed
+        return lambda chunk: result_cache_key(
+            chunk, derive_seed(request.seed, chunk) if request.seed is not None else None, model_key, **parts)
+    return lambda chunk: result_cache_key(chunk, request.seed, model_key, **parts)
+
+
+def longform_chunks(prepared, model_key: str, request):
+    """Chunk renderer for long-form stream requests (None otherwise).
+
+    Reference features are prepared once on the scheduler worker and shipped
+    to the pool with every chunk.
+    """
+    if not request.longform:
+        return None
+    seed = request.seed if request.seed is not None else random.randrange(2 ** 31)
+
+    def render(texts: List[str]):
+        _, kwargs = scheduler.call(prepared, priority=request.priority, timeout=request_timeout(request))
+        yield from longform_renderer.render(get_model_path(MODEL_PATHS[model_key]), texts, seed, **kwargs)
+
+    return render
+
+
+def stream_mode(request) -> str:
+    if request.longform:
+        return "longform"
+    return "incremental" if request.incremental else "chunked"
+
+
+def incremental_stream(prepared, model_key: str, request):
+    """Per-chunk segment generator for incremental stream requests (None in chunked mode).
+
+    prepared() returns the model and generation kwargs shared by all chunks.
+    """
+    if not request.incremental or request.longform:
+        return None
+
+    def stream_chunk(chunk: str):
+        model, kwargs = prepared()
+        engine.seed(request.seed)
+        chunk_start = time.perf_counter()
+        audio_seconds = 0.0
+        for audio_data, sr in engine.stream(model, chunk, interval=request.segment_seconds, **kwargs):
+            audio_seconds += len(audio_data) / sr
+            yield audio_data, sr
+        model_latency.record(model_key, time.perf_counter() - chunk_start, audio_seconds)
+
+    return stream_chunk
+
+
+def chunk_pipeline(chunks: List[str], generate_chunk, started: float, fmt, stream_chunk=None,
+                   priority: str = "interactive", timeout: Optional[float] = None,
+                   chunk_key=None, render_chunks=None) -> ChunkPipeline:
+    """Pipeline that generates chunks ahead while earlier ones are encoded in the stream format and sent.
+
+    With stream_chunk, each text chunk is synthesized incrementally and every
+    decoded segment is sent as its own event. Events carry the time to first
+    audio, measured from `started` (when the request arrived). Each chunk is
+    a separate scheduler job, so other requests can interleave between chunks.
+
+    With render_chunks, all uncached chunks are handed to it at once (the
+    long-form process pool) and come back in order.
+
+    With chunk_key, chunks found in the result cache are sent straight away
+    without touching the model, and newly generated chunks are cached.
+    """
+    total_chunks = len(chunks)
+    timing = {"first_audio": None}
+
+    def cached_chunk(chunk: str):
+        key = chunk_key(chunk) if chunk_key is not None else None
+        return key, (result_cache.get(key) if key is not None else None)
+
+    if render_chunks is not None:
+        def rendered():
+            lookups = [cached_chunk(chunk) for chunk in chunks]
+            results = render_chunks([chunk for chunk, (_, cached) in zip(chunks, lookups) if cached is None])
+            for i, (chunk, (key, cached)) in enumerate(zip(chunks, lookups)):
+                if cached is not None:
+                    yield i, chunk, cached, True
+                    continue
+                audio_data, sr = next(results)
+                if key is not None:
+                    result_cache.put(key, audio_data, sr)
+                logger.info(f"Rendered chunk {i+1}/{total_chunks}")
+                yield i, chunk, (audio_data, sr), False
+
+        items = rendered()
+
+        def produce(i: int, item):
+            return item
+    elif stream_chunk is None:
+        items = chunks
+
+        def produce(i: int, chunk: str):
+            key, cached = cached_chunk(chunk)
+            if cached is not None:
+                logger.info(f"Chunk {i+1}/{total_chunks} served from cache")
+                return i, chunk, cached, True
+            logger.info(f"Generating chunk {i+1}/{total_chunks}: {len(chunk)} chars")
+            with span("stream.chunk", chunk_index=i, chars=len(chunk)):
+                audio_data, sr = scheduler.call(generate_chunk, chunk, priority=priority, timeout=timeout,
+                                                cancel=pipeline.stopped)
+            if key is not None:
+                result_cache.put(key, audio_data, sr)
+            return i, chunk, (audio_data, sr), False
+    else:
+        def segments():
+            for i, chunk in enumerate(chunks):
+                key, cached = cached_chunk(chunk)
+                if cached is not None:
+                    logger.info(f"Chunk {i+1}/{total_chunks} served from cache")
+                    yield i, chunk, cached, True
+                    continue
+
+                logger.info(f"Streaming chunk {i+1}/{total_chunks}: {len(chunk)} chars")
+                text = chunk
+                pieces = []
+                for segment in scheduler.iterate(stream_chunk, chunk, priority=priority, timeout=timeout,
+                                                 cancel=pipeline.stopped):
+                    pieces.append(segment[0])
+                    yield i, text, segment, False
+                    text = ""
+                if key is not None and pieces:
+                    result_cache.put(key, np.concatenate(pieces), segment[1])
+
+        items = segments()
+
+        def produce(i: int, item):
+            return item
+
+    def encode(i: int, item, result) -> str:
+        text_index, text, (audio_data, sr), cached = result
+        elapsed = time.perf_counter() - started
+        if timing["first_audio"] is None:
+            timing["first_audio"] = elapsed
+            ttfa_latency.record("stream", elapsed, 0.0)
+            logger.info(f"Time to first audio: {elapsed * 1000:.0f}ms")
+        chunk_meta = {
+            'type': 'chunk',
+            'chunk_index': i,
+            'total_chunks': total_chunks,
+            'text': text,
+            'time_to_first_audio_ms': round(timing["first_audio"] * 1000, 1),
+            'elapsed_ms': round(elapsed * 1000, 1),
+            'cached': cached,
+        }
+        if stream_chunk is not None:
+            chunk_meta['text_chunk_index'] = text_index
+        logger.info(f"Sending chunk {i+1}/{total_chunks if stream_chunk is None else '?'}")
+        with stage("stream_encode"):
+            return fmt.chunk(chunk_meta, audio_data, sr)
+
+    pipeline = ChunkPipeline(items, produce, encode, lookahead=STREAM_LOOKAHEAD)
+    return pipeline
+
+
+# Voice settings for the dummy generation of each model type
+WARMUP_VOICES = {
+    "custom_voice": dict(voice="Vivian", instruct="Normal tone"),
+    "voice_design": dict(instruct="A calm, clear voice."),
+    "base": dict(ref_audio=np.zeros(SAMPLE_RATE, dtype=np.float32), ref_text="."),
+}
+
+
+def warm_model(model_key: str):
+    """Load a model and generate a short text, so the first real request finds hot kernels."""
+    def run():
+        model = load_model(model_key)
+        with stage("warmup"):
+            engine.generate(model, WARMUP_TEXT, **WARMUP_VOICES[model_key.rsplit("_", 1)[0]])
+
+    # Batch priority: interactive requests that arrive meanwhile go first
+    scheduler.call(run, priority="batch", timeout=REQUEST_TIMEOUT)
+
+
+def build_warmup() -> Warmup:
+    warmup = Warmup()
+    warmup.add("index_voices", voice_registry.ensure_loaded)
+    for model_key in WARMUP_MODELS:
+        if model_key == "asr":
+            if transcriber is not None:
+                warmup.add("model:asr", lambda: scheduler.call(transcriber.load, priority="batch", timeout=REQUEST_TIMEOUT))
+            continue
+        if model_key not in MODEL_PATHS:
+            logger.warning(f"Ignoring unknown warm-up model '{model_key}'. Choose from: {', '.join(MODEL_PATHS)}")
+            continue
+        if get_model_path(MODEL_PATHS[model_key]) is None:
+            logger.warning(f"Ignoring warm-up model '{model_key}': not downloaded")
+            continue
+        warmup.add(f"model:{model_key}", functools.partial(warm_model, model_key))
+    return warmup
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
@@ -316,11 +892,34 @@ async def lifespan(app: FastAPI):
     # Create directories
     OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
     VOICES_DIR.mkdir(parents=True, exist_ok=True)
+    scheduler.start()
+    job_runner.start()
+    trace_exporter.start()
+    # Voice indexing and model warm-up run after the port is bound
+    warmup.start()
+    lifecycle.serving()
 
     yield
 
     logger.info("Shutting down Qwen3-TTS MLX API Server")
+    lifecycle.begin_drain()
+    job_runner.stop(timeout=5)
+    scheduler.stop(timeout=REQUEST_TIMEOUT)
+    longform_renderer.shutdown()
+    trace_exporter.stop()
+
+    # Release models and in-memory caches; cached results and prompt features stay on disk
+    model_pool.clear()
+    result_cache.clear(remove_files=False)
+    prompt_cache.clear(remove_files=False)
+    reference_audio.clear()
+    reference_features.clear()
+    lifecycle.stopped()
+    logger.info("Released models and caches")
+
 
+# Serving state and in-flight request count, for readiness and the SIGTERM drain
+lifecycle = Lifecycle()
 
 # Create FastAPI application
 app = FastAPI(
@@ -339,6 +938,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def route_name(scope: dict) -> str:
+    """Path template of the route a request matches, used as the endpoint metric label."""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "other")
+    return "other"
+
+
+# Request counts, response bytes and the per-request context for stage timings
+# Counts in-flight work for the shutdown drain and refuses new work once draining
+app.add_middleware(DrainMiddleware, lifecycle=lifecycle, exempt=("/health", "/health/models", "/ready", "/metrics"))
+
+app.add_middleware(MetricsMiddleware, endpoint_for=route_name)
+
+# Outermost: trace id and root span per request, opt-in profiling
+app.add_middleware(
+    TracingMiddleware,
+    endpoint_for=route_name,
+    profile_dir=OUTPUTS_DIR / "profiles",
+    allow_profiling=PROFILING_ENABLED,
+    profile_interval=PROFILE_INTERVAL_MS / 1000,
+    keep_profiles=PROFILE_KEEP,
+)
+
 # Mount static files
 if STATIC_DIR.exists():
     app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
@@ -348,35 +972,24 @@ if STATIC_DIR.exists():
 # ============= CustomVoice Endpoints =============
 
 @app.post("/api/v1/custom-voice/generate")
-async def generate_custom_voice(request: CustomVoiceRequest):
+async def generate_custom_voice(request: CustomVoiceRequest, http_request: Request):
     """Generate speech using CustomVoice model with preset speakers."""
     try:
         logger.info(f"Generating custom voice for speaker: {request.speaker}")
 
-        model = get_available_model("custom_voice")
-
-        audio_data, sr = generate_with_temp_dir(
-            model,
-            text=request.text,
+        audio_data, sr = await run_generation(
+            request,
+            http_request,
+            "custom_voice",
             voice=request.speaker,
             instruct=request.instruct or "Normal tone",
             speed=request.speed,
         )
 
-        if request.response_format == "base64":
-            return AudioResponse(
-                audio=numpy_to_base64(audio_data, sr),
-                sample_rate=sr,
-                format="wav"
-            )
-        else:
-            wav_bytes = numpy_to_wav_bytes(audio_data, sr)
-            return Response(
-                content=wav_bytes,
-                media_type="audio/wav",
-                headers={"Content-Disposition": f"attachment; filename=custom_voice_{request.speaker}.wav"}
-            )
+        return await audio_response(request, audio_data, sr, f"custom_voice_{request.speaker}")
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating custom voice: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -397,33 +1010,22 @@ async def list_languages():
 # ============= VoiceDesign Endpoints =============
 
 @app.post("/api/v1/voice-design/generate")
-async def generate_voice_design(request: VoiceDesignRequest):
+async def generate_voice_design(request: VoiceDesignRequest, http_request: Request):
     """Generate speech using VoiceDesign model with natural language voice description."""
     try:
         logger.info(f"Generating voice design with instruct: {request.instruct[:50]}...")
 
-        model = get_available_model("voice_design")
-
-        audio_data, sr = generate_with_temp_dir(
-            model,
-            text=request.text,
+        audio_data, sr = await run_generation(
+            request,
+            http_request,
+            "voice_design",
             instruct=request.instruct,
         )
 
-        if request.response_format == "base64":
-            return AudioResponse(
-                audio=numpy_to_base64(audio_data, sr),
-                sample_rate=sr,
-                format="wav"
-            )
-        else:
-            wav_bytes = numpy_to_wav_bytes(audio_data, sr)
-            return Response(
-                content=wav_bytes,
-                media_type="audio/wav",
-                headers={"Content-Disposition": "attachment; filename=voice_design.wav"}
-            )
+        return await audio_response(request, audio_data, sr, "voice_design")
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating voice design: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -432,7 +1034,7 @@ async def generate_voice_design(request: VoiceDesignRequest):
 # ============= Voice Clone (Base) Endpoints =============
 
 @app.post("/api/v1/base/clone")
-async def clone_voice(request: VoiceCloneRequest):
+async def clone_voice(request: VoiceCloneRequest, http_request: Request):
     """Generate speech using Base model with voice cloning from reference audio."""
     try:
         logger.info("Generating voice clone")
@@ -440,44 +1042,31 @@ async def clone_voice(request: VoiceCloneRequest):
         if not request.ref_audio_base64 and not request.ref_audio_url:
             raise HTTPException(status_code=400, detail="Either ref_audio_url or ref_audio_base64 must be provided")
 
-        model = get_available_model("base")
-
-        # Decode reference audio
-        ref_audio_path = None
-        temp_ref_file = None
+        check_response_format(request.response_format)
+        model_key = resolve_model_key("base", request.model_size)
+        set_model(model_key, model_tier(model_key))
 
+        # Decode off the inference worker; repeat references hit the decode and feature caches
+        reference = None
         if request.ref_audio_base64:
-            import tempfile
-            audio_bytes = ensure_wav_bytes(base64.b64decode(request.ref_audio_base64))
-            temp_ref_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-            temp_ref_file.write(audio_bytes)
-            temp_ref_file.close()
-            ref_audio_path = temp_ref_file.name
-
-        try:
-            audio_data, sr = generate_with_temp_dir(
+            reference = await run_in_threadpool(ingest_reference, base64.b64decode(request.ref_audio_base64))
+
+        def synthesize():
+            model = load_model(model_key)
+            features = None
+            if reference is not None:
+                features = get_reference_features(*reference, request.ref_text, model, model_key)
+            return generate_in_memory(
                 model,
+                model_key,
                 text=request.text,
-                ref_audio=ref_audio_path,
+                voice_prompt=features,
                 ref_text=request.ref_text or ".",
             )
 
-            if request.response_format == "base64":
-                return AudioResponse(
-                    audio=numpy_to_base64(audio_data, sr),
-                    sample_rate=sr,
-                    format="wav"
-                )
-            else:
-                wav_bytes = numpy_to_wav_bytes(audio_data, sr)
-                return Response(
-                    content=wav_bytes,
-                    media_type="audio/wav",
-                    headers={"Content-Disposition": "attachment; filename=voice_clone.wav"}
-                )
-        finally:
-            if temp_ref_file and os.path.exists(temp_ref_file.name):
-                os.unlink(temp_ref_file.name)
+        audio_data, sr = await run_model_job(request, http_request, synthesize)
+
+        return await audio_response(request, audio_data, sr, "voice_clone")
 
     except HTTPException:
         raise
@@ -495,94 +1084,90 @@ class StreamingVoiceCloneRequest(BaseModel):
     speed: float = 1.0
     chunk_size: int = 500  # Max characters per chunk
     seed: Optional[int] = None  # Random seed for consistent voice across chunks
+    model_size: Optional[str] = None  # "lite" or "pro"; default prefers lite
+    incremental: bool = False  # Emit sub-sentence audio segments while the model is still generating
+    segment_seconds: float = 0.25  # Audio decoded per segment in incremental mode
+    transport: str = "sse"  # "sse" (base64 audio in JSON), "pcm" (raw audio/L16), "framed" (binary frames) or "audio" (one audio file)
+    audio_format: Optional[str] = None  # "wav", "opus", "mp3", "flac" or "mulaw"; defaults to wav for sse, opus for audio
+    longform: bool = False  # Render chunks in parallel worker processes (audiobooks); ignores incremental
+    priority: str = "interactive"  # "interactive" or "batch" (served after interactive work)
+    deadline_seconds: Optional[float] = None  # Give up if not done in time; defaults to QWEN_TTS_REQUEST_TIMEOUT
 
 
-@app.post("/api/v1/base/clone/stream")
-async def clone_voice_stream(request: StreamingVoiceCloneRequest):
-    """Stream voice clone audio in chunks for real-time playback."""
+async def clone_stream_events(request: StreamingVoiceCloneRequest, fmt, started: float):
+    """Voice clone stream messages (start, audio chunks, done/error) in the given format."""
 
-    logger.info(f"Clone stream request received, text length: {len(request.text)}")
+    def prepare_reference():
+        """Decode the reference audio once and extract its features for every chunk.
 
-    def generate_chunks():
-        try:
-            logger.info("Clone stream generator started")
+        Runs on the worker with the first chunk that is not cached.
+        """
+        model = load_model(model_key)
+        logger.info("Model loaded for clone stream")
 
-            if not request.ref_audio_base64 and not request.ref_audio_url:
-                yield f"data: {json_module.dumps({'error': 'Either ref_audio_url or ref_audio_base64 must be provided'})}\n\n"
-                return
+        features = get_reference_features(digest, ref_audio, request.ref_text, model, model_key)
+        logger.info("Reference audio prepared")
+        return model, dict(voice_prompt=features, ref_text=request.ref_text or ".")
 
-            model = get_available_model("base")
-            logger.info("Model loaded for clone stream")
+    try:
+        logger.info("Clone stream generator started")
 
-            # Prepare reference audio
-            import tempfile
-            temp_ref_file = None
-            if request.ref_audio_base64:
-                audio_bytes = ensure_wav_bytes(base64.b64decode(request.ref_audio_base64))
-                temp_ref_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-                temp_ref_file.write(audio_bytes)
-                temp_ref_file.close()
-                ref_audio_path = temp_ref_file.name
-                logger.info(f"Reference audio prepared: {temp_ref_file.name}")
+        if not request.ref_audio_base64 and not request.ref_audio_url:
+            yield fmt.control({'type': 'error', 'error': 'Either ref_audio_url or ref_audio_base64 must be provided'})
+            return
+
+        model_key = resolve_model_key("base", request.model_size)
+        digest, ref_audio = await run_in_threadpool(ingest_reference, base64.b64decode(request.ref_audio_base64))
+        prepared = functools.lru_cache(maxsize=None)(prepare_reference)
+
+        # Chunk the text
+        chunks = chunk_text(request.text, request.chunk_size)
+        total_chunks = len(chunks)
+
+        logger.info(f"Streaming voice clone: {total_chunks} chunks from {len(request.text)} chars")
+
+        # Send initial metadata
+        yield fmt.control({'type': 'start', 'total_chunks': total_chunks, 'total_chars': len(request.text),
+                           'mode': stream_mode(request), 'setup_ms': round((time.perf_counter() - started) * 1000, 1)})
+
+        pipeline = chunk_pipeline(
+            chunks,
+            seeded_chunks(prepared, model_key, request.seed),
+            started,
+            fmt,
+            stream_chunk=incremental_stream(prepared, model_key, request),
+            render_chunks=longform_chunks(prepared, model_key, request),
+            priority=request.priority,
+            timeout=request_timeout(request),
+            chunk_key=stream_chunk_key(request, model_key, mode="clone",
+                                       ref_audio=digest, ref_text=request.ref_text),
+        )
+        async for message in pipeline:
+            yield message
 
-            try:
-                # Chunk the text
-                chunks = chunk_text(request.text, request.chunk_size)
-                total_chunks = len(chunks)
-
-                logger.info(f"Streaming voice clone: {total_chunks} chunks from {len(request.text)} chars")
-
-                # Send initial metadata
-                yield f"data: {json_module.dumps({'type': 'start', 'total_chunks': total_chunks, 'total_chars': len(request.text)})}\n\n"
-
-                for i, chunk_text_content in enumerate(chunks):
-                    logger.info(f"Generating chunk {i+1}/{total_chunks}: {len(chunk_text_content)} chars")
-
-                    # Set seed for consistent voice across chunks
-                    if request.seed is not None:
-                        mx.random.seed(request.seed)
-                        logger.info(f"Set random seed to {request.seed} for chunk {i+1}")
-
-                    # Generate audio for this chunk
-                    audio_data, sr = generate_with_temp_dir(
-                        model,
-                        text=chunk_text_content,
-                        ref_audio=ref_audio_path,
-                        ref_text=request.ref_text or ".",
-                    )
-
-                    # Convert to base64
-                    audio_base64 = numpy_to_base64(audio_data, sr)
-
-                    # Send chunk
-                    chunk_data = {
-                        'type': 'chunk',
-                        'chunk_index': i,
-                        'total_chunks': total_chunks,
-                        'audio': audio_base64,
-                        'sample_rate': sr,
-                        'text': chunk_text_content,
-                    }
-                    logger.info(f"Sending chunk {i+1}/{total_chunks}")
-                    yield f"data: {json_module.dumps(chunk_data)}\n\n"
-
-                # Send completion
-                logger.info("Sending done message")
-                yield f"data: {json_module.dumps({'type': 'done', 'total_chunks': total_chunks})}\n\n"
+        # Send completion
+        logger.info("Sending done message")
+        yield fmt.control({'type': 'done', 'total_chunks': total_chunks})
 
-            finally:
-                if temp_ref_file and os.path.exists(temp_ref_file.name):
-                    os.unlink(temp_ref_file.name)
+    except Exception as e:
+        import traceback
+        logger.error(f"Error in streaming voice clone: {e}")
+        logger.error(traceback.format_exc())
+        yield fmt.control({'type': 'error', 'error': str(e)})
 
-        except Exception as e:
-            import traceback
-            logger.error(f"Error in streaming voice clone: {e}")
-            logger.error(traceback.format_exc())
-            yield f"data: {json_module.dumps({'type': 'error', 'error': str(e)})}\n\n"
 
+def stream_format_for(request):
+    """HTTP stream format for a request's transport, or 400."""
+    try:
+        return get_stream_format(request.transport, request.audio_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def streaming_response(messages, fmt) -> StreamingResponse:
     return StreamingResponse(
-        generate_chunks(),
-        media_type="text/event-stream",
+        abort_on_error(messages, fmt),
+        media_type=fmt.media_type,
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
@@ -591,6 +1176,18 @@ async def clone_voice_stream(request: StreamingVoiceCloneRequest):
     )
 
 
+@app.post("/api/v1/base/clone/stream")
+async def clone_voice_stream(request: StreamingVoiceCloneRequest):
+    """Stream voice clone audio in chunks for real-time playback."""
+    started = time.perf_counter()
+
+    logger.info(f"Clone stream request received, text length: {len(request.text)}")
+
+    fmt = stream_format_for(request)
+    admit_stream(request)
+    return streaming_response(clone_stream_events(request, fmt, started), fmt)
+
+
 @app.post("/api/v1/base/upload-ref-audio")
 async def upload_reference_audio(file: UploadFile = File(...)):
     """Upload reference audio file and get base64 encoded data."""
@@ -613,87 +1210,52 @@ async def upload_reference_audio(file: UploadFile = File(...)):
 
 
 # Storage for saved voice prompts (with file-based persistence)
-saved_voice_prompts = {}
 SAVED_VOICES_DIR = VOICES_DIR / "saved"
+voice_registry = VoiceRegistry(
+    SAVED_VOICES_DIR,
+    convert_audio=ensure_wav_bytes,
+    audio_cache_bytes=int(float(os.environ.get("QWEN_TTS_VOICE_AUDIO_CACHE_MB", "32")) * 1024 ** 2),
+)
 
+# Precomputed reference features for saved prompts, persisted as voices/saved/<id>/features_<model>.npz
+prompt_cache = PromptFeatureCache(
+    SAVED_VOICES_DIR,
+    max_entries=int(os.environ.get("QWEN_TTS_PROMPT_CACHE_ENTRIES", "64")),
+    max_bytes=int(float(os.environ.get("QWEN_TTS_PROMPT_CACHE_MB", "256")) * 1024 ** 2),
+)
 
-def load_saved_voices():
-    """Load all saved voice prompts from disk on startup."""
-    global saved_voice_prompts
-    SAVED_VOICES_DIR.mkdir(parents=True, exist_ok=True)
-
-    count = 0
-    for voice_dir in SAVED_VOICES_DIR.iterdir():
-        if voice_dir.is_dir():
-            metadata_file = voice_dir / "metadata.json"
-            audio_file = voice_dir / "audio.wav"
-
-            if metadata_file.exists() and audio_file.exists():
-                try:
-                    import json
-                    with open(metadata_file, "r") as f:
-                        metadata = json.load(f)
-
-                    # Load audio as base64 (convert to WAV if needed)
-                    with open(audio_file, "rb") as f:
-                        raw_bytes = f.read()
-                    wav_bytes = ensure_wav_bytes(raw_bytes)
-                    if wav_bytes is not raw_bytes:
-                        # Re-save the converted file
-                        with open(audio_file, "wb") as f:
-                            f.write(wav_bytes)
-                        logger.info(f"Converted {voice_dir.name}/audio.wav to proper WAV format")
-                    audio_base64 = base64.b64encode(wav_bytes).decode("utf-8")
-
-                    prompt_id = voice_dir.name
-                    saved_voice_prompts[prompt_id] = {
-                        "ref_audio_base64": audio_base64,
-                        "ref_text": metadata.get("ref_text"),
-                        "name": metadata.get("name", f"Voice_{prompt_id[:8]}"),
-                        "x_vector_only_mode": metadata.get("x_vector_only_mode", False),
-                    }
-                    count += 1
-                except Exception as e:
-                    logger.error(f"Error loading voice {voice_dir.name}: {e}")
-
-    logger.info(f"Loaded {count} saved voice prompts from disk")
-
-
-def save_voice_to_disk(prompt_id: str, data: dict):
-    """Save a voice prompt to disk."""
-    voice_dir = SAVED_VOICES_DIR / prompt_id
-    voice_dir.mkdir(parents=True, exist_ok=True)
-
-    # Save metadata (without audio)
-    import json
-    metadata = {
-        "name": data.get("name"),
-        "ref_text": data.get("ref_text"),
-        "x_vector_only_mode": data.get("x_vector_only_mode", False),
-    }
-    with open(voice_dir / "metadata.json", "w") as f:
-        json.dump(metadata, f, indent=2)
+# Background start-up work, started by the lifespan handler
+warmup = build_warmup()
 
-    # Save audio as WAV file (convert if needed)
-    audio_bytes = base64.b64decode(data["ref_audio_base64"])
-    audio_bytes = ensure_wav_bytes(audio_bytes)
-    with open(voice_dir / "audio.wav", "wb") as f:
-        f.write(audio_bytes)
 
-    logger.info(f"Saved voice {prompt_id} to disk")
+def get_prompt_features(prompt_id: str, prompt_data: dict, model, model_key: str):
+    """Get the cached reference features for a saved prompt, computing them on first use."""
+    def compute():
+        # Same in-memory normalization as ad-hoc clone references, so the model gets an array
+        audio = normalize_audio(voice_registry.audio_bytes(prompt_id))
+        logger.info(f"Computing reference features for prompt {prompt_id} ({model_key})")
+        return engine.extract_prompt_features(model, audio, prompt_data.get("ref_text"))
 
+    return prompt_cache.get_or_compute(prompt_id, model_key, compute)
 
-def delete_voice_from_disk(prompt_id: str):
-    """Delete a voice prompt from disk."""
-    import shutil
-    voice_dir = SAVED_VOICES_DIR / prompt_id
-    if voice_dir.exists():
-        shutil.rmtree(voice_dir)
-        logger.info(f"Deleted voice {prompt_id} from disk")
 
+def precompute_prompt_features(prompt_id: str, prompt_data: dict):
+    """Extract and persist reference features for a newly saved prompt (runs as a scheduler job)."""
+    try:
+        model, model_key = get_available_model("base")
+        get_prompt_features(prompt_id, prompt_data, model, model_key)
+    except HTTPException as e:
+        logger.warning(f"Skipping feature precompute for prompt {prompt_id}: {e.detail}")
+    except Exception as e:
+        logger.warning(f"Could not precompute features for prompt {prompt_id}: {e}")
 
-# Load saved voices on module import
-load_saved_voices()
+
+def schedule_precompute(prompt_id: str, prompt_data: dict):
+    """Queue feature extraction as background work; it is computed on first use if the queue is busy."""
+    try:
+        scheduler.submit(precompute_prompt_features, prompt_id, prompt_data, priority="batch")
+    except SchedulerError as e:
+        logger.info(f"Deferring feature precompute for prompt {prompt_id}: {e}")
 
 
 class CreatePromptRequest(BaseModel):
@@ -723,17 +1285,15 @@ async def create_voice_clone_prompt(request: CreatePromptRequest):
         # Generate unique prompt ID
         prompt_id = str(uuid.uuid4())
 
-        # Store the prompt data (reference audio and text)
-        prompt_data = {
-            "ref_audio_base64": request.ref_audio_base64,
-            "ref_text": request.ref_text,
-            "name": request.name or f"Voice_{prompt_id[:8]}",
-            "x_vector_only_mode": request.x_vector_only_mode,
-        }
-        saved_voice_prompts[prompt_id] = prompt_data
-
-        # Persist to disk
-        save_voice_to_disk(prompt_id, prompt_data)
+        # Persist the prompt (reference audio and text) to disk
+        prompt_data = voice_registry.add(
+            prompt_id,
+            name=request.name or f"Voice_{prompt_id[:8]}",
+            ref_text=request.ref_text,
+            x_vector_only_mode=request.x_vector_only_mode,
+            audio_bytes=base64.b64decode(request.ref_audio_base64),
+        )
+        schedule_precompute(prompt_id, prompt_data)
 
         logger.info(f"Created voice clone prompt with ID: {prompt_id}")
 
@@ -754,54 +1314,34 @@ class GenerateWithPromptRequest(BaseModel):
     text: str
     language: str = "Auto"
     speed: float = 1.0
-    response_format: str = "base64"
+    response_format: str = "base64"  # "base64" (WAV in JSON) or a file: "wav", "opus", "mp3", "flac", "mulaw"
+    artifact: bool = False  # Save the audio (WAV for base64) and return its artifact ID instead of the audio
+    model_size: Optional[str] = None  # "lite" or "pro"; default prefers lite
+    seed: Optional[int] = None  # Fixes sampling; seeded requests are served from the result cache
+    priority: str = "interactive"  # "interactive" or "batch" (served after interactive work)
+    deadline_seconds: Optional[float] = None  # Give up if not done in time; defaults to QWEN_TTS_REQUEST_TIMEOUT
 
 
 @app.post("/api/v1/base/generate-with-prompt")
-async def generate_with_voice_clone_prompt(request: GenerateWithPromptRequest):
+async def generate_with_voice_clone_prompt(request: GenerateWithPromptRequest, http_request: Request):
     """Generate speech using a saved voice clone prompt."""
     try:
         logger.info(f"Generating with voice clone prompt: {request.prompt_id}")
 
         # Get stored prompt
-        if request.prompt_id not in saved_voice_prompts:
+        if request.prompt_id not in voice_registry:
             raise HTTPException(status_code=404, detail=f"Prompt ID not found: {request.prompt_id}")
 
-        prompt_data = saved_voice_prompts[request.prompt_id]
-
-        model = get_available_model("base")
+        prompt_data = voice_registry.get(request.prompt_id)
 
-        # Decode reference audio (ensure WAV format)
-        import tempfile
-        audio_bytes = ensure_wav_bytes(base64.b64decode(prompt_data["ref_audio_base64"]))
-        temp_ref_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-        temp_ref_file.write(audio_bytes)
-        temp_ref_file.close()
-
-        try:
-            audio_data, sr = generate_with_temp_dir(
-                model,
-                text=request.text,
-                ref_audio=temp_ref_file.name,
-                ref_text=prompt_data["ref_text"] or ".",
-            )
+        model_key = resolve_model_key("base", request.model_size)
+        job = prompt_generation_job(request.prompt_id, prompt_data, model_key, request.text, request.seed)
+        audio_data, sr = await cached_generation(
+            request, http_request, model_key, job,
+            mode="prompt", prompt_id=request.prompt_id, ref_text=prompt_data["ref_text"],
+        )
 
-            if request.response_format == "base64":
-                return AudioResponse(
-                    audio=numpy_to_base64(audio_data, sr),
-                    sample_rate=sr,
-                    format="wav"
-                )
-            else:
-                wav_bytes = numpy_to_wav_bytes(audio_data, sr)
-                return Response(
-                    content=wav_bytes,
-                    media_type="audio/wav",
-                    headers={"Content-Disposition": "attachment; filename=voice_clone_prompt.wav"}
-                )
-        finally:
-            if os.path.exists(temp_ref_file.name):
-                os.unlink(temp_ref_file.name)
+        return await audio_response(request, audio_data, sr, "voice_clone_prompt")
 
     except HTTPException:
         raise
@@ -817,113 +1357,194 @@ class StreamingGenerateWithPromptRequest(BaseModel):
     speed: float = 1.0
     chunk_size: int = 500
     seed: Optional[int] = None  # Random seed for consistent voice across chunks
+    model_size: Optional[str] = None  # "lite" or "pro"; default prefers lite
+    incremental: bool = False  # Emit sub-sentence audio segments while the model is still generating
+    segment_seconds: float = 0.25  # Audio decoded per segment in incremental mode
+    transport: str = "sse"  # "sse" (base64 audio in JSON), "pcm" (raw audio/L16), "framed" (binary frames) or "audio" (one audio file)
+    audio_format: Optional[str] = None  # "wav", "opus", "mp3", "flac" or "mulaw"; defaults to wav for sse, opus for audio
+    longform: bool = False  # Render chunks in parallel worker processes (audiobooks); ignores incremental
+    priority: str = "interactive"  # "interactive" or "batch" (served after interactive work)
+    deadline_seconds: Optional[float] = None  # Give up if not done in time; defaults to QWEN_TTS_REQUEST_TIMEOUT
+
+
+async def prompt_stream_events(request: StreamingGenerateWithPromptRequest, fmt, started: float):
+    """Saved-prompt stream messages (start, audio chunks, done/error) in the given format."""
+    try:
+        logger.info("Generator started")
+
+        # Get stored prompt
+        if request.prompt_id not in voice_registry:
+            logger.error(f"Prompt ID not found: {request.prompt_id}")
+            yield fmt.control({'type': 'error', 'error': f'Prompt ID not found: {request.prompt_id}'})
+            return
+
+        prompt_data = voice_registry.get(request.prompt_id)
+        logger.info(f"Found prompt data for: {prompt_data.get('name', 'unnamed')}")
+
+        model_key = resolve_model_key("base", request.model_size)
+
+        @functools.lru_cache(maxsize=None)
+        def prepared():
+            # Runs on the worker with the first chunk that is not cached
+            model = load_model(model_key)
+            logger.info("Model loaded")
+            features = get_prompt_features(request.prompt_id, prompt_data, model, model_key)
+            return model, dict(voice_prompt=features, ref_text=prompt_data["ref_text"] or ".")
+
+        # Chunk the text
+        chunks = chunk_text(request.text, request.chunk_size)
+        total_chunks = len(chunks)
+
+        logger.info(f"Streaming with saved prompt: {total_chunks} chunks from {len(request.text)} chars")
+
+        # Send initial metadata
+        logger.info(f"Sending start message")
+        yield fmt.control({'type': 'start', 'total_chunks': total_chunks, 'total_chars': len(request.text), 'voice_name': prompt_data.get('name', ''),
+                           'mode': stream_mode(request), 'setup_ms': round((time.perf_counter() - started) * 1000, 1)})
+
+        pipeline = chunk_pipeline(
+            chunks,
+            seeded_chunks(prepared, model_key, request.seed),
+            started,
+            fmt,
+            stream_chunk=incremental_stream(prepared, model_key, request),
+            render_chunks=longform_chunks(prepared, model_key, request),
+            priority=request.priority,
+            timeout=request_timeout(request),
+            chunk_key=stream_chunk_key(request, model_key, mode="prompt",
+                                       prompt_id=request.prompt_id, ref_text=prompt_data["ref_text"]),
+        )
+        async for message in pipeline:
+            yield message
+
+        # Send completion
+        logger.info("Sending done message")
+        yield fmt.control({'type': 'done', 'total_chunks': total_chunks})
+
+    except Exception as e:
+        import traceback
+        logger.error(f"Error in streaming with saved prompt: {e}")
+        logger.error(traceback.format_exc())
+        yield fmt.control({'type': 'error', 'error': str(e)})
 
 
 @app.post("/api/v1/base/generate-with-prompt/stream")
 async def stream_generate_with_voice_clone_prompt(request: StreamingGenerateWithPromptRequest):
     """Stream speech generation using a saved voice clone prompt."""
+    started = time.perf_counter()
 
     logger.info(f"Stream request received for prompt_id: {request.prompt_id}, text length: {len(request.text)}")
-    logger.info(f"Available prompts: {list(saved_voice_prompts.keys())}")
+    logger.info(f"Available prompts: {len(voice_registry)}")
 
-    def generate_chunks():
-        try:
-            logger.info("Generator started")
+    fmt = stream_format_for(request)
+    admit_stream(request)
+    return streaming_response(prompt_stream_events(request, fmt, started), fmt)
 
-            # Get stored prompt
-            if request.prompt_id not in saved_voice_prompts:
-                logger.error(f"Prompt ID not found: {request.prompt_id}")
-                yield f"data: {json_module.dumps({'type': 'error', 'error': f'Prompt ID not found: {request.prompt_id}'})}\n\n"
-                return
 
-            prompt_data = saved_voice_prompts[request.prompt_id]
-            logger.info(f"Found prompt data for: {prompt_data.get('name', 'unnamed')}")
+# ============= WebSocket Streaming =============
 
-            model = get_available_model("base")
-            logger.info("Model loaded")
+@app.websocket("/api/v1/ws/stream")
+async def websocket_stream(websocket: WebSocket):
+    """Stream audio as binary PCM frames with a JSON control channel.
 
-            # Prepare reference audio (ensure WAV format)
-            import tempfile
-            audio_bytes = ensure_wav_bytes(base64.b64decode(prompt_data["ref_audio_base64"]))
-            temp_ref_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-            temp_ref_file.write(audio_bytes)
-            temp_ref_file.close()
-            logger.info(f"Temp reference audio created: {temp_ref_file.name}")
-
-            try:
-                # Chunk the text
-                chunks = chunk_text(request.text, request.chunk_size)
-                total_chunks = len(chunks)
-
-                logger.info(f"Streaming with saved prompt: {total_chunks} chunks from {len(request.text)} chars")
-
-                # Send initial metadata
-                start_msg = f"data: {json_module.dumps({'type': 'start', 'total_chunks': total_chunks, 'total_chars': len(request.text), 'voice_name': prompt_data.get('name', '')})}\n\n"
-                logger.info(f"Sending start message")
-                yield start_msg
-
-                for i, chunk_text_content in enumerate(chunks):
-                    logger.info(f"Generating chunk {i+1}/{total_chunks}: {len(chunk_text_content)} chars")
-
-                    # Set seed for consistent voice across chunks
-                    if request.seed is not None:
-                        mx.random.seed(request.seed)
-                        logger.info(f"Set random seed to {request.seed} for chunk {i+1}")
-
-                    # Generate audio for this chunk
-                    audio_data, sr = generate_with_temp_dir(
-                        model,
-                        text=chunk_text_content,
-                        ref_audio=temp_ref_file.name,
-                        ref_text=prompt_data["ref_text"] or ".",
-                    )
-                    logger.info(f"Chunk {i+1} generated, audio shape: {audio_data.shape if hasattr(audio_data, 'shape') else len(audio_data)}")
-
-                    # Convert to base64
-                    audio_base64 = numpy_to_base64(audio_data, sr)
-
-                    # Send chunk
-                    chunk_data = {
-                        'type': 'chunk',
-                        'chunk_index': i,
-                        'total_chunks': total_chunks,
-                        'audio': audio_base64,
-                        'sample_rate': sr,
-                        'text': chunk_text_content,
-                    }
-                    logger.info(f"Sending chunk {i+1}/{total_chunks}")
-                    yield f"data: {json_module.dumps(chunk_data)}\n\n"
-
-                # Send completion
-                logger.info("Sending done message")
-                yield f"data: {json_module.dumps({'type': 'done', 'total_chunks': total_chunks})}\n\n"
+    Send {"action": "start", "mode": "clone" | "prompt", "request": {...}} with
+    the body of the matching /stream endpoint. The server replies with JSON
+    text messages (start, chunk metadata, done, error), each chunk message
+    followed by one binary frame of little-endian int16 PCM. Send
+    {"action": "cancel"} to stop the current stream.
+    """
+    await websocket.accept()
+    fmt = WebSocketFormat()
+    cancelled = asyncio.Event()
+    commands: asyncio.Queue = asyncio.Queue()
 
-            finally:
-                if os.path.exists(temp_ref_file.name):
-                    os.unlink(temp_ref_file.name)
+    async def receive_commands():
+        try:
+            while True:
+                message = await websocket.receive_json()
+                if message.get("action") == "cancel":
+                    cancelled.set()
+                else:
+                    await commands.put(message)
+        except (WebSocketDisconnect, RuntimeError, ValueError):
+            cancelled.set()
+            await commands.put(None)
+
+    receiver = asyncio.create_task(receive_commands())
+    draining = asyncio.create_task(lifecycle.wait_draining())
+    try:
+        while True:
+            next_command = asyncio.create_task(commands.get())
+            await asyncio.wait({next_command, draining}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_command.done():
+                # Idle when the server started draining: tell the client to reconnect elsewhere
+                next_command.cancel()
+                await websocket.close(code=1001)
+                return
+            message = next_command.result()
+            if message is None:
+                return
+            cancelled.clear()
+            started = time.perf_counter()
 
-        except Exception as e:
-            import traceback
-            logger.error(f"Error in streaming with saved prompt: {e}")
-            logger.error(traceback.format_exc())
-            yield f"data: {json_module.dumps({'type': 'error', 'error': str(e)})}\n\n"
+            if lifecycle.draining:
+                # The handshake is refused while draining; an open socket is told to reconnect elsewhere
+                await websocket.send_json({'type': 'error', 'error': 'Server is shutting down', 'status': 503})
+                await websocket.close(code=1012)
+                return
 
-    return StreamingResponse(
-        generate_chunks(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        }
-    )
+            mode = message.get("mode", "clone")
+            try:
+                if mode == "clone":
+                    request = StreamingVoiceCloneRequest(**message.get("request", {}))
+                    stream_events = clone_stream_events
+                elif mode == "prompt":
+                    request = StreamingGenerateWithPromptRequest(**message.get("request", {}))
+                    stream_events = prompt_stream_events
+                else:
+                    await websocket.send_json({'type': 'error', 'error': f"Unknown mode '{mode}'. Use 'clone' or 'prompt'"})
+                    continue
+                # Same admission check as the HTTP stream endpoints
+                admit_stream(request)
+                messages = stream_events(request, fmt, started)
+            except HTTPException as e:
+                rejection = {'type': 'error', 'error': e.detail, 'status': e.status_code}
+                if e.headers and "Retry-After" in e.headers:
+                    rejection['retry_after'] = int(e.headers["Retry-After"])
+                await websocket.send_json(rejection)
+                continue
+            except Exception as e:
+                await websocket.send_json({'type': 'error', 'error': str(e)})
+                continue
+
+            # Only a generating session holds up a drain
+            lifecycle.enter()
+            try:
+                async for item in messages:
+                    if cancelled.is_set():
+                        await websocket.send_json({'type': 'cancelled'})
+                        break
+                    if isinstance(item, tuple):
+                        meta, pcm = item
+                        await websocket.send_json(meta)
+                        await websocket.send_bytes(pcm)
+                    else:
+                        await websocket.send_json(item)
+            finally:
+                await messages.aclose()
+                lifecycle.exit()
+    except WebSocketDisconnect:
+        logger.info("WebSocket client disconnected")
+    finally:
+        receiver.cancel()
+        draining.cancel()
 
 
 @app.get("/api/v1/base/prompts")
 async def list_saved_prompts():
     """List all saved voice clone prompts."""
     prompts = []
-    for prompt_id, data in saved_voice_prompts.items():
+    for prompt_id, data in voice_registry.items():
         prompts.append({
             "prompt_id": prompt_id,
             "ref_text": data.get("ref_text", ""),
@@ -936,40 +1557,237 @@ async def list_saved_prompts():
 @app.get("/api/v1/base/prompts/{prompt_id}")
 async def get_saved_prompt(prompt_id: str):
     """Get a specific saved voice clone prompt."""
-    if prompt_id not in saved_voice_prompts:
+    if prompt_id not in voice_registry:
         raise HTTPException(status_code=404, detail=f"Prompt ID not found: {prompt_id}")
 
-    data = saved_voice_prompts[prompt_id]
+    data = voice_registry.get(prompt_id)
     return {
         "prompt_id": prompt_id,
         "ref_text": data.get("ref_text", ""),
         "name": data.get("name", ""),
         "x_vector_only_mode": data.get("x_vector_only_mode", False),
-        "has_audio": bool(data.get("ref_audio_base64")),
+        "has_audio": (SAVED_VOICES_DIR / prompt_id / "audio.wav").exists(),
     }
 
 
 @app.delete("/api/v1/base/prompts/{prompt_id}")
 async def delete_saved_prompt(prompt_id: str):
     """Delete a saved voice clone prompt."""
-    if prompt_id not in saved_voice_prompts:
+    if prompt_id not in voice_registry:
         raise HTTPException(status_code=404, detail=f"Prompt ID not found: {prompt_id}")
 
-    del saved_voice_prompts[prompt_id]
+    prompt_cache.invalidate(prompt_id)
 
     # Delete from disk
-    delete_voice_from_disk(prompt_id)
+    voice_registry.delete(prompt_id)
 
     return {"message": f"Prompt {prompt_id} deleted successfully"}
 
 
+# ============= Artifacts =============
+
+@app.get("/api/v1/artifacts")
+async def list_artifacts(limit: int = 50):
+    """Newest saved generations first, with store statistics."""
+    return {"artifacts": artifact_store.recent(limit), "stats": artifact_store.stats()}
+
+
+@app.api_route("/api/v1/artifacts/{artifact_id}", methods=["GET", "HEAD"])
+async def get_artifact(artifact_id: str, request: Request):
+    """A saved generation as a file. Supports Range requests and conditional requests by ETag.
+
+    Artifacts never change, so clients may cache them indefinitely and
+    revalidate with If-None-Match (304) or resume with Range + If-Range (206).
+    """
+    artifact = artifact_store.get(artifact_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail=f"Artifact not found: {artifact_id}")
+
+    headers = {"ETag": artifact["etag"], "Cache-Control": "private, max-age=31536000, immutable"}
+    if etag_matches(request.headers.get("if-none-match"), artifact["etag"]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(artifact["path"], media_type=artifact["media_type"], filename=artifact["filename"],
+                        headers=headers)
+
+
+@app.delete("/api/v1/artifacts/{artifact_id}")
+async def delete_artifact(artifact_id: str):
+    """Delete a saved generation."""
+    if not await run_in_threadpool(artifact_store.delete, artifact_id):
+        raise HTTPException(status_code=404, detail=f"Artifact not found: {artifact_id}")
+    return {"message": f"Artifact {artifact_id} deleted"}
+
+
 @app.get("/api/v1/base/cache/stats")
 async def get_cache_stats():
-    """Get voice prompt cache statistics (stub - caching not implemented in MLX version)."""
-    return {
-        "enabled": False,
-        "message": "Voice prompt caching not implemented in MLX version"
-    }
+    """Get voice prompt feature cache statistics."""
+    return prompt_cache.stats()
+
+
+@app.get("/api/v1/cache/results/stats")
+async def get_result_cache_stats():
+    """Get synthesis result cache statistics."""
+    return result_cache.stats()
+
+
+@app.post("/api/v1/cache/results/clear")
+async def clear_result_cache():
+    """Remove every cached synthesis result from memory and disk."""
+    removed = await run_in_threadpool(result_cache.clear)
+    return {"message": f"Removed {removed} cached results", "removed": removed}
+
+
+@app.get("/api/v1/cache/references/stats")
+async def get_reference_cache_stats():
+    """Get decode and feature cache statistics for ad-hoc clone references."""
+    return {"audio": reference_audio.stats(), "features": reference_features.stats()}
+
+
+@app.post("/api/v1/cache/references/clear")
+async def clear_reference_cache():
+    """Forget every cached ad-hoc clone reference."""
+    reference_audio.clear()
+    cleared = reference_features.clear()
+    return {"message": "Reference cache cleared successfully", "cleared_entries": cleared}
+
+
+@app.post("/api/v1/base/cache/clear")
+async def clear_cache():
+    """Clear the voice prompt feature cache (memory and persisted features)."""
+    cleared = prompt_cache.clear()
+    logger.info(f"Cleared {cleared} cached voice prompt features")
+    return {"message": "Cache cleared successfully", "cleared_entries": cleared}
+
+
+# ============= Bulk Job Endpoints =============
+
+def job_row_model(row: dict) -> str:
+    """Model key a bulk job row runs on."""
+    return resolve_model_key("base" if row["mode"] == "prompt" else row["mode"], row.get("model_size"))
+
+
+def generate_job_row(params: dict, cancel) -> tuple:
+    """Generate one bulk job row with batch priority, through the same jobs and cache as the endpoints."""
+    mode = params["mode"]
+    text = params["text"]
+    seed = params.get("seed")
+    model_key = job_row_model(params)
+
+    if mode == "prompt":
+        prompt_data = voice_registry.get(params["prompt_id"])
+        if prompt_data is None:
+            raise ValueError(f"Prompt ID not found: {params['prompt_id']}")
+        job = prompt_generation_job(params["prompt_id"], prompt_data, model_key, text, seed)
+        key_parts = dict(prompt_id=params["prompt_id"], ref_text=prompt_data["ref_text"])
+    else:
+        if mode == "custom_voice":
+            key_parts = dict(
+                voice=params.get("voice", "Vivian"),
+                instruct=params.get("instruct") or "Normal tone",
+                speed=params.get("speed", 1.0),
+            )
+        else:
+            key_parts = dict(instruct=params["instruct"])
+        job = generation_job(mode, model_key, text, seed, **key_parts)
+
+    return cached_generation_sync(
+        text, seed, model_key, job,
+        priority="batch", timeout=REQUEST_TIMEOUT, cancel=cancel, mode=mode, **key_parts,
+    )
+
+
+# Job and row state persists in outputs/jobs.db; audio goes to outputs/<job_id>/
+job_store = JobStore(OUTPUTS_DIR / "jobs.db")
+job_runner = JobRunner(
+    job_store,
+    generate_job_row,
+    OUTPUTS_DIR,
+    max_jobs=MAX_CONCURRENT_JOBS,
+    row_concurrency=JOB_CONCURRENCY,
+)
+
+# Stop claiming bulk job rows as soon as a drain starts; pending rows resume after the restart
+lifecycle.on_drain(lambda: job_runner.stop(timeout=5))
+
+
+@app.post("/api/v1/jobs", status_code=202)
+async def create_job(http_request: Request, format: Optional[str] = None, name: Optional[str] = None):
+    """Submit rows for background synthesis as JSONL (default) or CSV (Content-Type text/csv or ?format=csv)."""
+    try:
+        body = (await http_request.body()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Job body must be UTF-8 text")
+
+    fmt = format or ("csv" if "csv" in http_request.headers.get("content-type", "") else "jsonl")
+    try:
+        rows = parse_rows(body, fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(rows) > JOB_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Job has {len(rows)} rows; the limit is {JOB_MAX_ROWS}")
+
+    models = {}
+    group_keys = []
+    for index, row in enumerate(rows):
+        if row["mode"] == "prompt" and row["prompt_id"] not in voice_registry:
+            raise HTTPException(status_code=400, detail=f"Row {index}: prompt ID not found: {row['prompt_id']}")
+        tier = (row["mode"], row.get("model_size"))
+        if tier not in models:
+            models[tier] = job_row_model(row)
+        group_keys.append(models[tier])
+
+    job_id = await run_in_threadpool(job_store.create, rows, group_keys, name)
+    logger.info(f"Queued bulk job {job_id} with {len(rows)} rows")
+    job_runner.start()
+    job_runner.wake()
+    return await run_in_threadpool(job_store.job, job_id)
+
+
+@app.get("/api/v1/jobs")
+async def list_jobs(limit: int = 50):
+    """List recent bulk jobs, newest first."""
+    return {"jobs": await run_in_threadpool(job_store.jobs, limit), "runner": job_runner.stats()}
+
+
+def get_job_or_404(job_id: str) -> dict:
+    job = job_store.job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+
+@app.get("/api/v1/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, row counts and throughput (rows/sec) of a bulk job."""
+    return await run_in_threadpool(get_job_or_404, job_id)
+
+
+@app.get("/api/v1/jobs/{job_id}/rows")
+async def get_job_rows(job_id: str, status: Optional[str] = None, offset: int = 0, limit: int = 100):
+    """Rows of a bulk job, optionally filtered by status ("pending", "done", "failed", ...)."""
+    await run_in_threadpool(get_job_or_404, job_id)
+    rows = await run_in_threadpool(job_store.rows, job_id, status, offset, min(limit, 1000))
+    return {"job_id": job_id, "offset": offset, "rows": rows}
+
+
+@app.post("/api/v1/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a bulk job; rows already written are kept."""
+    await run_in_threadpool(get_job_or_404, job_id)
+    if not await run_in_threadpool(job_runner.cancel, job_id):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} has already finished")
+    return await run_in_threadpool(job_store.job, job_id)
+
+
+@app.post("/api/v1/jobs/{job_id}/retry")
+async def retry_job(job_id: str):
+    """Requeue the failed and cancelled rows of a finished bulk job."""
+    job = await run_in_threadpool(get_job_or_404, job_id)
+    requeued = await run_in_threadpool(job_runner.retry, job_id)
+    if not requeued:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job['status']} with no rows to retry")
+    job_runner.start()
+    return await run_in_threadpool(job_store.job, job_id)
 
 
 # ============= Save Voice & Transcribe Endpoints =============
@@ -987,14 +1805,14 @@ async def save_generated_voice(request: SaveGeneratedVoiceRequest):
         import uuid
 
         prompt_id = str(uuid.uuid4())
-        prompt_data = {
-            "ref_audio_base64": request.ref_audio_base64,
-            "ref_text": request.ref_text,
-            "name": request.name,
-            "x_vector_only_mode": False,
-        }
-        saved_voice_prompts[prompt_id] = prompt_data
-        save_voice_to_disk(prompt_id, prompt_data)
+        prompt_data = voice_registry.add(
+            prompt_id,
+            name=request.name,
+            ref_text=request.ref_text,
+            x_vector_only_mode=False,
+            audio_bytes=base64.b64decode(request.ref_audio_base64),
+        )
+        schedule_precompute(prompt_id, prompt_data)
 
         logger.info(f"Saved generated voice '{request.name}' with ID: {prompt_id}")
 
@@ -1002,6 +1820,8 @@ async def save_generated_voice(request: SaveGeneratedVoiceRequest):
             prompt_id=prompt_id,
             message=f"Voice '{request.name}' saved successfully"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error saving voice: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1009,46 +1829,168 @@ async def save_generated_voice(request: SaveGeneratedVoiceRequest):
 
 class TranscribeRequest(BaseModel):
     ref_audio_base64: str
+    language: Optional[str] = None  # e.g. "en"; detected when omitted
+
+
+class TranscribeBatchRequest(BaseModel):
+    clips: List[str]  # base64 audio, any format the clone endpoints accept
+    language: Optional[str] = None
+
+
+async def transcribe_clips(clips: List[bytes], http_request: Request, language: Optional[str] = None) -> List[dict]:
+    """Transcripts of audio clips: cached ones by content hash, the rest decoded and run as one worker job."""
+    if transcriber is None:
+        raise HTTPException(status_code=503, detail=f"Transcription backend '{ASR_BACKEND}' is not available")
+
+    keys = [transcriber.key(data + (language or "").encode()) for data in clips]
+    results = [transcriber.cached(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        audios = []
+        for i in missing:
+            try:
+                audios.append(await run_in_threadpool(normalize_audio, clips[i], ASR_SAMPLE_RATE))
+            except AudioDecodeError as e:
+                raise HTTPException(status_code=400, detail=f"Clip {i}: {e}")
+
+        # Whisper shares the device with the TTS models, so it runs on the scheduler worker too
+        transcripts = await scheduler.run(
+            transcriber.transcribe_batch,
+            audios,
+            language,
+            is_disconnected=http_request.is_disconnected,
+        )
+        for i, transcript in zip(missing, transcripts):
+            transcriber.store(keys[i], transcript)
+            results[i] = transcript
+
+    return [dict(result, cached=i not in missing) for i, result in enumerate(results)]
 
 
 @app.post("/api/v1/base/transcribe")
-async def transcribe_reference_audio(request: TranscribeRequest):
-    """Transcribe reference audio using Whisper (MLX)."""
+async def transcribe_reference_audio(request: TranscribeRequest, http_request: Request):
+    """Transcribe reference audio with the resident Whisper model."""
     try:
-        logger.info("Transcribing reference audio with mlx-whisper")
+        result = (await transcribe_clips([base64.b64decode(request.ref_audio_base64)], http_request,
+                                         request.language))[0]
+        logger.info(f"Transcription result: {result['text'][:100]}...")
+        return result
 
-        import tempfile
-        import mlx_whisper
+    except HTTPException:
+        raise
+    except SchedulerError as e:
+        raise scheduler_http_error(e)
+    except Exception as e:
+        logger.error(f"Error transcribing audio: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Decode base64 audio to temp file
-        audio_bytes = base64.b64decode(request.ref_audio_base64)
-        temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-        temp_file.write(audio_bytes)
-        temp_file.close()
 
-        try:
-            result = mlx_whisper.transcribe(
-                temp_file.name,
-                path_or_hf_repo="mlx-community/whisper-tiny",
-            )
-            text = result.get("text", "").strip()
-            logger.info(f"Transcription result: {text[:100]}...")
-            return {"text": text}
-        finally:
-            if os.path.exists(temp_file.name):
-                os.unlink(temp_file.name)
+@app.post("/api/v1/base/transcribe/batch")
+async def transcribe_reference_audio_batch(request: TranscribeBatchRequest, http_request: Request):
+    """Transcribe many clips in one pass through the model."""
+    if not request.clips:
+        raise HTTPException(status_code=400, detail="clips must not be empty")
+    if len(request.clips) > ASR_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {ASR_MAX_BATCH} clips per batch")
+    try:
+        clips = [base64.b64decode(clip) for clip in request.clips]
+        results = await transcribe_clips(clips, http_request, request.language)
+        logger.info(f"Transcribed {len(results)} clips ({sum(not r['cached'] for r in results)} uncached)")
+        return {"results": results}
 
+    except HTTPException:
+        raise
+    except SchedulerError as e:
+        raise scheduler_http_error(e)
     except Exception as e:
-        logger.error(f"Error transcribing audio: {e}")
+        logger.error(f"Error transcribing audio batch: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # ============= Health & Info Endpoints =============
 
+QUEUE_DEPTH = metrics_registry.gauge("qwen_tts_queue_depth", "Jobs waiting for the inference worker", ["priority"])
+RESIDENT_MODEL_BYTES = metrics_registry.gauge("qwen_tts_resident_model_bytes", "Estimated memory of loaded models")
+MODEL_LOADED = metrics_registry.gauge("qwen_tts_model_loaded", "1 if the model is resident", ["model", "tier"])
+RESULT_CACHE_LOOKUPS = metrics_registry.gauge(
+    "qwen_tts_result_cache_lookups", "Result cache lookups since the last clear", ["result"])
+REFERENCE_CACHE_LOOKUPS = metrics_registry.gauge(
+    "qwen_tts_reference_cache_lookups", "Ad-hoc clone reference cache lookups since the last clear", ["cache", "result"])
+
+
+@metrics_registry.collector
+def collect_live_metrics():
+    """Refresh gauges that mirror live state (queue, model pool, result cache) before a scrape."""
+    for priority in PRIORITIES:
+        QUEUE_DEPTH.set(scheduler.depth(priority), priority=priority)
+    pool = model_pool.stats()
+    RESIDENT_MODEL_BYTES.set(pool["resident_bytes"])
+    for key in MODEL_PATHS:
+        MODEL_LOADED.set(1 if model_pool.is_loaded(key) else 0, model=key, tier=model_tier(key))
+    cache = result_cache.stats()
+    for result in ("hits", "disk_hits", "misses", "bypassed"):
+        RESULT_CACHE_LOOKUPS.set(cache[result], result=result)
+    audio, features = reference_audio.stats(), reference_features.stats()
+    for result in ("hits", "misses"):
+        REFERENCE_CACHE_LOOKUPS.set(audio[result], cache="audio", result=result)
+        REFERENCE_CACHE_LOOKUPS.set(features[result], cache="features", result=result)
+
+
+@app.get("/api/v1/profiles/{trace_id}")
+async def get_profile(trace_id: str):
+    """Folded-stack profile of a request run with ?profile=1 (for flamegraph.pl or speedscope)."""
+    if not re.fullmatch(r"[0-9a-f]{32}", trace_id):
+        raise HTTPException(status_code=400, detail="Invalid trace id")
+    path = OUTPUTS_DIR / "profiles" / f"{trace_id}.folded"
+    if not path.exists():
+        raise HTTPException(status_code=404, detail=f"No profile for trace {trace_id}")
+    return FileResponse(path, media_type="text/plain", filename=f"{trace_id}.folded")
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Metrics in the Prometheus text exposition format."""
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/health")
 async def health_check():
-    """Basic health check."""
-    return {"status": "healthy", "backend": "mlx"}
+    """Liveness: healthy while the process serves requests, including during a drain."""
+    return {"status": "healthy", "backend": "mlx", "state": lifecycle.state}
+
+
+@app.get("/ready")
+async def readiness_check(response: Response):
+    """Readiness: 200 when this instance should receive traffic, 503 with the reasons otherwise.
+
+    Not ready before the start-up warm-up has finished, while no model is
+    resident although warm-up models are configured, while the inference queue
+    is nearly full, and once a shutdown drain has started.
+    """
+    loaded = [key for key in MODEL_PATHS if model_pool.is_loaded(key)]
+    queue_limit = max(1, int(scheduler.max_queue * READY_QUEUE_FRACTION))
+    reasons = []
+    if lifecycle.state != "serving":
+        reasons.append(lifecycle.state)
+    if not (warmup.finished and voice_registry.loaded):
+        reasons.append("warming_up")
+    elif any(key in MODEL_PATHS for key in WARMUP_MODELS) and not loaded:
+        reasons.append("no_model_loaded")
+    if scheduler.depth() >= queue_limit:
+        reasons.append("queue_saturated")
+
+    ready = not reasons
+    if not ready:
+        response.status_code = 503
+    return {
+        "ready": ready,
+        "reasons": reasons,
+        "lifecycle": lifecycle.stats(),
+        "voices_indexed": voice_registry.loaded,
+        "warmup": warmup.stats(),
+        "loaded_models": loaded,
+        "queue": {"depth": scheduler.depth(), "not_ready_at": queue_limit, "max_queue": scheduler.max_queue},
+    }
 
 
 @app.get("/health/models")
@@ -1057,8 +1999,30 @@ async def models_status():
     status = {}
     for key, folder in MODEL_PATHS.items():
         path = get_model_path(folder)
-        status[key] = "available" if path else "not_found"
-    return {"models": status}
+        if model_pool.is_loaded(key):
+            status[key] = "loaded"
+        else:
+            status[key] = "available" if path else "not_found"
+
+    def any_loaded(model_type: str) -> bool:
+        return any(model_pool.is_loaded(f"{model_type}{suffix}") for suffix in ["_lite", "_pro"])
+
+    return {
+        "models": status,
+        "custom_voice_loaded": any_loaded("custom_voice"),
+        "voice_design_loaded": any_loaded("voice_design"),
+        "base_loaded": any_loaded("base"),
+        "pool": model_pool.stats(),
+        "queue": scheduler.stats(),
+        "longform": longform_renderer.stats(),
+        "jobs": job_runner.stats(),
+        "asr": transcriber.stats() if transcriber is not None else None,
+        "latency": {
+            "by_tier": model_latency.stats(model_tier),
+            "by_model": model_latency.stats(),
+            "time_to_first_audio": ttfa_latency.stats().get("stream"),
+        },
+    }
 
 
 @app.get("/demo")
@@ -1078,10 +2042,4 @@ async def root():
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "server:app",
-        host="127.0.0.1",
-        port=7860,
-        reload=False,
-    )
+    serve(app, lifecycle, host="127.0.0.1", port=7860, drain_timeout=DRAIN_TIMEOUT)
@@ -37,7 +37,9 @@ const CONFIG = {
         enabled: true,
         threshold: 500,  // Use streaming for text longer than this
         chunkSize: 500,  // Characters per chunk
-        useSeed: true    // Use consistent seed across chunks for voice stability
+        useSeed: true,   // Use consistent seed across chunks for voice stability
+        incremental: true,  // Receive sub-sentence audio segments while the model is still generating
+        transport: 'framed'  // 'framed' (binary PCM frames) or 'sse' (base64 WAV in JSON events)
     }
 };
 
@@ -810,9 +812,10 @@ class StreamingAudioPlayer {
         }, 100);
     }
 
-    async addChunk(base64Audio, sampleRate) {
+    async addChunk(base64Audio, sampleRate, textChunkIndex) {
         this.sampleRate = sampleRate;
-        this.receivedChunks++;
+        // Incremental streams send several segments per text chunk; count text chunks for progress
+        this.receivedChunks = textChunkIndex === undefined ? this.receivedChunks + 1 : textChunkIndex + 1;
 
         // Decode base64 to ArrayBuffer
         const binaryString = atob(base64Audio);
@@ -824,26 +827,47 @@ class StreamingAudioPlayer {
         try {
             // Decode audio data
             const audioBuffer = await this.audioContext.decodeAudioData(bytes.buffer.slice(0));
+            this.enqueueBuffer(audioBuffer);
+        } catch (e) {
+            console.error('Error decoding audio chunk:', e);
+        }
 
-            // Store for combining later
-            this.allBuffers.push(audioBuffer);
-            this.totalDuration += audioBuffer.duration;
+        // Update progress
+        this.updateProgress();
+    }
 
-            // Add to playback queue
-            this.audioQueue.push(audioBuffer);
+    addPcmChunk(samples, sampleRate, textChunkIndex) {
+        // Raw 16-bit PCM from the binary transport: copy straight into an AudioBuffer, no decoding
+        this.sampleRate = sampleRate;
+        this.receivedChunks = textChunkIndex === undefined ? this.receivedChunks + 1 : textChunkIndex + 1;
 
-            // Start playing if not already
-            if (!this.isPlaying) {
-                this.playNext();
+        if (samples.length > 0) {
+            const audioBuffer = this.audioContext.createBuffer(1, samples.length, sampleRate);
+            const channel = new Float32Array(samples.length);
+            for (let i = 0; i < samples.length; i++) {
+                channel[i] = samples[i] / 32768;
             }
-        } catch (e) {
-            console.error('Error decoding audio chunk:', e);
+            audioBuffer.copyToChannel(channel, 0);
+            this.enqueueBuffer(audioBuffer);
         }
 
-        // Update progress
         this.updateProgress();
     }
 
+    enqueueBuffer(audioBuffer) {
+        // Store for combining later
+        this.allBuffers.push(audioBuffer);
+        this.totalDuration += audioBuffer.duration;
+
+        // Add to playback queue
+        this.audioQueue.push(audioBuffer);
+
+        // Start playing if not already
+        if (!this.isPlaying) {
+            this.playNext();
+        }
+    }
+
     playNext() {
         if (this.audioQueue.length === 0) {
             this.isPlaying = false;
@@ -922,7 +946,7 @@ class StreamingAudioPlayer {
         }
 
         // Animate waveform
-        if (waveformContainer && this.receivedChunks === 1) {
+        if (waveformContainer && this.allBuffers.length === 1) {
             generateWaveformBars(waveformContainer);
         }
     }
@@ -1094,6 +1118,118 @@ class StreamingAudioPlayer {
 // Global streaming player instance
 let streamingPlayer = null;
 
+/**
+ * Handle a start/chunk/done/error message from the stream
+ */
+async function handleStreamEvent(data, audio) {
+    if (data.type === 'start') {
+        streamingPlayer.totalChunks = data.total_chunks;
+        showToast(`Streaming ${data.total_chunks} chunks...`, 'info');
+    } else if (data.type === 'chunk') {
+        console.log('[Streaming] Received chunk', data.chunk_index + 1, '/', data.total_chunks);
+        if (data.chunk_index === 0) {
+            console.log('[Streaming] Time to first audio:', data.time_to_first_audio_ms, 'ms');
+        }
+        if (audio) {
+            streamingPlayer.addPcmChunk(audio, data.sample_rate, data.text_chunk_index);
+        } else {
+            await streamingPlayer.addChunk(data.audio, data.sample_rate, data.text_chunk_index);
+        }
+    } else if (data.type === 'done') {
+        await streamingPlayer.finalize();
+        showToast('Generation complete!', 'success');
+    } else if (data.type === 'error') {
+        console.error('[Streaming] Server error:', data.error);
+        throw new Error(data.error);
+    }
+}
+
+/**
+ * Read server-sent events carrying base64 WAV chunks
+ */
+async function readSseStream(reader) {
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) {
+            console.log('[Streaming] Stream ended');
+            break;
+        }
+
+        buffer += decoder.decode(value, { stream: true });
+
+        // Process complete SSE messages
+        const lines = buffer.split('\n');
+        buffer = lines.pop() || '';  // Keep incomplete line in buffer
+
+        for (const line of lines) {
+            if (line.startsWith('data: ')) {
+                try {
+                    const data = JSON.parse(line.slice(6));
+                    console.log('[Streaming] Parsed SSE event:', data.type);
+                    await handleStreamEvent(data);
+                } catch (e) {
+                    if (e.message !== 'Unexpected end of JSON input') {
+                        console.error('[Streaming] Error parsing SSE:', e, 'Line:', line);
+                    }
+                }
+            }
+        }
+    }
+}
+
+// Frame types of the framed binary transport: [type:u8][length:u32 LE][payload]
+const FRAME_CONTROL = 1;
+const FRAME_AUDIO = 2;
+
+/**
+ * Read length-prefixed binary frames: JSON control frames and int16 PCM audio frames
+ */
+async function readFramedStream(reader) {
+    const textDecoder = new TextDecoder();
+    let buffer = new Uint8Array(0);
+    let pendingChunk = null;
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) {
+            console.log('[Streaming] Stream ended');
+            break;
+        }
+
+        const merged = new Uint8Array(buffer.length + value.length);
+        merged.set(buffer);
+        merged.set(value, buffer.length);
+        buffer = merged;
+
+        let offset = 0;
+        while (buffer.length - offset >= 5) {
+            const view = new DataView(buffer.buffer, buffer.byteOffset + offset, 5);
+            const frameType = view.getUint8(0);
+            const length = view.getUint32(1, true);
+            if (buffer.length - offset - 5 < length) break;  // Wait for the rest of the frame
+
+            const payload = buffer.slice(offset + 5, offset + 5 + length);
+            offset += 5 + length;
+
+            if (frameType === FRAME_CONTROL) {
+                const data = JSON.parse(textDecoder.decode(payload));
+                if (data.type === 'chunk') {
+                    pendingChunk = data;  // Audio follows in the next frame
+                } else {
+                    await handleStreamEvent(data);
+                }
+            } else if (frameType === FRAME_AUDIO && pendingChunk) {
+                await handleStreamEvent(pendingChunk, new Int16Array(payload.buffer));
+                pendingChunk = null;
+            }
+        }
+        buffer = buffer.slice(offset);
+    }
+}
+
 /**
  * Generate with streaming for long text
  */
@@ -1122,51 +1258,10 @@ async function generateWithStreaming(prefix, endpoint, requestBody) {
         }
 
         const reader = response.body.getReader();
-        const decoder = new TextDecoder();
-        let buffer = '';
-
-        while (true) {
-            const { done, value } = await reader.read();
-            console.log('[Streaming] Read chunk, done:', done, 'value length:', value?.length);
-            if (done) {
-                console.log('[Streaming] Stream ended');
-                break;
-            }
-
-            const decoded = decoder.decode(value, { stream: true });
-            console.log('[Streaming] Decoded:', decoded.substring(0, 100) + '...');
-            buffer += decoded;
-
-            // Process complete SSE messages
-            const lines = buffer.split('\n');
-            buffer = lines.pop() || '';  // Keep incomplete line in buffer
-
-            for (const line of lines) {
-                if (line.startsWith('data: ')) {
-                    try {
-                        const data = JSON.parse(line.slice(6));
-                        console.log('[Streaming] Parsed SSE event:', data.type);
-
-                        if (data.type === 'start') {
-                            streamingPlayer.totalChunks = data.total_chunks;
-                            showToast(`Streaming ${data.total_chunks} chunks...`, 'info');
-                        } else if (data.type === 'chunk') {
-                            console.log('[Streaming] Received chunk', data.chunk_index + 1, '/', data.total_chunks);
-                            await streamingPlayer.addChunk(data.audio, data.sample_rate);
-                        } else if (data.type === 'done') {
-                            await streamingPlayer.finalize();
-                            showToast('Generation complete!', 'success');
-                        } else if (data.type === 'error') {
-                            console.error('[Streaming] Server error:', data.error);
-                            throw new Error(data.error);
-                        }
-                    } catch (e) {
-                        if (e.message !== 'Unexpected end of JSON input') {
-                            console.error('[Streaming] Error parsing SSE:', e, 'Line:', line);
-                        }
-                    }
-                }
-            }
+        if (requestBody.transport === 'framed') {
+            await readFramedStream(reader);
+        } else {
+            await readSseStream(reader);
         }
         console.log('[Streaming] Finished processing stream');
     } catch (error) {
@@ -1240,6 +1335,19 @@ function switchLanguage(lang) {
 // UTILITY FUNCTIONS
 // ============================================
 
+/**
+ * Seed reused for every stream in this browser session, so re-rendering an
+ * edited text is served from the server's chunk cache except for changed chunks
+ */
+function getStreamSeed() {
+    let seed = sessionStorage.getItem('qwen-tts-stream-seed');
+    if (seed === null) {
+        seed = String(Math.floor(Math.random() * 2147483647));
+        sessionStorage.setItem('qwen-tts-stream-seed', seed);
+    }
+    return parseInt(seed, 10);
+}
+
 /**
  * Get headers with API key
  */
@@ -1722,10 +1830,12 @@ async function cloneVoice() {
             ref_audio_base64: audioBase64,
             ref_text: xVectorOnly ? null : refText,
             speed,
-            chunk_size: CONFIG.streaming.chunkSize
+            chunk_size: CONFIG.streaming.chunkSize,
+            incremental: CONFIG.streaming.incremental,
+            transport: CONFIG.streaming.transport
         };
         if (CONFIG.streaming.useSeed) {
-            requestBody.seed = Math.floor(Math.random() * 2147483647);
+            requestBody.seed = getStreamSeed();
         }
         return generateWithStreaming('vc', CONFIG.endpoints.base.cloneStream, requestBody);
     }
@@ -1869,10 +1979,12 @@ async function generateWithPrompt(text, language, speed) {
             language,
             prompt_id: state.selectedPromptId,
             speed,
-            chunk_size: CONFIG.streaming.chunkSize
+            chunk_size: CONFIG.streaming.chunkSize,
+            incremental: CONFIG.streaming.incremental,
+            transport: CONFIG.streaming.transport
         };
         if (CONFIG.streaming.useSeed) {
-            requestBody.seed = Math.floor(Math.random() * 2147483647);
+            requestBody.seed = getStreamSeed();
         }
         return generateWithStreaming('vc', CONFIG.endpoints.base.generateWithPromptStream, requestBody);
     }
@@ -0,0 +1,314 @@
+"""
+Qwen3-TTS Pipelined Streaming
+Runs model generation for upcoming chunks on a producer thread while an
+encoder thread serializes finished chunks, and the response drains a bounded
+queue. This keeps the accelerator busy while the client is still receiving.
+
+Also defines the wire formats chunks can be sent in: SSE with base64 audio,
+raw PCM, length-prefixed binary frames, one continuous compressed audio file,
+and WebSocket messages.
+"""
+import json
+import queue
+import base64
+import struct
+import concurrent.futures
+import asyncio
+import logging
+import threading
+import contextvars
+from typing import Any, Callable, Iterable, Optional
+
+import numpy as np
+
+from engine import SAMPLE_RATE, to_pcm16, pcm16_to_wav_bytes
+from audio_formats import ENCODERS, encode_audio, encoder_class, get_encoder
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class ChunkPipeline:
+    """Generate -> encode -> send pipeline over a list of text chunks.
+
+    ``produce(index, chunk)`` runs on the producer thread and may block on the
+    model; ``encode(index, chunk, result)`` runs on the encoder thread and
+    returns what the async iterator yields. At most ``lookahead`` generated
+    chunks wait for encoding, and at most ``lookahead`` encoded chunks wait to
+    be sent, so memory stays bounded when the client is slow.
+    """
+
+    def __init__(self, chunks: Iterable[Any], produce: Callable[[int, Any], Any],
+                 encode: Callable[[int, Any, Any], Any], lookahead: int = 2):
+        self.chunks = chunks
+        self.produce = produce
+        self.encode = encode
+        self.lookahead = max(1, lookahead)
+        self._generated: "queue.Queue" = queue.Queue(maxsize=self.lookahead)
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _put(self, q: "queue.Queue", item) -> bool:
+        """Blocking put that gives up once the pipeline is stopped."""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _producer(self):
+        try:
+            for i, chunk in enumerate(self.chunks):
+                if self._stop.is_set():
+                    return
+                result = self.produce(i, chunk)
+                if not self._put(self._generated, (i, chunk, result)):
+                    return
+            self._put(self._generated, _DONE)
+        except BaseException as e:
+            self._put(self._generated, _Failure(e))
+
+    def _encoder(self, loop: asyncio.AbstractEventLoop, ready: asyncio.Queue):
+        def send(item) -> bool:
+            future = asyncio.run_coroutine_threadsafe(ready.put(item), loop)
+            while not self._stop.is_set():
+                try:
+                    future.result(timeout=0.1)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    continue
+                except concurrent.futures.CancelledError:
+                    # The event loop shut down under a consumer that never finished
+                    return False
+            future.cancel()
+            return False
+
+        while not self._stop.is_set():
+            try:
+                item = self._generated.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE or isinstance(item, _Failure):
+                send(item)
+                return
+            i, chunk, result = item
+            try:
+                encoded = self.encode(i, chunk, result)
+            except BaseException as e:
+                send(_Failure(e))
+                return
+            if not send(encoded):
+                return
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def stopped(self) -> threading.Event:
+        """Set once the consumer has gone away; long-running producers can watch it."""
+        return self._stop
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        ready: asyncio.Queue = asyncio.Queue(maxsize=self.lookahead)
+        # Workers run in copies of the request's context, so per-request state (metric labels) carries over
+        self._threads = [
+            threading.Thread(target=contextvars.copy_context().run, args=(self._producer,),
+                             name="stream-producer", daemon=True),
+            threading.Thread(target=contextvars.copy_context().run, args=(self._encoder, loop, ready),
+                             name="stream-encoder", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        try:
+            while True:
+                item = await ready.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            # Client finished or disconnected: let the workers wind down after the current chunk
+            self.stop()
+
+
+def stream_lookahead(value: Optional[str], default: int = 2) -> int:
+    """Parse the configured number of chunks to generate ahead."""
+    try:
+        return max(1, int(value)) if value else default
+    except ValueError:
+        logger.warning(f"Invalid stream lookahead '{value}', using {default}")
+        return default
+
+
+class StreamFailed(Exception):
+    """Raised at the end of a raw audio body whose stream failed, so the connection is aborted."""
+
+
+class SSEFormat:
+    """Server-sent events with base64 audio inside JSON (the original format).
+
+    Each chunk is a self-contained file, WAV unless another audio format is
+    chosen; non-WAV chunks name it in a "format" field.
+    """
+
+    name = "sse"
+    media_type = "text/event-stream"
+
+    def __init__(self, audio_format: Optional[str] = None):
+        self.audio_format = audio_format or "wav"
+        if self.audio_format not in ENCODERS:
+            raise ValueError(f"Unknown audio format '{self.audio_format}'. Choose from: {', '.join(ENCODERS)}")
+
+    def control(self, data: dict):
+        return f"data: {json.dumps(data)}\n\n"
+
+    def chunk(self, meta: dict, audio: np.ndarray, sample_rate: int):
+        if self.audio_format == "wav":
+            wav_bytes = pcm16_to_wav_bytes(to_pcm16(audio), sample_rate)
+            data = dict(meta, audio=base64.b64encode(wav_bytes).decode('utf-8'), sample_rate=sample_rate)
+            return self.control(data)
+        encoded = encode_audio(audio, sample_rate, self.audio_format)
+        data = dict(meta, audio=base64.b64encode(encoded).decode('utf-8'), format=self.audio_format,
+                    sample_rate=getattr(encoder_class(self.audio_format), "target_rate", sample_rate))
+        return self.control(data)
+
+
+class PCMFormat:
+    """Raw 16-bit PCM over chunked HTTP (audio/L16, big-endian per RFC 2586).
+
+    Control events have no in-band representation and are dropped; the
+    sample rate is announced in the Content-Type. An error event is kept in
+    ``error`` so the response can abort the connection instead of ending
+    the body cleanly (see abort_on_error).
+    """
+
+    name = "pcm"
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE):
+        self.media_type = f"audio/L16;rate={sample_rate};channels=1"
+        self.error: Optional[str] = None
+
+    def control(self, data: dict):
+        if data.get("type") == "error":
+            self.error = data.get("error") or "Stream failed"
+        return b""
+
+    def chunk(self, meta: dict, audio: np.ndarray, sample_rate: int):
+        return to_pcm16(audio).astype(">i2").tobytes()
+
+
+# Frame types of the framed binary format
+FRAME_CONTROL = 1
+FRAME_AUDIO = 2
+
+
+def frame(frame_type: int, payload: bytes) -> bytes:
+    """One frame: 1-byte type, 4-byte little-endian payload length, payload."""
+    return struct.pack("<BI", frame_type, len(payload)) + payload
+
+
+class FramedFormat:
+    """Length-prefixed binary frames: JSON control frames and little-endian int16 PCM audio frames.
+
+    Each audio frame is preceded by a control frame with the chunk metadata
+    (type "chunk", sample_rate, samples, ...).
+    """
+
+    name = "framed"
+    media_type = "application/x-tts-frames"
+
+    def control(self, data: dict):
+        return frame(FRAME_CONTROL, json.dumps(data).encode("utf-8"))
+
+    def chunk(self, meta: dict, audio: np.ndarray, sample_rate: int):
+        pcm = to_pcm16(audio)
+        header = dict(meta, sample_rate=sample_rate, samples=len(pcm))
+        return self.control(header) + frame(FRAME_AUDIO, pcm.astype("<i2").tobytes())
+
+
+class EncodedAudioFormat:
+    """One continuous audio file over chunked HTTP, Ogg/Opus unless another format is chosen.
+
+    The encoder keeps its state across chunks, so the body plays as a single
+    file while it is still being generated. Control events have no in-band
+    representation; the final "done" event closes the encoder and flushes it,
+    and an error event is kept in ``error`` like PCMFormat does.
+    """
+
+    name = "audio"
+
+    def __init__(self, audio_format: Optional[str] = None, sample_rate: int = SAMPLE_RATE):
+        self.encoder = get_encoder(audio_format or "opus", sample_rate)
+        self.media_type = self.encoder.media_type
+        self.error: Optional[str] = None
+
+    def control(self, data: dict):
+        if data.get("type") == "done":
+            return self.encoder.close()
+        if data.get("type") == "error":
+            self.error = data.get("error") or "Stream failed"
+        return b""
+
+    def chunk(self, meta: dict, audio: np.ndarray, sample_rate: int):
+        return self.encoder.write(audio)
+
+
+class WebSocketFormat:
+    """Messages for the WebSocket endpoint: dicts go out as JSON text, bytes as binary frames."""
+
+    name = "websocket"
+    media_type = None
+
+    def control(self, data: dict):
+        return data
+
+    def chunk(self, meta: dict, audio: np.ndarray, sample_rate: int):
+        pcm = to_pcm16(audio)
+        return dict(meta, sample_rate=sample_rate, samples=len(pcm)), pcm.astype("<i2").tobytes()
+
+
+async def abort_on_error(messages, fmt):
+    """Pass a stream body through, then raise StreamFailed if the format recorded an error.
+
+    Raw audio transports have no error channel; raising once the body has
+    started makes the server drop the connection without the final chunk, so
+    clients see a truncated transfer rather than a complete, shorter file.
+    """
+    async for message in messages:
+        yield message
+    error = getattr(fmt, "error", None)
+    if error is not None:
+        raise StreamFailed(error)
+
+
+STREAM_FORMATS = {
+    "sse": SSEFormat,
+    "pcm": PCMFormat,
+    "framed": FramedFormat,
+    "audio": EncodedAudioFormat,
+}
+
+# Transports whose audio can be compressed (the others carry raw PCM)
+ENCODED_TRANSPORTS = ("sse", "audio")
+
+
+def get_stream_format(name: str, audio_format: Optional[str] = None):
+    """Instantiate an HTTP stream format by name, with an output audio format where it takes one."""
+    if name not in STREAM_FORMATS:
+        raise ValueError(f"Unknown transport '{name}'. Choose from: {', '.join(STREAM_FORMATS)}")
+    if name in ENCODED_TRANSPORTS:
+        return STREAM_FORMATS[name](audio_format)
+    if audio_format not in (None, "pcm"):
+        raise ValueError(f"Transport '{name}' sends raw PCM; audio_format needs transport 'sse' or 'audio'")
+    return STREAM_FORMATS[name]()
@@ -0,0 +1,55 @@
+"""
+Shared fixtures. The server is imported with the fake backend and with its
+outputs, voices and models in a scratch directory, so tests never touch the
+real outputs/ or need MLX.
+"""
+import io
+import os
+import sys
+import wave
+import base64
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+SCRATCH = tempfile.TemporaryDirectory(prefix="qwen-tts-tests-")
+os.environ["QWEN_TTS_BACKEND"] = "fake"
+os.environ["QWEN_TTS_OUTPUTS_DIR"] = os.path.join(SCRATCH.name, "outputs")
+os.environ["QWEN_TTS_VOICES_DIR"] = os.path.join(SCRATCH.name, "voices")
+
+
+@pytest.fixture(scope="session")
+def server():
+    import server as server_module
+
+    # Empty folders stand in for the models; the fake backend never reads them
+    models_dir = Path(SCRATCH.name) / "models"
+    for folder in server_module.MODEL_PATHS.values():
+        (models_dir / folder).mkdir(parents=True, exist_ok=True)
+    server_module.MODELS_DIR = models_dir
+    return server_module
+
+
+@pytest.fixture(scope="session")
+def client(server):
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def reference():
+    """One second of a 24 kHz tone as a base64 WAV, for use as reference audio."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(24000)
+        wav_file.writeframes((np.sin(np.arange(24000) / 10) * 8000).astype("<i2").tobytes())
+    return base64.b64encode(buffer.getvalue()).decode()
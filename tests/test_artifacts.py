@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+from artifacts import ArtifactStore, etag_matches
+
+
+def test_etag_matching():
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"x", "abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abcd"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_create_get_delete(tmp_path):
+    store = ArtifactStore(tmp_path)
+    artifact = store.create(b"data", "wav", "audio/wav", "clip", duration=1.0)
+    found = store.get(artifact["id"])
+    assert found["path"].read_bytes() == b"data"
+    assert found["filename"] == "clip.wav"
+    assert found["etag"].startswith('"') and len(found["etag"]) == 66
+    assert store.delete(artifact["id"])
+    assert store.get(artifact["id"]) is None
+    assert not store.delete(artifact["id"])
+
+
+def test_invalid_ids_are_not_looked_up(tmp_path):
+    store = ArtifactStore(tmp_path)
+    assert store.get("../../etc/passwd") is None
+    assert not store.delete("..")
+
+
+def test_oldest_are_removed_past_the_disk_limit_but_newest_is_kept(tmp_path):
+    store = ArtifactStore(tmp_path, max_bytes=25)
+    ids = [store.create(b"x" * 10, "wav", "audio/wav", "a")["id"] for _ in range(4)]
+    assert [store.get(i) is not None for i in ids] == [False, False, True, True]
+    assert store.stats()["bytes"] == 20
+
+    big = store.create(b"y" * 100, "wav", "audio/wav", "big")
+    assert store.get(big["id"]) is not None
+
+
+def test_index_is_rebuilt_from_disk(tmp_path):
+    first = ArtifactStore(tmp_path)
+    ids = [first.create(b"z" * 5, "opus", "audio/ogg", "a")["id"] for _ in range(3)]
+    reopened = ArtifactStore(tmp_path)
+    assert [a["id"] for a in reopened.recent()] == ids[::-1]
+    assert reopened.stats()["bytes"] == 15
+
+
+def test_expired_artifacts_are_hidden(tmp_path):
+    store = ArtifactStore(tmp_path, ttl_seconds=0.05)
+    artifact = store.create(b"data", "wav", "audio/wav", "clip")
+    time.sleep(0.1)
+    assert store.get(artifact["id"]) is None
+
+
+@pytest.fixture(scope="module")
+def artifact(client):
+    response = client.post("/api/v1/custom-voice/generate",
+                           json={"text": "Hello there friend", "response_format": "wav", "artifact": True})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_artifact_is_served_with_a_strong_etag(client, artifact):
+    response = client.get(artifact["url"])
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "audio/wav"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert len(response.content) == artifact["bytes"]
+    assert not response.headers["etag"].startswith("W/")
+
+
+def test_if_none_match_returns_304(client, artifact):
+    etag = client.get(artifact["url"]).headers["etag"]
+    assert client.get(artifact["url"], headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(artifact["url"], headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_range_requests(client, artifact):
+    full = client.get(artifact["url"])
+    partial = client.get(artifact["url"], headers={"Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == f"bytes 10-19/{artifact['bytes']}"
+    assert partial.content == full.content[10:20]
+
+    suffix = client.get(artifact["url"], headers={"Range": "bytes=-4"})
+    assert suffix.content == full.content[-4:]
+
+    unsatisfiable = client.get(artifact["url"], headers={"Range": f"bytes={artifact['bytes'] + 10}-"})
+    assert unsatisfiable.status_code == 416
+
+
+def test_if_range_with_a_stale_etag_sends_the_whole_file(client, artifact):
+    etag = client.get(artifact["url"]).headers["etag"]
+    assert client.get(artifact["url"], headers={"Range": "bytes=0-9", "If-Range": etag}).status_code == 206
+    assert client.get(artifact["url"], headers={"Range": "bytes=0-9", "If-Range": '"stale"'}).status_code == 200
+
+
+def test_unknown_artifact_is_404(client):
+    assert client.get("/api/v1/artifacts/" + "0" * 32).status_code == 404
@@ -0,0 +1,84 @@
+import base64
+import io
+import wave
+
+import numpy as np
+
+from asr import ASR_SAMPLE_RATE, FakeTranscriptionBackend, Transcriber, split_on_silence
+
+
+def tone(seconds, sr=ASR_SAMPLE_RATE):
+    return (np.sin(np.arange(int(seconds * sr)) / 5) * 0.5).astype(np.float32)
+
+
+def silence(seconds, sr=ASR_SAMPLE_RATE):
+    return np.zeros(int(seconds * sr), dtype=np.float32)
+
+
+def wav_base64(audio, sr=ASR_SAMPLE_RATE):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sr)
+        wav_file.writeframes((audio * 32767).astype("<i2").tobytes())
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def test_pauses_split_speech_regions():
+    audio = np.concatenate([tone(1), silence(0.5), tone(1)])
+    regions = split_on_silence(audio)
+    assert len(regions) == 2
+    assert regions[0][1] <= ASR_SAMPLE_RATE * 1.1 <= regions[1][0]
+
+
+def test_short_pauses_do_not_split():
+    audio = np.concatenate([tone(1), silence(0.1), tone(1)])
+    assert len(split_on_silence(audio)) == 1
+
+
+def test_regions_longer_than_the_window_are_cut():
+    regions = split_on_silence(tone(70), max_seconds=30)
+    assert len(regions) >= 3
+    assert all(end - start <= 31 * ASR_SAMPLE_RATE for start, end in regions)
+
+
+def test_long_clip_is_transcribed_per_segment():
+    transcriber = Transcriber(FakeTranscriptionBackend(), "tiny", segment_seconds=30)
+    short, long = tone(2), np.concatenate([tone(20), silence(1), tone(20)])
+    results = transcriber.transcribe_batch([short, long])
+    assert len(results[0]["segments"]) == 1
+    assert len(results[1]["segments"]) == 2
+    assert results[1]["text"] == " ".join(s["text"] for s in results[1]["segments"])
+    assert transcriber.loaded
+
+
+def test_cache_counts_hits_and_evicts_oldest():
+    transcriber = Transcriber(FakeTranscriptionBackend(), "tiny", cache_entries=1)
+    transcriber.store("a", {"text": "a"})
+    assert transcriber.cached("a") == {"text": "a"}
+    transcriber.store("b", {"text": "b"})
+    assert transcriber.cached("a") is None
+    assert transcriber.stats()["hits"] == 1 and transcriber.stats()["misses"] == 1
+
+
+def test_transcribe_endpoint_caches_by_content(client):
+    body = {"ref_audio_base64": wav_base64(tone(1.5))}
+    first = client.post("/api/v1/base/transcribe", json=body).json()
+    second = client.post("/api/v1/base/transcribe", json=body).json()
+    assert first["text"] and first["cached"] is False
+    assert second == dict(first, cached=True)
+
+
+def test_batch_endpoint_keeps_clip_order(client):
+    clips = [wav_base64(tone(seconds)) for seconds in (0.5, 1.0, 2.0)]
+    results = client.post("/api/v1/base/transcribe/batch", json={"clips": clips}).json()["results"]
+    assert [r["duration"] for r in results] == [0.5, 1.0, 2.0]
+
+
+def test_batch_endpoint_rejects_bad_input(client):
+    assert client.post("/api/v1/base/transcribe/batch", json={"clips": []}).status_code == 400
+    response = client.post("/api/v1/base/transcribe/batch",
+                           json={"clips": [wav_base64(tone(0.5)), base64.b64encode(b"not audio").decode()]})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Clip 1")
@@ -0,0 +1,90 @@
+import io
+import struct
+
+import numpy as np
+import pytest
+
+from audio_formats import ENCODERS, MulawEncoder, WavEncoder, encode_audio, get_encoder, mulaw_encode
+
+sf = pytest.importorskip("soundfile")
+
+SR = 24000
+AUDIO = (0.3 * np.sin(2 * np.pi * 220 * np.arange(SR) / SR)).astype(np.float32)
+
+
+def supported(name):
+    encoder = ENCODERS[name]
+    return getattr(encoder, "format", "") in sf.available_formats() or not getattr(encoder, "format", "")
+
+
+def pieces(audio, size=4800):
+    return [audio[i:i + size] for i in range(0, len(audio), size)]
+
+
+@pytest.mark.parametrize("name", ["wav", "flac", "opus", "mp3"])
+def test_whole_file_decodes_to_the_same_length(name):
+    if not supported(name):
+        pytest.skip(f"libsndfile cannot write {name}")
+    decoded, sr = sf.read(io.BytesIO(encode_audio(AUDIO, SR, name)), dtype="float32")
+    assert sr == SR
+    # Lossy codecs may pad to whole frames
+    assert abs(len(decoded) - len(AUDIO)) <= (0 if name in ("wav", "flac") else 2048)
+
+
+def test_flac_is_lossless_at_16_bit():
+    pcm = (AUDIO * 32767).astype(np.int16)
+    decoded, _ = sf.read(io.BytesIO(encode_audio(pcm / 32768.0, SR, "flac")), dtype="int16")
+    assert np.array_equal(decoded, pcm)
+
+
+@pytest.mark.parametrize("name", ["opus", "mp3"])
+def test_streamed_lossy_output_decodes_to_the_full_length(name):
+    if not supported(name):
+        pytest.skip(f"libsndfile cannot write {name}")
+    encoder = get_encoder(name, SR)
+    data = b"".join(encoder.write(piece) for piece in pieces(AUDIO)) + encoder.close()
+    decoded, _ = sf.read(io.BytesIO(data), dtype="float32")
+    assert abs(len(decoded) - len(AUDIO)) <= 2048
+
+
+def test_streamed_bytes_are_available_before_close():
+    if not supported("opus"):
+        pytest.skip("libsndfile cannot write opus")
+    encoder = get_encoder("opus", SR)
+    sent = sum(len(encoder.write(piece)) for piece in pieces(np.tile(AUDIO, 3)))
+    assert sent > 0
+    encoder.close()
+
+
+def test_streamed_wav_has_open_ended_header():
+    encoder = WavEncoder(SR)
+    first = encoder.write(AUDIO[:100])
+    riff, riff_size, wave, _ = struct.unpack("<4sI4s4s", first[:16])
+    assert (riff, wave) == (b"RIFF", b"WAVE")
+    assert riff_size == 0xFFFFFFFF
+    assert len(first) == 44 + 200
+    assert len(encoder.write(AUDIO[100:200])) == 200
+
+
+def test_mulaw_known_values():
+    pcm = np.array([0, 32767, -32768, 100, -100], dtype=np.int16)
+    encoded = mulaw_encode(pcm)
+    assert encoded[0] == 0xFF
+    assert encoded[1] == 0x80
+    assert encoded[2] == 0x00
+    assert encoded[3] > 0x80 and encoded[4] < 0x80
+
+
+def test_mulaw_stream_is_resampled_to_8khz():
+    pytest.importorskip("soxr")
+    encoder = MulawEncoder(SR)
+    data = b"".join(encoder.write(piece) for piece in pieces(AUDIO)) + encoder.close()
+    assert abs(len(data) - len(AUDIO) // 3) <= 8
+    assert encode_audio(AUDIO, SR, "mulaw") == data
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        get_encoder("ogg", SR)
+    with pytest.raises(ValueError):
+        encode_audio(AUDIO, SR, "ogg")
@@ -0,0 +1,111 @@
+import base64
+import io
+import threading
+import wave
+
+import numpy as np
+import pytest
+
+from audio_ingest import AudioDecodeError, ReferenceAudioCache, decode_audio, normalize_audio
+
+
+def wav_bytes(samples, sr=24000, width=2):
+    """WAV of int samples shaped (frames, channels) at the given sample width."""
+    samples = np.asarray(samples)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    if width == 1:
+        raw = (samples + 128).astype(np.uint8).tobytes()
+    elif width == 3:
+        raw = b"".join(int(v).to_bytes(3, "little", signed=True) for v in samples.reshape(-1))
+    else:
+        raw = samples.astype(f"<i{width}").tobytes()
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(samples.shape[1])
+        wav_file.setsampwidth(width)
+        wav_file.setframerate(sr)
+        wav_file.writeframes(raw)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("width, scale", [(1, 64), (2, 16384), (3, 1 << 22), (4, 1 << 30)])
+def test_wav_sample_widths_decode_to_half_scale(width, scale):
+    audio, sr = decode_audio(wav_bytes([scale, -scale, 0], width=width))
+    assert sr == 24000
+    np.testing.assert_allclose(audio[:, 0], [0.5, -0.5, 0.0], atol=1e-2)
+
+
+def test_stereo_is_mixed_down_and_resampled():
+    left = (np.sin(np.arange(48000) / 10) * 8000).astype(np.int16)
+    audio = normalize_audio(wav_bytes(np.stack([left, left], axis=1), sr=48000))
+    assert audio.dtype == np.float32 and audio.ndim == 1
+    assert abs(len(audio) - 24000) <= 1
+
+
+def test_flac_goes_through_soundfile():
+    sf = pytest.importorskip("soundfile")
+    buffer = io.BytesIO()
+    sf.write(buffer, np.zeros(1600, dtype=np.float32), 16000, format="FLAC")
+    assert abs(len(normalize_audio(buffer.getvalue())) - 2400) <= 1
+
+
+def test_garbage_raises_decode_error():
+    with pytest.raises(AudioDecodeError):
+        decode_audio(b"definitely not audio" * 10)
+
+
+def test_cache_returns_the_same_read_only_array():
+    cache = ReferenceAudioCache()
+    data = wav_bytes(np.arange(2400, dtype=np.int16))
+    digest, first = cache.ingest(data)
+    again, second = cache.ingest(data)
+    assert digest == again and second is first
+    assert not first.flags.writeable
+
+
+def test_cache_evicts_oldest_past_its_byte_limit():
+    cache = ReferenceAudioCache(max_bytes=2400 * 4 * 2)
+    clips = [wav_bytes(np.full(2400, i, dtype=np.int16)) for i in range(3)]
+    for clip in clips:
+        cache.ingest(clip)
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_clone_accepts_resampled_stereo_reference(client):
+    stereo = (np.sin(np.arange(16000) / 10) * 8000).astype(np.int16)
+    reference = base64.b64encode(wav_bytes(np.stack([stereo, stereo], axis=1), sr=16000)).decode()
+    response = client.post("/api/v1/base/clone", json={"ref_audio_base64": reference, "text": "Hello"})
+    assert response.status_code == 200
+
+
+def test_clone_rejects_undecodable_reference_with_400(client):
+    reference = base64.b64encode(b"not audio at all" * 8).decode()
+    response = client.post("/api/v1/base/clone", json={"ref_audio_base64": reference, "text": "Hello"})
+    assert response.status_code == 400
+
+
+def test_concurrent_lookups_are_all_counted():
+    cache = ReferenceAudioCache()
+    data = wav_bytes(np.arange(2400, dtype=np.int16))
+    cache.ingest(data)
+    threads = [threading.Thread(target=lambda: [cache.ingest(data) for _ in range(200)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1600, 1)
+    assert stats["hit_rate_percent"] == pytest.approx(1600 / 1601 * 100)
+
+
+def test_repeat_reference_reuses_its_features(client, reference):
+    client.post("/api/v1/cache/references/clear")
+    body = {"ref_audio_base64": reference, "text": "Hello", "seed": 4}
+    first = client.post("/api/v1/base/clone", json=body)
+    second = client.post("/api/v1/base/clone", json=dict(body, seed=5))
+    assert first.status_code == second.status_code == 200
+    stats = client.get("/api/v1/cache/references/stats").json()
+    assert stats["audio"]["hits"] == 1 and stats["audio"]["hit_rate_percent"] == 50.0
+    assert stats["features"]["hits"] == 1
@@ -0,0 +1,19 @@
+import json
+
+import pytest
+
+from bench.suite import audio_seconds
+
+
+def sse(*events):
+    return "".join(f"data: {json.dumps(event)}\n\n" for event in events).encode()
+
+
+def test_stream_error_event_is_raised_with_its_message():
+    body = sse({"type": "start"}, {"type": "error", "error": "Prompt ID not found: x"})
+    with pytest.raises(RuntimeError, match="Prompt ID not found"):
+        audio_seconds("prompt_stream", body)
+
+
+def test_empty_stream_has_no_audio():
+    assert audio_seconds("clone_stream", sse({"type": "start"}, {"type": "done", "total_chunks": 0})) == 0.0
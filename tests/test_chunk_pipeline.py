@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from streaming import ChunkPipeline, stream_lookahead
+
+
+def collect(pipeline, limit=None):
+    async def run():
+        items = []
+        async for item in pipeline:
+            items.append(item)
+            if limit is not None and len(items) >= limit:
+                break
+        return items
+
+    return asyncio.run(run())
+
+
+def test_chunks_are_yielded_in_order():
+    pipeline = ChunkPipeline(["a", "b", "c"], lambda i, chunk: chunk.upper(), lambda i, chunk, result: (i, result))
+    assert collect(pipeline) == [(0, "A"), (1, "B"), (2, "C")]
+
+
+def test_next_chunk_is_generated_while_the_previous_one_is_encoded():
+    produced = []
+    encoding = threading.Event()
+
+    def produce(i, chunk):
+        time.sleep(0.05)
+        produced.append((i, encoding.is_set()))
+        return chunk
+
+    def encode(i, chunk, result):
+        encoding.set()
+        time.sleep(0.1)
+        encoding.clear()
+        return result
+
+    collect(ChunkPipeline(range(3), produce, encode))
+    assert any(during_encode for _, during_encode in produced[1:])
+
+
+def test_producer_stays_a_bounded_distance_ahead_of_a_slow_consumer():
+    produced = []
+
+    async def slow_consumer():
+        pipeline = ChunkPipeline(range(50), lambda i, chunk: produced.append(i), lambda i, chunk, result: i,
+                                 lookahead=2)
+        async for _ in pipeline:
+            await asyncio.sleep(0.05)
+            if len(produced) > 10:
+                return False
+            if _ == 3:
+                return True
+
+    assert asyncio.run(slow_consumer())
+
+
+def test_generation_errors_reach_the_consumer():
+    def produce(i, chunk):
+        if i == 1:
+            raise RuntimeError("model failed")
+        return chunk
+
+    with pytest.raises(RuntimeError, match="model failed"):
+        collect(ChunkPipeline(range(3), produce, lambda i, chunk, result: result))
+
+
+def test_consumer_leaving_early_stops_the_workers():
+    pipeline = ChunkPipeline(range(1000), lambda i, chunk: chunk, lambda i, chunk, result: result)
+    assert collect(pipeline, limit=2) == [0, 1]
+    assert pipeline._stop.is_set()
+    for thread in pipeline._threads:
+        thread.join(2)
+        assert not thread.is_alive()
+
+
+def test_lookahead_setting_falls_back_on_bad_values():
+    assert stream_lookahead("4") == 4
+    assert stream_lookahead("0") == 1
+    assert stream_lookahead("many") == 2
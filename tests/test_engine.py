@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from engine import FakeBackend, GenerationEngine
+
+TEXT = "The quick brown fox jumps over the lazy dog. It was a sunny day."
+
+
+@pytest.fixture
+def engine():
+    engine = GenerationEngine(FakeBackend())
+    return engine, engine.load("fake-model")
+
+
+@pytest.mark.parametrize("interval", [0.05, 0.25, 1.0])
+def test_incremental_segments_join_to_the_full_waveform(engine, interval):
+    engine, model = engine
+    full, sr = engine.generate(model, TEXT, voice="Vivian")
+    segments = list(engine.stream(model, TEXT, interval=interval, voice="Vivian"))
+    assert all(segment_sr == sr for _, segment_sr in segments)
+    joined = np.concatenate([audio for audio, _ in segments])
+    assert len(joined) == len(full)
+    assert np.array_equal(joined, full)
+
+
+def test_incremental_stream_yields_several_segments(engine):
+    engine, model = engine
+    segments = list(engine.stream(model, TEXT, interval=0.25))
+    assert len(segments) > 1
@@ -0,0 +1,38 @@
+import base64
+import io
+import tempfile
+import wave
+
+import pytest
+
+
+@pytest.fixture
+def no_temp_files(monkeypatch):
+    def refuse(*args, **kwargs):
+        raise AssertionError("generation wrote a temporary file")
+
+    monkeypatch.setattr(tempfile, "mkdtemp", refuse)
+    monkeypatch.setattr(tempfile, "TemporaryDirectory", refuse)
+
+
+def read_wav(content):
+    with wave.open(io.BytesIO(content)) as wav_file:
+        return wav_file.getframerate(), wav_file.getsampwidth(), wav_file.getnframes()
+
+
+def test_base64_response_is_generated_in_memory(client, no_temp_files):
+    response = client.post("/api/v1/custom-voice/generate", json={"text": "Hello there."})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["format"] == "wav"
+    sample_rate, width, frames = read_wav(base64.b64decode(body["audio"]))
+    assert (sample_rate, width) == (body["sample_rate"], 2)
+    assert frames > 0
+
+
+def test_wav_response_is_generated_in_memory(client, no_temp_files):
+    response = client.post("/api/v1/voice-design/generate",
+                           json={"text": "Hello there.", "instruct": "A calm voice", "response_format": "wav"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "audio/wav"
+    assert read_wav(response.content)[2] > 0
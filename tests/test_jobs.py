@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from jobs import JobRunner, JobStore, parse_rows, safe_output_name
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return
+        time.sleep(0.02)
+    raise AssertionError("condition not met in time")
+
+
+def test_jsonl_rows_get_modes_and_numbered_outputs():
+    rows = parse_rows('{"text": "Hi", "speaker": "Ryan"}\n\n{"text": "Calm", "instruct": "Soft"}\n'
+                      '{"text": "Me", "prompt_id": "p1", "name": "mine"}', "jsonl")
+    assert [row["mode"] for row in rows] == ["custom_voice", "voice_design", "prompt"]
+    assert rows[0]["voice"] == "Ryan"
+    assert [row["output"] for row in rows] == ["00000", "00001", "mine"]
+
+
+def test_csv_rows_are_typed():
+    rows = parse_rows("text,speed,seed\nHello,1.25,7\n", "csv")
+    assert rows == [{"text": "Hello", "speed": 1.25, "seed": 7, "mode": "custom_voice", "output": "00000"}]
+
+
+@pytest.mark.parametrize("body, message", [
+    ('{"text": "ok"}\n{"text": ""}', "Line 2: text is required"),
+    ('{"text": "ok", "colour": "red"}', "unknown column 'colour'"),
+    ('{"text": "a", "output": "x"}\n{"text": "b", "output": "x"}', "duplicate output name"),
+    ("not json", "Line 1: invalid JSON"),
+])
+def test_bad_rows_name_the_line(body, message):
+    with pytest.raises(ValueError, match=message):
+        parse_rows(body, "jsonl")
+
+
+def test_output_names_cannot_escape_the_job_folder():
+    assert safe_output_name("../../etc/passwd") == "etc_passwd"
+
+
+def test_rows_are_claimed_grouped_by_model(tmp_path):
+    store = JobStore(tmp_path / "jobs.db")
+    rows = parse_rows("\n".join(json.dumps({"text": t}) for t in "abcd"), "jsonl")
+    job_id = store.create(rows, ["pro", "lite", "pro", "lite"])
+    claimed = [store.claim_row(job_id)["index"] for _ in range(4)]
+    assert claimed == [1, 3, 0, 2]
+    assert store.claim_row(job_id) is None
+
+
+def test_interrupted_rows_resume_after_restart(tmp_path):
+    store = JobStore(tmp_path / "jobs.db")
+    job_id = store.create(parse_rows('{"text": "a"}', "jsonl"), ["m"])
+    store.set_status(job_id, "running")
+    store.claim_row(job_id)
+
+    restarted = JobStore(tmp_path / "jobs.db")
+    assert restarted.recover() == 1
+    assert restarted.job(job_id)["status"] == "queued"
+    assert restarted.job(job_id)["rows"]["pending"] == 1
+
+
+def fake_row(params, cancel):
+    if params["text"] == "fail":
+        raise RuntimeError("model exploded")
+    return np.zeros(2400, dtype=np.float32), 24000
+
+
+@pytest.fixture
+def runner(tmp_path):
+    store = JobStore(tmp_path / "jobs.db")
+    runner = JobRunner(store, fake_row, tmp_path / "outputs", row_concurrency=2)
+    yield runner
+    runner.stop(timeout=2)
+
+
+def test_runner_writes_outputs_and_a_manifest(runner, tmp_path):
+    job_id = runner.store.create(parse_rows('{"text": "a", "output": "one"}\n{"text": "fail"}', "jsonl"), ["m", "m"])
+    runner.start()
+    wait_for(lambda: runner.store.job(job_id)["status"] == "failed")
+
+    job = runner.store.job(job_id)
+    assert job["rows"]["done"] == 1 and job["rows"]["failed"] == 1
+    assert (tmp_path / "outputs" / job_id / "one.wav").exists()
+    manifest = json.loads((tmp_path / "outputs" / job_id / "manifest.json").read_text())
+    assert [item["status"] for item in manifest["items"]] == ["done", "failed"]
+    assert "model exploded" in manifest["items"][1]["error"]
+
+
+def test_retry_requeues_only_failed_rows(runner):
+    job_id = runner.store.create(parse_rows('{"text": "a"}\n{"text": "fail"}', "jsonl"), ["m", "m"])
+    runner.start()
+    wait_for(lambda: runner.store.job(job_id)["status"] == "failed")
+    assert runner.retry(job_id) == 1
+    wait_for(lambda: runner.store.job(job_id)["status"] == "failed")
+    assert runner.store.job(job_id)["rows"]["done"] == 1
+
+
+def test_cancel_stops_a_running_job(tmp_path):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_row(params, cancel):
+        started.set()
+        release.wait(5)
+        return np.zeros(10, dtype=np.float32), 24000
+
+    runner = JobRunner(JobStore(tmp_path / "jobs.db"), slow_row, tmp_path / "outputs", row_concurrency=1)
+    job_id = runner.store.create(parse_rows("\n".join('{"text": "x"}' for _ in range(5)), "jsonl"), ["m"] * 5)
+    try:
+        runner.start()
+        assert started.wait(5)
+        assert runner.cancel(job_id)
+        release.set()
+        wait_for(lambda: runner.stats()["running"] == [])
+        job = runner.store.job(job_id)
+        assert job["status"] == "cancelled"
+        assert job["rows"]["pending"] == 0 and job["rows"]["done"] <= 1
+    finally:
+        release.set()
+        runner.stop(timeout=2)
+
+
+def test_job_api_generates_every_row(client, server):
+    body = '{"text": "Hello there", "output": "hello"}\n{"text": "A designed voice", "instruct": "Warm and slow"}'
+    response = client.post("/api/v1/jobs", content=body)
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    wait_for(lambda: client.get(f"/api/v1/jobs/{job_id}").json()["status"] == "completed", timeout=10)
+    rows = client.get(f"/api/v1/jobs/{job_id}/rows").json()["rows"]
+    assert [row["file"] for row in rows] == ["hello.wav", "00001.wav"]
+    assert (server.OUTPUTS_DIR / job_id / "hello.wav").exists()
+
+
+def test_job_api_rejects_bad_rows(client):
+    response = client.post("/api/v1/jobs", content='{"text": "Hi", "prompt_id": "missing"}')
+    assert response.status_code == 400
+    assert "prompt ID not found" in response.json()["detail"]
@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from lifecycle import Lifecycle, DrainMiddleware
+
+
+@pytest.fixture
+def lifecycle():
+    lifecycle = Lifecycle()
+    lifecycle.serving()
+    return lifecycle
+
+
+@pytest.fixture
+def app_client(lifecycle):
+    app = FastAPI()
+    app.add_middleware(DrainMiddleware, lifecycle=lifecycle, exempt=("/health",), retry_after=7)
+
+    @app.get("/work")
+    async def work():
+        return {"inflight": lifecycle.inflight}
+
+    @app.get("/health")
+    async def health():
+        return {"state": lifecycle.state}
+
+    @app.websocket("/ws")
+    async def ws(websocket: WebSocket):
+        await websocket.accept()
+        await websocket.send_json({"inflight": lifecycle.inflight})
+        await websocket.close()
+
+    return TestClient(app)
+
+
+def test_wait_idle_waits_for_in_flight_work(lifecycle):
+    lifecycle.enter()
+    assert not lifecycle.wait_idle(timeout=0.05)
+    threading.Timer(0.05, lifecycle.exit).start()
+    assert lifecycle.wait_idle(timeout=2)
+
+
+def test_drain_hooks_run_once(lifecycle):
+    calls = []
+    lifecycle.on_drain(lambda: calls.append(1))
+    lifecycle.begin_drain()
+    lifecycle.begin_drain()
+    assert calls == [1]
+    assert lifecycle.draining
+
+
+def test_requests_count_as_in_flight_but_websockets_do_not(app_client):
+    assert app_client.get("/work").json() == {"inflight": 1}
+    with app_client.websocket_connect("/ws") as websocket:
+        assert websocket.receive_json() == {"inflight": 0}
+
+
+def test_new_work_is_refused_while_draining(app_client, lifecycle):
+    lifecycle.begin_drain()
+    response = app_client.get("/work")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "7"
+    assert app_client.get("/health").json() == {"state": "draining"}
+    with pytest.raises(WebSocketDisconnect) as info:
+        with app_client.websocket_connect("/ws"):
+            pass
+    assert info.value.code == 1012
+    assert lifecycle.rejected == 2
+
+
+@pytest.fixture
+def draining_server(server, monkeypatch):
+    # Keep the background job runner alive for the rest of the session
+    monkeypatch.setattr(server.lifecycle, "_on_drain", [])
+    yield server.lifecycle
+    server.lifecycle.serving()
+
+
+def test_ready_reports_draining(client, draining_server):
+    draining_server.begin_drain()
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert "draining" in response.json()["reasons"]
+
+
+def test_idle_websocket_is_closed_when_draining_starts(client, draining_server, reference):
+    with client.websocket_connect("/api/v1/ws/stream") as websocket:
+        websocket.send_json({"action": "start", "mode": "clone",
+                             "request": {"ref_audio_base64": reference, "text": "Hello there.", "seed": 1}})
+        while True:
+            message = websocket.receive()
+            if "text" in message and '"done"' in message["text"]:
+                break
+        # Finished streaming, the open session no longer holds up a drain
+        assert draining_server.inflight == 0
+        draining_server.begin_drain()
+        with pytest.raises(WebSocketDisconnect) as info:
+            websocket.receive_json()
+        assert info.value.code == 1001
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from engine import GenerationEngine, get_backend, to_pcm16
+from longform import LongformRenderer, derive_seed
+from model_pool import ModelPool
+
+TEXTS = ["The first chunk.", "A second, longer chunk of text.", "Third.", "And the fourth one to finish."]
+
+
+@pytest.fixture(scope="module")
+def renderer():
+    renderer = LongformRenderer("fake", workers=2)
+    yield renderer
+    renderer.shutdown()
+
+
+def test_seed_depends_on_request_seed_and_text():
+    assert derive_seed(7, "Hello") == derive_seed(7, "Hello")
+    assert derive_seed(7, "Hello") != derive_seed(8, "Hello")
+    assert derive_seed(7, "Hello") != derive_seed(7, "Hello.")
+
+
+def test_chunks_come_back_in_order_and_match_a_local_render(renderer, tmp_path):
+    engine = GenerationEngine(get_backend("fake"))
+    model = engine.load(str(tmp_path))
+    expected = []
+    for text in TEXTS:
+        engine.seed(derive_seed(42, text))
+        audio, _ = engine.generate(model, text, voice="Vivian")
+        expected.append(to_pcm16(audio))
+
+    rendered = [audio for audio, sr in renderer.render(tmp_path, TEXTS, 42, voice="Vivian")]
+    assert len(rendered) == len(TEXTS)
+    for got, want in zip(rendered, expected):
+        np.testing.assert_array_equal(got, want)
+
+
+def test_seeded_renders_are_identical(renderer, tmp_path):
+    first = [audio for audio, _ in renderer.render(tmp_path, TEXTS, 5, voice="Ryan")]
+    second = [audio for audio, _ in renderer.render(tmp_path, TEXTS, 5, voice="Ryan")]
+    for a, b in zip(first, second):
+        np.testing.assert_array_equal(a, b)
+    assert renderer.stats()["chunks_rendered"] >= 2 * len(TEXTS)
+
+
+def test_worker_models_are_reserved_in_the_pool_until_shutdown(tmp_path):
+    (tmp_path / "model.safetensors").write_bytes(b"\0" * 1000)
+    pool = ModelPool(lambda path: object(), budget_bytes=10_000)
+    renderer = LongformRenderer("fake", workers=2, model_pool=pool)
+    try:
+        list(renderer.render(tmp_path, TEXTS[:1], 1))
+        assert pool.reserved_bytes == 2000
+    finally:
+        renderer.shutdown()
+    assert pool.reserved_bytes == 0
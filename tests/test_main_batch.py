@@ -0,0 +1,63 @@
+import json
+import os
+import subprocess
+import sys
+import wave
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def workdir(tmp_path):
+    """A working directory with an (empty) lite custom voice model, as main.py expects."""
+    (tmp_path / "models" / "Qwen3-TTS-12Hz-0.6B-CustomVoice-8bit").mkdir(parents=True)
+    return tmp_path
+
+
+def run_batch(workdir, *args):
+    env = dict(os.environ, QWEN_TTS_BACKEND="fake")
+    return subprocess.run([sys.executable, str(ROOT / "main.py"), "batch", "--model", "lite_custom", *args],
+                          cwd=workdir, env=env, capture_output=True, text=True, timeout=120)
+
+
+def test_batch_generates_every_line_and_writes_a_summary(workdir):
+    (workdir / "lines.jsonl").write_text('{"text": "Hello there", "output": "hello"}\n'
+                                         '{"text": "Second line", "seed": 3}\n')
+    result = run_batch(workdir, "--input", "lines.jsonl", "--out", "out")
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    with wave.open(str(workdir / "out" / "hello.wav")) as wav_file:
+        assert wav_file.getframerate() == 24000 and wav_file.getnframes() > 0
+    summary = json.loads((workdir / "out" / "summary.json").read_text())
+    assert (summary["generated"], summary["failed"]) == (2, 0)
+    assert [line["output"] for line in summary["lines_detail"]] == ["hello.wav", "00001.wav"]
+
+
+def test_rerun_skips_finished_lines(workdir):
+    (workdir / "lines.txt").write_text("One\nTwo\n")
+    run_batch(workdir, "--input", "lines.txt", "--out", "out")
+    (workdir / "out" / "00001.wav").unlink()
+    result = run_batch(workdir, "--input", "lines.txt", "--out", "out")
+    summary = json.loads((workdir / "out" / "summary.json").read_text())
+    assert result.returncode == 0
+    assert (summary["generated"], summary["skipped"]) == (1, 1)
+
+
+def test_parallel_workers_match_a_single_worker(workdir):
+    (workdir / "lines.jsonl").write_text("".join(json.dumps({"text": f"Line number {i}", "seed": i}) + "\n"
+                                                 for i in range(4)))
+    assert run_batch(workdir, "--input", "lines.jsonl", "--out", "one").returncode == 0
+    assert run_batch(workdir, "--input", "lines.jsonl", "--out", "two", "--workers", "2").returncode == 0
+    for i in range(4):
+        name = f"{i:05d}.wav"
+        assert (workdir / "one" / name).read_bytes() == (workdir / "two" / name).read_bytes()
+
+
+def test_bad_input_fails_with_an_error(workdir):
+    (workdir / "lines.jsonl").write_text('{"text": ""}\n')
+    result = run_batch(workdir, "--input", "lines.jsonl", "--out", "out")
+    assert result.returncode == 1
+    assert "text is required" in result.stdout
@@ -0,0 +1,50 @@
+import contextvars
+import threading
+
+from metrics import MetricsRegistry, begin_request, registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    metrics = MetricsRegistry()
+    histogram = metrics.histogram("latency_seconds", "Latency", ["stage"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="a")
+    histogram.observe(0.5, stage="a")
+    text = metrics.render()
+    assert 'latency_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{stage="a",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{stage="a"} 2' in text
+
+
+def test_label_values_are_escaped():
+    metrics = MetricsRegistry()
+    metrics.counter("hits_total", "Hits", ["path"]).inc(path='say "hi"\n')
+    assert 'hits_total{path="say \\"hi\\"\\n"} 1' in metrics.render()
+
+
+def test_metrics_endpoint_reports_stages_by_endpoint(client):
+    client.post("/api/v1/custom-voice/generate", json={"text": "Hello", "seed": 11})
+    text = client.get("/metrics").text
+    assert 'stage="inference",endpoint="/api/v1/custom-voice/generate",model="custom_voice_lite",tier="lite"' in text
+
+
+def test_batched_requests_keep_their_own_labels(server):
+    release, started = threading.Event(), threading.Event()
+    server.scheduler.submit(lambda: started.set() or release.wait(5))
+    assert started.wait(2)
+
+    jobs = []
+    for endpoint in ("/batch-a", "/batch-b"):
+        def submit():
+            begin_request(endpoint)
+            fn, args, options = server.generation_job("custom_voice", "custom_voice_lite", "Hi there", None,
+                                                      voice="Vivian", instruct="Normal tone", speed=1.0)
+            return server.scheduler.submit(fn, *args, **options)
+        jobs.append(contextvars.copy_context().run(submit))
+    release.set()
+    for job in jobs:
+        job.future.result(5)
+
+    text = registry.render()
+    for endpoint in ("/batch-a", "/batch-b"):
+        assert f'stage="inference",endpoint="{endpoint}",model="custom_voice_lite",tier="lite"' in text
+        assert f'qwen_tts_audio_seconds_total{{endpoint="{endpoint}",model="custom_voice_lite",tier="lite"}}' in text
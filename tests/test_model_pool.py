@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from model_pool import ModelPool, LatencyTracker, budget_from_env, estimate_model_bytes
+
+
+def model_dir(tmp_path, name, size):
+    path = tmp_path / name
+    path.mkdir()
+    (path / "model.safetensors").write_bytes(b"\0" * size)
+    return path
+
+
+def test_estimate_sums_safetensors_files(tmp_path):
+    path = model_dir(tmp_path, "m", 1000)
+    (path / "extra.safetensors").write_bytes(b"\0" * 500)
+    assert estimate_model_bytes(path) == 1500
+
+
+def test_hit_returns_the_loaded_model(tmp_path):
+    loads = []
+    pool = ModelPool(lambda path: loads.append(path) or object(), budget_bytes=10_000)
+    path = model_dir(tmp_path, "a", 1000)
+    assert pool.get("a", path) is pool.get("a", path)
+    assert len(loads) == 1
+    assert pool.stats()["hits"] == 1 and pool.stats()["misses"] == 1
+
+
+def test_least_recently_used_model_is_evicted_over_budget(tmp_path):
+    pool = ModelPool(lambda path: object(), budget_bytes=2500)
+    paths = {name: model_dir(tmp_path, name, 1000) for name in "abc"}
+    pool.get("a", paths["a"])
+    pool.get("b", paths["b"])
+    pool.get("a", paths["a"])  # b is now the least recently used
+    pool.get("c", paths["c"])
+    assert pool.is_loaded("a") and pool.is_loaded("c")
+    assert not pool.is_loaded("b")
+    assert pool.resident_bytes == 2000
+    assert pool.evictions == 1
+
+
+def test_concurrent_loads_of_different_models_stay_within_budget(tmp_path):
+    peak = []
+    pool = ModelPool(None, budget_bytes=2500)
+
+    def loader(path):
+        peak.append(pool.resident_bytes + pool.reserved_bytes)
+        time.sleep(0.05)
+        return object()
+
+    pool.loader = loader
+    pool.get("a", model_dir(tmp_path, "a", 1000))
+    paths = [model_dir(tmp_path, name, 1000) for name in "bc"]
+    threads = [threading.Thread(target=pool.get, args=(path.name, path)) for path in paths]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) <= 2500
+    assert pool.resident_bytes <= 2500
+    assert pool.reserved_bytes == 0
+
+
+def test_failed_load_releases_its_reservation(tmp_path):
+    def loader(path):
+        raise RuntimeError("corrupt weights")
+
+    pool = ModelPool(loader, budget_bytes=10_000)
+    with pytest.raises(RuntimeError):
+        pool.get("a", model_dir(tmp_path, "a", 1000))
+    assert pool.reserved_bytes == 0
+    assert not pool.is_loaded("a")
+
+
+def test_external_reservation_counts_against_the_budget(tmp_path):
+    pool = ModelPool(lambda path: object(), budget_bytes=2500)
+    pool.get("a", model_dir(tmp_path, "a", 1000))
+    pool.reserve("workers", 2000)
+    assert not pool.is_loaded("a")
+    pool.release("workers")
+    assert pool.reserved_bytes == 0
+
+
+def test_latency_tracker_groups_keys():
+    tracker = LatencyTracker()
+    tracker.record("pro_lite", 1.0, 2.0)
+    tracker.record("pro_pro", 3.0, 2.0)
+    stats = tracker.stats(group=lambda key: key.split("_")[1])
+    assert stats["lite"]["requests"] == 1
+    assert stats["pro"]["real_time_factor"] == 1.5
+
+
+def test_budget_from_env_falls_back_on_bad_values():
+    assert budget_from_env("1.5", 8) == int(1.5 * 1024 ** 3)
+    assert budget_from_env("lots", 8) == 8 * 1024 ** 3
@@ -0,0 +1,66 @@
+import numpy as np
+
+from prompt_cache import PromptFeatureCache
+
+
+def features(value=1.0):
+    return {"speaker_embedding": np.full(4, value, dtype=np.float32), "ref_audio": np.zeros(100, dtype=np.float32)}
+
+
+def test_features_are_computed_once_and_persisted(tmp_path):
+    (tmp_path / "voice").mkdir()
+    calls = []
+    cache = PromptFeatureCache(tmp_path)
+    compute = lambda: calls.append(1) or features(2.0)
+    cache.get_or_compute("voice", "base_lite", compute)
+    cache.get_or_compute("voice", "base_lite", compute)
+    assert calls == [1]
+    assert (tmp_path / "voice" / "features_base_lite.npz").exists()
+
+
+def test_persisted_features_survive_a_restart(tmp_path):
+    (tmp_path / "voice").mkdir()
+    PromptFeatureCache(tmp_path).put("voice", "base_lite", features(3.0))
+    restarted = PromptFeatureCache(tmp_path)
+    loaded = restarted.get("voice", "base_lite")
+    np.testing.assert_array_equal(loaded["speaker_embedding"], features(3.0)["speaker_embedding"])
+    assert restarted.stats()["disk_hits"] == 1
+    assert restarted.get("voice", "base_pro") is None
+
+
+def test_features_of_deleted_prompts_stay_in_memory_only(tmp_path):
+    cache = PromptFeatureCache(tmp_path)
+    cache.put("gone", "base_lite", features())
+    assert cache.get("gone", "base_lite") is not None
+    assert not (tmp_path / "gone").exists()
+
+
+def test_unreadable_file_is_treated_as_a_miss(tmp_path):
+    (tmp_path / "voice").mkdir()
+    (tmp_path / "voice" / "features_base_lite.npz").write_bytes(b"corrupt")
+    assert PromptFeatureCache(tmp_path).get("voice", "base_lite") is None
+
+
+def test_lru_stays_within_entry_limit(tmp_path):
+    cache = PromptFeatureCache(tmp_path, max_entries=2)
+    for prompt_id in "abc":
+        cache.put(prompt_id, "base_lite", features(), persist=False)
+    assert cache.stats()["size"] == 2
+    assert cache.get("a", "base_lite") is None
+
+
+def test_invalidate_removes_every_model_variant(tmp_path):
+    (tmp_path / "voice").mkdir()
+    cache = PromptFeatureCache(tmp_path)
+    cache.put("voice", "base_lite", features())
+    cache.put("voice", "base_pro", features())
+    cache.invalidate("voice")
+    assert list((tmp_path / "voice").glob("features_*.npz")) == []
+    assert cache.get("voice", "base_pro") is None
+
+
+def test_generating_with_a_prompt_persists_its_features(client, server, reference):
+    prompt_id = client.post("/api/v1/base/create-prompt", json={"ref_audio_base64": reference}).json()["prompt_id"]
+    response = client.post("/api/v1/base/generate-with-prompt", json={"prompt_id": prompt_id, "text": "Hello"})
+    assert response.status_code == 200
+    assert list((server.SAVED_VOICES_DIR / prompt_id).glob("features_*.npz"))
@@ -0,0 +1,58 @@
+import numpy as np
+
+from result_cache import ResultCache, result_key
+
+
+def key(**overrides):
+    parts = dict(backend="fake", model="m", text="Hello world", seed=1, voice="Vivian", speed=1.0)
+    parts.update(overrides)
+    return result_key(**parts)
+
+
+def test_key_is_stable_across_whitespace_and_unicode_forms():
+    assert key() == key(text="  Hello \n world ")
+    assert key(text="Café") == key(text="Café")
+
+
+def test_key_changes_with_anything_that_changes_the_audio():
+    assert key() != key(seed=2)
+    assert key() != key(voice="Ryan")
+    assert key() != key(text="Hello there")
+
+
+def test_key_does_not_depend_on_argument_order():
+    assert result_key(a=1, b=2) == result_key(b=2, a=1)
+
+
+def test_memory_round_trip_returns_int16(tmp_path):
+    cache = ResultCache(tmp_path)
+    audio = np.linspace(-0.5, 0.5, 2400, dtype=np.float32)
+    cache.put("k" * 64, audio, 24000)
+    pcm, sr = cache.get("k" * 64)
+    assert sr == 24000
+    assert pcm.dtype == np.int16
+    assert len(pcm) == len(audio)
+
+
+def test_disk_round_trip_survives_a_new_cache(tmp_path):
+    audio = (np.sin(np.arange(4800) / 7) * 0.3).astype(np.float32)
+    ResultCache(tmp_path).put("a" * 64, audio, 24000)
+
+    reopened = ResultCache(tmp_path)
+    pcm, sr = reopened.get("a" * 64)
+    expected = (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+    assert sr == 24000
+    assert np.array_equal(pcm, expected)
+    assert reopened.stats()["disk_hits"] == 1
+    assert reopened.get("b" * 64) is None
+
+
+def test_disk_tier_evicts_oldest_past_its_limit(tmp_path):
+    cache = ResultCache(tmp_path, max_disk_bytes=15000)
+    audio = np.zeros(2400, dtype=np.float32)  # 4.8 kB per WAV
+    for name in "abcd":
+        cache.put(name * 64, audio, 24000)
+    stats = cache.stats()
+    assert stats["disk_bytes"] <= 15000
+    assert not (tmp_path / "aa" / f"{'a' * 64}.wav").exists()
+    assert (tmp_path / "dd" / f"{'d' * 64}.wav").exists()
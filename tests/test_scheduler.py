@@ -0,0 +1,137 @@
+import threading
+import time
+import contextvars
+
+import pytest
+
+from scheduler import DeadlineExceeded, InferenceScheduler, QueueFull, for_each_job, run_in_job
+
+request_name = contextvars.ContextVar("request_name", default=None)
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = InferenceScheduler(max_queue=4)
+    yield scheduler
+    scheduler.stop(timeout=2)
+
+
+def block_worker(scheduler):
+    """Occupy the worker until the returned event is set."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    scheduler.submit(hold)
+    assert started.wait(2)
+    return release
+
+
+def test_interactive_jobs_run_before_queued_batch_jobs(scheduler):
+    release = block_worker(scheduler)
+    order = []
+    batch = scheduler.submit(order.append, "batch", priority="batch")
+    interactive = scheduler.submit(order.append, "interactive", priority="interactive")
+    release.set()
+    batch.future.result(2)
+    interactive.future.result(2)
+    assert order == ["interactive", "batch"]
+
+
+def test_job_whose_deadline_passes_while_queued_is_dropped(scheduler):
+    release = block_worker(scheduler)
+    ran = []
+    job = scheduler.submit(ran.append, 1, timeout=0.05)
+    time.sleep(0.1)
+    release.set()
+    with pytest.raises(DeadlineExceeded):
+        job.future.result(2)
+    assert ran == []
+    assert scheduler.expired == 1
+
+
+def test_call_gives_up_at_its_deadline(scheduler):
+    release = block_worker(scheduler)
+    try:
+        with pytest.raises(DeadlineExceeded):
+            scheduler.call(lambda: None, timeout=0.2)
+    finally:
+        release.set()
+
+
+def test_full_queue_rejects_with_retry_after(scheduler):
+    release = block_worker(scheduler)
+    try:
+        for _ in range(scheduler.max_queue):
+            scheduler.submit(lambda: None)
+        with pytest.raises(QueueFull) as excinfo:
+            scheduler.submit(lambda: None)
+        assert excinfo.value.retry_after >= 1
+        assert scheduler.rejected == 1
+    finally:
+        release.set()
+
+
+def test_batch_jobs_only_use_their_share_of_the_queue(scheduler):
+    release = block_worker(scheduler)
+    try:
+        for _ in range(scheduler.batch_queue_limit):
+            scheduler.submit(lambda: None, priority="batch")
+        with pytest.raises(QueueFull):
+            scheduler.check_capacity("batch")
+        scheduler.check_capacity("interactive")
+    finally:
+        release.set()
+
+
+def submit_batch(scheduler, fn, items):
+    """Queue items as batchable jobs while the worker is busy, so they run as one batch."""
+    release = block_worker(scheduler)
+    jobs = []
+    for item in items:
+        request_name.set(item)  # each job captures its own context
+        jobs.append(scheduler.submit(fn, item, batch_key="same"))
+    release.set()
+    return [job.future.result(2) for job in jobs]
+
+
+def test_jobs_with_the_same_key_run_as_one_batch():
+    scheduler = InferenceScheduler(max_batch_size=4, max_batch_wait=0.05)
+    calls = []
+    try:
+        results = submit_batch(scheduler, lambda items: calls.append(items) or [item * 2 for item in items], [1, 2, 3])
+    finally:
+        scheduler.stop(timeout=2)
+    assert calls == [[1, 2, 3]]
+    assert results == [2, 4, 6]
+
+
+def test_batch_bookkeeping_reaches_every_job_context():
+    scheduler = InferenceScheduler(max_batch_size=4, max_batch_wait=0.05)
+    seen_by_all, seen_by_index = [], []
+
+    def run(items):
+        for_each_job(lambda: seen_by_all.append(request_name.get()))
+        for index in range(len(items)):
+            run_in_job(index, lambda: seen_by_index.append(request_name.get()))
+        return items
+
+    try:
+        submit_batch(scheduler, run, ["a", "b", "c"])
+    finally:
+        scheduler.stop(timeout=2)
+    assert seen_by_all == ["a", "b", "c"]
+    assert seen_by_index == ["a", "b", "c"]
+
+
+def test_full_queue_maps_to_429(server, client, monkeypatch):
+    def full(priority):
+        raise QueueFull("Inference queue is full (4 waiting)", retry_after=3)
+
+    monkeypatch.setattr(server.scheduler, "_admit", full)
+    response = client.post("/api/v1/custom-voice/generate", json={"text": "Hello"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "3"
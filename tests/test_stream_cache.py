@@ -0,0 +1,41 @@
+import json
+
+SENTENCES = ["The first sentence is here.", "Then a second one follows.", "And the third closes it."]
+
+
+def chunk_events(client, reference, text, seed=21, **fields):
+    body = {"ref_audio_base64": reference, "text": text, "seed": seed, "chunk_size": 30, **fields}
+    response = client.post("/api/v1/base/clone/stream", json=body)
+    assert response.status_code == 200
+    events = [json.loads(line[6:]) for line in response.text.splitlines() if line.startswith("data: ")]
+    return [event for event in events if event["type"] == "chunk"]
+
+
+def test_restreamed_text_comes_from_the_cache(client, reference):
+    text = " ".join(SENTENCES)
+    first = chunk_events(client, reference, text)
+    second = chunk_events(client, reference, text)
+    assert len(first) == 3
+    assert not any(chunk.get("cached") for chunk in first)
+    assert all(chunk.get("cached") for chunk in second)
+    assert [chunk["audio"] for chunk in second] == [chunk["audio"] for chunk in first]
+
+
+def test_only_edited_chunks_are_generated(client, reference):
+    chunk_events(client, reference, " ".join(SENTENCES), seed=22)
+    edited = chunk_events(client, reference, " ".join([SENTENCES[0], "A new middle sentence.", SENTENCES[2]]), seed=22)
+    assert [bool(chunk.get("cached")) for chunk in edited] == [True, False, True]
+
+
+def test_unseeded_streams_are_not_cached(client, reference):
+    text = " ".join(SENTENCES)
+    chunk_events(client, reference, text, seed=None)
+    assert not any(chunk.get("cached") for chunk in chunk_events(client, reference, text, seed=None))
+
+
+def test_incremental_streams_share_chunked_cache_entries(client, reference):
+    text = " ".join(SENTENCES)
+    chunked = chunk_events(client, reference, text, seed=23)
+    incremental = chunk_events(client, reference, text, seed=23, incremental=True)
+    assert all(chunk.get("cached") for chunk in incremental)
+    assert [chunk["audio"] for chunk in incremental] == [chunk["audio"] for chunk in chunked]
@@ -0,0 +1,37 @@
+import pytest
+
+TEXT = "Hello there. This is a longer text that is split into a few chunks. And one more sentence."
+
+
+def clone_stream(client, reference, **fields):
+    body = dict(ref_audio_base64=reference, text=TEXT, seed=3, chunk_size=60, transport="pcm", **fields)
+    response = client.post("/api/v1/base/clone/stream", json=body)
+    assert response.status_code == 200
+    return response.content
+
+
+@pytest.mark.parametrize("segment_seconds", [0.1, 0.25])
+def test_incremental_stream_matches_chunked_stream(client, reference, segment_seconds):
+    chunked = clone_stream(client, reference)
+    incremental = clone_stream(client, reference, incremental=True, segment_seconds=segment_seconds)
+    assert len(incremental) == len(chunked)
+    assert incremental == chunked
+
+
+def test_raw_pcm_stream_is_aborted_on_error(client):
+    from streaming import StreamFailed
+
+    with pytest.raises(StreamFailed):
+        client.post("/api/v1/base/generate-with-prompt/stream",
+                    json={"prompt_id": "missing", "text": "Hi", "transport": "pcm"})
+
+
+def test_encoded_transport_rejected_for_raw_pcm(client, reference):
+    response = client.post("/api/v1/base/clone/stream",
+                           json={"ref_audio_base64": reference, "text": "Hi", "transport": "pcm", "audio_format": "opus"})
+    assert response.status_code == 400
+
+
+def test_unknown_response_format_is_rejected(client):
+    response = client.post("/api/v1/custom-voice/generate", json={"text": "Hello", "response_format": "ogg"})
+    assert response.status_code == 400
@@ -0,0 +1,24 @@
+import pytest
+from fastapi import HTTPException
+
+
+def test_default_prefers_lite(server):
+    assert server.resolve_model_key("base") == "base_lite"
+
+
+def test_requested_tier_is_used(server):
+    assert server.resolve_model_key("base", "pro") == "base_pro"
+    assert server.model_tier("base_pro") == "pro"
+
+
+def test_unknown_tier_is_rejected(server):
+    with pytest.raises(HTTPException) as info:
+        server.resolve_model_key("base", "huge")
+    assert info.value.status_code == 400
+
+
+def test_generation_uses_the_requested_tier(client, server):
+    response = client.post("/api/v1/custom-voice/generate", json={"text": "Hello", "model_size": "pro"})
+    assert response.status_code == 200
+    assert server.model_pool.is_loaded("custom_voice_pro")
+    assert "pro" in client.get("/health/models").json()["latency"]["by_tier"]
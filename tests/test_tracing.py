@@ -0,0 +1,81 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import tracing
+from tracing import TracingMiddleware, parse_traceparent, record_span, span
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+def test_valid_traceparent_is_continued():
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID)
+
+
+@pytest.mark.parametrize("value", [
+    None,
+    "",
+    f"00-{TRACE_ID}-{PARENT_ID}",
+    f"00-{TRACE_ID.upper()}-{PARENT_ID}-01",
+    f"00-{'0' * 32}-{PARENT_ID}-01",
+    f"00-{TRACE_ID}-{'0' * 16}-01",
+    "00-../../../../../../../tmp/pwned_x-0123456789abcdef-01",
+    f"00-{TRACE_ID[:-1]}/-{PARENT_ID}-01",
+])
+def test_malformed_traceparent_is_rejected(value):
+    assert parse_traceparent(value) == (None, None)
+
+
+def test_spans_nest_under_the_current_trace():
+    with span("outer") as outer:
+        with span("inner") as inner:
+            assert inner.trace_id == outer.trace_id
+            assert inner.parent_id == outer.span_id
+
+
+def test_recorded_span_keeps_its_timing_and_parent(monkeypatch):
+    exported = []
+    monkeypatch.setattr(tracing.exporter, "file_path", "unused")
+    monkeypatch.setattr(tracing.exporter, "add", exported.append)
+    with span("request") as request:
+        record_span("inference", 1_000, 5_000)
+    assert [s.name for s in exported] == ["inference", "request"]
+    assert exported[0].parent_id == request.span_id
+    assert (exported[0].start_ns, exported[0].end_ns) == (1_000, 5_000)
+
+
+@pytest.fixture
+def profiled(tmp_path):
+    app = FastAPI()
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    profile_dir = tmp_path / "profiles"
+    app.add_middleware(TracingMiddleware, endpoint_for=lambda scope: scope["path"], profile_dir=profile_dir,
+                       allow_profiling=True, keep_profiles=2)
+    return TestClient(app), profile_dir
+
+
+def test_hostile_traceparent_gets_a_fresh_trace_id(profiled, tmp_path):
+    client, profile_dir = profiled
+    hostile = f"00-../../../../{tmp_path.name}/pwned_x-0123456789abcdef-01"
+    response = client.get("/ping?profile=1", headers={"traceparent": hostile})
+    trace_id = response.headers["x-trace-id"]
+    assert len(trace_id) == 32 and int(trace_id, 16)
+    assert [p.name for p in profile_dir.iterdir()] == [f"{trace_id}.folded"]
+    assert not list(tmp_path.glob("pwned_x*"))
+
+
+def test_profiles_are_opt_in_and_capped(profiled):
+    client, profile_dir = profiled
+    assert "x-profile-id" not in client.get("/ping").headers
+    for _ in range(4):
+        assert "x-profile-id" in client.get("/ping", headers={"X-Profile": "1"}).headers
+    assert len(list(profile_dir.glob("*.folded"))) == 2
+
+
+def test_profiling_is_off_by_default(client):
+    assert "x-profile-id" not in client.get("/health?profile=1").headers
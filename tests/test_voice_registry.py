@@ -0,0 +1,83 @@
+import json
+import threading
+
+import pytest
+
+from voice_registry import VoiceRegistry
+
+WAV_HEADER = b"RIFF\0\0\0\0WAVE"
+
+
+def save_voice(root, prompt_id, audio=WAV_HEADER + b"data", **metadata):
+    voice_dir = root / prompt_id
+    voice_dir.mkdir(parents=True)
+    (voice_dir / "metadata.json").write_text(json.dumps({"name": prompt_id, **metadata}))
+    (voice_dir / "audio.wav").write_bytes(audio)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return VoiceRegistry(tmp_path, convert_audio=lambda data: WAV_HEADER + b"converted")
+
+
+def test_load_indexes_metadata_and_skips_incomplete_voices(registry, tmp_path):
+    save_voice(tmp_path, "a", ref_text="Hello")
+    save_voice(tmp_path, "b")
+    (tmp_path / "b" / "audio.wav").unlink()
+    assert registry.load() == 1
+    assert registry.get("a") == {"ref_text": "Hello", "name": "a", "x_vector_only_mode": False}
+    assert "b" not in registry
+
+
+def test_audio_is_read_from_disk_on_demand_and_cached(registry, tmp_path):
+    save_voice(tmp_path, "a", audio=WAV_HEADER + b"first")
+    registry.load()
+    assert registry.audio_bytes("a") == WAV_HEADER + b"first"
+    (tmp_path / "a" / "audio.wav").write_bytes(WAV_HEADER + b"second")
+    assert registry.audio_bytes("a") == WAV_HEADER + b"first"
+
+
+def test_audio_cache_stays_within_its_byte_limit(tmp_path):
+    registry = VoiceRegistry(tmp_path, convert_audio=bytes, audio_cache_bytes=40)
+    for prompt_id in "abc":
+        save_voice(tmp_path, prompt_id, audio=WAV_HEADER + prompt_id.encode() * 10)
+        registry.audio_bytes(prompt_id)
+    assert registry._audio_cache_size <= 40
+    assert list(registry._audio_cache) == ["c"]
+
+
+def test_legacy_audio_is_converted_on_first_use(registry, tmp_path):
+    save_voice(tmp_path, "old", audio=b"ID3 mp3 bytes")
+    registry.load()
+    path = registry.audio_path("old")
+    assert path.read_bytes() == WAV_HEADER + b"converted"
+
+
+def test_add_and_delete_round_trip(registry, tmp_path):
+    registry.load()
+    registry.add("new", name="New", ref_text=None, x_vector_only_mode=True, audio_bytes=b"raw")
+    assert (tmp_path / "new" / "audio.wav").read_bytes() == WAV_HEADER + b"converted"
+    assert VoiceRegistry(tmp_path, convert_audio=bytes).load() == 1
+    assert registry.delete("new")
+    assert not (tmp_path / "new").exists()
+    assert not registry.delete("new")
+
+
+def test_index_is_built_on_first_use(registry, tmp_path):
+    save_voice(tmp_path, "a")
+    assert not registry.loaded
+    assert len(registry) == 1
+    assert registry.loaded
+
+
+def test_concurrent_first_use_scans_once(registry, tmp_path, monkeypatch):
+    save_voice(tmp_path, "a")
+    scans = []
+    load = registry.load
+    monkeypatch.setattr(registry, "load", lambda: scans.append(1) or load())
+    threads = [threading.Thread(target=registry.get, args=("a",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert scans == [1]
@@ -0,0 +1,44 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from warmup import Warmup
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def wait_finished(warmup, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not warmup.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert warmup.finished
+
+
+def test_steps_run_in_order_and_a_failure_does_not_stop_the_rest():
+    order = []
+    warmup = Warmup()
+    warmup.add("first", lambda: order.append("first"))
+    warmup.add("broken", lambda: 1 / 0)
+    warmup.add("last", lambda: order.append("last"))
+    assert warmup.stats()["state"] == "pending"
+    warmup.start()
+    wait_finished(warmup)
+    stats = warmup.stats()
+    assert order == ["first", "last"]
+    assert stats["state"] == "failed"
+    assert [step["state"] for step in stats["steps"]] == ["done", "failed", "done"]
+    assert "division by zero" in stats["steps"][1]["error"]
+
+
+def test_importing_the_server_does_no_start_up_work():
+    code = "import server; print(server.voice_registry.loaded, server.warmup.stats()['state'])"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.stdout.split()[-2:] == ["False", "pending"]
+
+
+def test_ready_once_warm_up_has_finished(client, server):
+    wait_finished(server.warmup, timeout=5)
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
@@ -0,0 +1,370 @@
+"""
+Qwen3-TTS Request Tracing and Profiling
+Every HTTP request gets a trace id (continuing an incoming W3C traceparent)
+and spans around the steps of the generation pipeline. The current span is a
+contextvar, so spans opened on the scheduler worker or stream threads nest
+under the request that caused them. Finished spans are exported as
+OpenTelemetry (OTLP/JSON) to a local file or to a collector.
+
+A request can also opt in to a sampling profiler (?profile=1 or the
+X-Profile header). It samples the stacks of threads working on that request
+and stores them as folded stacks, ready for flamegraph.pl or speedscope.
+"""
+import os
+import re
+import sys
+import json
+import time
+import queue
+import logging
+import secrets
+import threading
+import contextvars
+import urllib.request
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "qwen3-tts"
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Optional[dict] = None,
+                 kind: int = 1):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.kind = kind  # OTLP SpanKind: 1 internal, 2 server
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class SpanExporter:
+    """Batches finished spans and writes them as OTLP/JSON.
+
+    With a file path each flush appends one ExportTraceServiceRequest per
+    line; with an endpoint (e.g. http://localhost:4318/v1/traces) it POSTs
+    the same payload to an OTLP/HTTP collector.
+    """
+
+    def __init__(self, file_path: Optional[str] = None, endpoint: Optional[str] = None,
+                 flush_interval: float = 2.0, max_queue: int = 10000):
+        self.file_path = Path(file_path) if file_path else None
+        self.endpoint = endpoint
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.exported = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.file_path is not None or bool(self.endpoint)
+
+    def start(self):
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def add(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        spans: List[Span] = []
+        while True:
+            try:
+                spans.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not spans:
+            return
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{"scope": {"name": "qwen3-tts.server"}, "spans": [s.to_otlp() for s in spans]}],
+            }]
+        }
+        data = json.dumps(payload)
+        try:
+            if self.file_path is not None:
+                self.file_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.file_path, "a", encoding="utf-8") as f:
+                    f.write(data + "\n")
+            if self.endpoint:
+                request = urllib.request.Request(self.endpoint, data=data.encode("utf-8"),
+                                                 headers={"Content-Type": "application/json"})
+                urllib.request.urlopen(request, timeout=5).close()
+            self.exported += len(spans)
+        except Exception as e:
+            self.dropped += len(spans)
+            logger.warning(f"Could not export {len(spans)} spans: {e}")
+
+
+exporter = SpanExporter(
+    file_path=os.environ.get("QWEN_TTS_TRACE_FILE") or None,
+    endpoint=os.environ.get("QWEN_TTS_TRACE_ENDPOINT") or None,
+)
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("qwen_tts_span", default=None)
+
+# Traces each thread is currently working on, for the profiler: thread id -> {trace id: open spans}
+_thread_traces: Dict[int, Dict[str, int]] = {}
+_thread_lock = threading.Lock()
+
+
+def _enter_thread(trace_id: str):
+    ident = threading.get_ident()
+    with _thread_lock:
+        traces = _thread_traces.setdefault(ident, {})
+        traces[trace_id] = traces.get(trace_id, 0) + 1
+
+
+def _exit_thread(trace_id: str):
+    ident = threading.get_ident()
+    with _thread_lock:
+        traces = _thread_traces.get(ident, {})
+        if traces.get(trace_id, 0) <= 1:
+            traces.pop(trace_id, None)
+            if not traces:
+                _thread_traces.pop(ident, None)
+        else:
+            traces[trace_id] -= 1
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current.get()
+    return span.trace_id if span is not None else None
+
+
+@contextmanager
+def span(name: str, kind: int = 1, trace_id: Optional[str] = None, parent_id: Optional[str] = None, **attributes):
+    """Open a span under the current one (or start a trace) for the duration of the block."""
+    parent = _current.get()
+    if parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    elif trace_id is None:
+        trace_id = secrets.token_hex(16)
+    current = Span(name, trace_id, parent_id, attributes, kind)
+    token = _current.set(current)
+    _enter_thread(trace_id)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _exit_thread(trace_id)
+        _current.reset(token)
+        if exporter.enabled:
+            exporter.add(current)
+
+
+def record_span(name: str, start_ns: int, end_ns: int, **attributes):
+    """Add a finished span timed elsewhere under the current one (or as a new trace)."""
+    parent = _current.get()
+    if parent is not None:
+        current = Span(name, parent.trace_id, parent.span_id, attributes)
+    else:
+        current = Span(name, secrets.token_hex(16), None, attributes)
+    current.start_ns, current.end_ns = start_ns, end_ns
+    if exporter.enabled:
+        exporter.add(current)
+
+
+TRACEPARENT = re.compile(r"[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}")
+
+
+def parse_traceparent(value: Optional[str]):
+    """(trace id, parent span id) from a W3C traceparent header, or (None, None).
+
+    Anything but lowercase hex ids is rejected, so a client-supplied trace id
+    is always safe to use in file names; the caller then mints a fresh one.
+    """
+    match = TRACEPARENT.fullmatch(value.strip()) if value else None
+    if match is None:
+        return None, None
+    trace_id, parent_id = match.groups()
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None, None
+    return trace_id, parent_id
+
+
+class SamplingProfiler:
+    """Samples the stacks of threads working on one trace at a fixed interval.
+
+    Stacks are aggregated as folded lines ("outer;inner;leaf count").
+    """
+
+    def __init__(self, trace_id: str, interval: float = 0.005, max_depth: int = 128):
+        self.trace_id = trace_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{trace_id[:8]}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            with _thread_lock:
+                threads = [ident for ident, traces in _thread_traces.items() if self.trace_id in traces]
+            frames = sys._current_frames()
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is None or ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class TracingMiddleware:
+    """ASGI middleware that opens the root span of each HTTP request and runs opt-in profiles.
+
+    The trace id is returned in the X-Trace-Id header. A profiled request
+    also gets X-Profile-Id; its folded stacks are stored in profile_dir,
+    which keeps only the newest ``keep_profiles`` files.
+    """
+
+    def __init__(self, app, endpoint_for, profile_dir: Path, allow_profiling: bool = False,
+                 profile_interval: float = 0.005, max_profiles: int = 2, keep_profiles: int = 100):
+        self.app = app
+        self.endpoint_for = endpoint_for
+        self.profile_dir = Path(profile_dir)
+        self.allow_profiling = allow_profiling
+        self.profile_interval = profile_interval
+        self._profiles = threading.BoundedSemaphore(max_profiles)
+        self.keep_profiles = keep_profiles
+
+    def _wants_profile(self, scope) -> bool:
+        if not self.allow_profiling:
+            return False
+        query = scope.get("query_string", b"").decode("latin-1")
+        if any(part in ("profile=1", "profile=true") for part in query.split("&")):
+            return True
+        headers = dict(scope.get("headers") or [])
+        return headers.get(b"x-profile", b"").lower() in (b"1", b"true")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        trace_id, parent_id = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        endpoint = self.endpoint_for(scope)
+        with span(f"{scope['method']} {endpoint}", kind=2, trace_id=trace_id, parent_id=parent_id,
+                  **{"http.method": scope["method"], "http.route": endpoint, "http.target": scope["path"]}) as root:
+            profiler = None
+            if self._wants_profile(scope) and self._profiles.acquire(blocking=False):
+                profiler = SamplingProfiler(root.trace_id, interval=self.profile_interval)
+                profiler.start()
+            extra = [(b"x-trace-id", root.trace_id.encode()),
+                     (b"traceparent", f"00-{root.trace_id}-{root.span_id}-01".encode())]
+            if profiler is not None:
+                extra.append((b"x-profile-id", root.trace_id.encode()))
+
+            async def traced_send(message):
+                if message["type"] == "http.response.start":
+                    root.set(**{"http.status_code": message["status"]})
+                    message = dict(message, headers=list(message.get("headers", [])) + extra)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, traced_send)
+            finally:
+                if profiler is not None:
+                    profiler.stop()
+                    self._profiles.release()
+                    # File I/O stays off the event loop
+                    await run_in_threadpool(self._save_profile, root.trace_id, profiler)
+
+    def _save_profile(self, trace_id: str, profiler: SamplingProfiler):
+        try:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            (self.profile_dir / f"{trace_id}.folded").write_text(profiler.folded(), encoding="utf-8")
+            logger.info(f"Stored profile {trace_id} ({sum(profiler.samples.values())} samples)")
+            self._prune_profiles()
+        except OSError as e:
+            logger.warning(f"Could not store profile {trace_id}: {e}")
+
+    def _prune_profiles(self):
+        """Remove the oldest stored profiles beyond keep_profiles."""
+        profiles = []
+        for path in self.profile_dir.glob("*.folded"):
+            try:
+                profiles.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        profiles.sort()
+        for _, path in profiles[:max(0, len(profiles) - self.keep_profiles)]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
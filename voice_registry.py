@@ -0,0 +1,158 @@
+"""
+Qwen3-TTS Voice Registry
+Index of saved voice prompts under voices/saved/<id>/. Only the metadata is
+held in memory; reference audio is read from disk on demand through a small
+byte cache, so large voice libraries load instantly and use little RAM. The
+index itself is built on first use (or by a background warm-up), not at import.
+"""
+import json
+import shutil
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class VoiceRegistry:
+    """Saved voice prompts: metadata in memory, audio files read lazily."""
+
+    def __init__(self, root_dir: Path, convert_audio: Callable[[bytes], bytes],
+                 audio_cache_bytes: int = 32 * 1024 ** 2):
+        self.root_dir = Path(root_dir)
+        self.convert_audio = convert_audio
+        self.audio_cache_bytes = audio_cache_bytes
+        self._voices: Dict[str, dict] = {}
+        self._audio_cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._audio_cache_size = 0
+        self._verified = set()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loaded = False
+
+    def load(self) -> int:
+        """Index saved voices from their metadata files."""
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+
+        voices = {}
+        for voice_dir in self.root_dir.iterdir():
+            metadata_file = voice_dir / "metadata.json"
+            if not (metadata_file.exists() and (voice_dir / "audio.wav").exists()):
+                continue
+            try:
+                with open(metadata_file, "r") as f:
+                    metadata = json.load(f)
+            except Exception as e:
+                logger.error(f"Error loading voice {voice_dir.name}: {e}")
+                continue
+
+            prompt_id = voice_dir.name
+            voices[prompt_id] = {
+                "ref_text": metadata.get("ref_text"),
+                "name": metadata.get("name", f"Voice_{prompt_id[:8]}"),
+                "x_vector_only_mode": metadata.get("x_vector_only_mode", False),
+            }
+
+        with self._lock:
+            self._voices = voices
+            self.loaded = True
+        logger.info(f"Indexed {len(voices)} saved voice prompts")
+        return len(voices)
+
+    def ensure_loaded(self):
+        """Index saved voices unless that already happened; concurrent callers wait for one scan."""
+        if self.loaded:
+            return
+        with self._load_lock:
+            if not self.loaded:
+                self.load()
+
+    def __contains__(self, prompt_id: str) -> bool:
+        self.ensure_loaded()
+        return prompt_id in self._voices
+
+    def __len__(self) -> int:
+        self.ensure_loaded()
+        return len(self._voices)
+
+    def get(self, prompt_id: str) -> Optional[dict]:
+        self.ensure_loaded()
+        return self._voices.get(prompt_id)
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        self.ensure_loaded()
+        return iter(list(self._voices.items()))
+
+    def audio_path(self, prompt_id: str) -> Path:
+        """Path of the prompt's reference WAV, converting legacy non-WAV files on first use."""
+        path = self.root_dir / prompt_id / "audio.wav"
+        if prompt_id not in self._verified:
+            with open(path, "rb") as f:
+                header = f.read(12)
+            if not (header[:4] == b'RIFF' and header[8:12] == b'WAVE'):
+                wav_bytes = self.convert_audio(path.read_bytes())
+                path.write_bytes(wav_bytes)
+                logger.info(f"Converted {prompt_id}/audio.wav to proper WAV format")
+            self._verified.add(prompt_id)
+        return path
+
+    def audio_bytes(self, prompt_id: str) -> bytes:
+        """Reference WAV bytes, served from a small LRU byte cache."""
+        with self._lock:
+            if prompt_id in self._audio_cache:
+                self._audio_cache.move_to_end(prompt_id)
+                return self._audio_cache[prompt_id]
+
+        data = self.audio_path(prompt_id).read_bytes()
+        if len(data) <= self.audio_cache_bytes:
+            with self._lock:
+                if prompt_id not in self._audio_cache:
+                    self._audio_cache[prompt_id] = data
+                    self._audio_cache_size += len(data)
+                while self._audio_cache_size > self.audio_cache_bytes:
+                    _, evicted = self._audio_cache.popitem(last=False)
+                    self._audio_cache_size -= len(evicted)
+        return data
+
+    def add(self, prompt_id: str, name: str, ref_text: Optional[str], x_vector_only_mode: bool,
+            audio_bytes: bytes) -> dict:
+        """Persist a new voice prompt and index it."""
+        self.ensure_loaded()
+        voice_dir = self.root_dir / prompt_id
+        voice_dir.mkdir(parents=True, exist_ok=True)
+
+        metadata = {
+            "name": name,
+            "ref_text": ref_text,
+            "x_vector_only_mode": x_vector_only_mode,
+        }
+        with open(voice_dir / "metadata.json", "w") as f:
+            json.dump(metadata, f, indent=2)
+
+        # Save audio as WAV file (convert if needed)
+        with open(voice_dir / "audio.wav", "wb") as f:
+            f.write(self.convert_audio(audio_bytes))
+
+        with self._lock:
+            self._voices[prompt_id] = metadata
+            self._verified.add(prompt_id)
+        logger.info(f"Saved voice {prompt_id} to disk")
+        return metadata
+
+    def delete(self, prompt_id: str) -> bool:
+        """Remove a voice prompt from the index and from disk."""
+        self.ensure_loaded()
+        with self._lock:
+            existed = self._voices.pop(prompt_id, None) is not None
+            cached = self._audio_cache.pop(prompt_id, None)
+            if cached is not None:
+                self._audio_cache_size -= len(cached)
+            self._verified.discard(prompt_id)
+
+        voice_dir = self.root_dir / prompt_id
+        if voice_dir.exists():
+            shutil.rmtree(voice_dir)
+            logger.info(f"Deleted voice {prompt_id} from disk")
+        return existed
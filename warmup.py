@@ -0,0 +1,91 @@
+"""
+Qwen3-TTS Start-up Warm-up
+Runs slow start-up work (indexing saved voices, loading models, a first
+generation that compiles Metal kernels) on a background thread after the
+server has bound its port. Each step's state and duration are kept so a
+readiness probe can report progress.
+"""
+import time
+import logging
+import threading
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupStep:
+    def __init__(self, name: str, fn: Callable[[], None]):
+        self.name = name
+        self.fn = fn
+        self.state = "pending"  # pending, running, done, failed
+        self.seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        step = {"name": self.name, "state": self.state}
+        if self.seconds is not None:
+            step["seconds"] = round(self.seconds, 3)
+        if self.error:
+            step["error"] = self.error
+        return step
+
+
+class Warmup:
+    """Named steps run in order on one daemon thread.
+
+    A failed step is logged and recorded but does not stop later steps; the
+    server can still serve requests, the first one for that model is just cold.
+    """
+
+    def __init__(self):
+        self.steps: List[WarmupStep] = []
+        self._thread: Optional[threading.Thread] = None
+        self._done = threading.Event()
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    def add(self, name: str, fn: Callable[[], None]):
+        self.steps.append(WarmupStep(name, fn))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for step in self.steps:
+            step.state = "running"
+            start = time.perf_counter()
+            try:
+                step.fn()
+                step.state = "done"
+            except Exception as e:
+                step.state = "failed"
+                step.error = str(e)
+                logger.warning(f"Warm-up step {step.name} failed: {e}")
+            step.seconds = time.perf_counter() - start
+            logger.info(f"Warm-up step {step.name}: {step.state} in {step.seconds:.2f}s")
+        self._finished_at = time.perf_counter()
+        self._done.set()
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def stats(self) -> dict:
+        if self._thread is None:
+            state = "pending"
+        elif self.finished:
+            state = "failed" if any(s.state == "failed" for s in self.steps) else "done"
+        else:
+            state = "running"
+        elapsed = None
+        if self._started_at is not None:
+            elapsed = (self._finished_at or time.perf_counter()) - self._started_at
+        return {
+            "state": state,
+            "elapsed_seconds": round(elapsed, 3) if elapsed is not None else None,
+            "steps": [s.to_dict() for s in self.steps],
+        }
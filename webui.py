@@ -6,7 +6,6 @@ import os
 import sys
 import shutil
 import time
-import gc
 import re
 import warnings
 from datetime import datetime
@@ -26,6 +25,8 @@ except ImportError:
     print("Please run the install script first.")
     sys.exit(1)
 
+from model_pool import ModelPool, budget_from_env
+
 # Configuration
 BASE_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "outputs")
 MODELS_DIR = os.path.join(os.path.dirname(__file__), "models")
@@ -72,8 +73,8 @@ SPEED_OPTIONS = {
     "Fast (1.3x)": 1.3
 }
 
-# Global model cache
-loaded_models = {}
+# Global model cache (least recently used models are evicted over the memory budget)
+model_pool = ModelPool(load_model, budget_from_env(os.environ.get("QWEN_TTS_MODEL_BUDGET_GB"), 8.0))
 
 
 def get_model_path(folder_name):
@@ -93,24 +94,13 @@ def get_model_path(folder_name):
 
 def load_cached_model(model_key):
     """Load model with caching to avoid reloading."""
-    global loaded_models
-
-    if model_key in loaded_models:
-        return loaded_models[model_key]
-
-    # Clear other models to save memory
-    loaded_models.clear()
-    gc.collect()
-
     model_info = MODELS[model_key]
     model_path = get_model_path(model_info["folder"])
 
     if not model_path:
         raise ValueError(f"Model not found: {model_info['folder']}. Please run the install script.")
 
-    model = load_model(model_path)
-    loaded_models[model_key] = model
-    return model
+    return model_pool.get(model_key, model_path)
 
 
 def generate_custom_voice(text, model_size, speaker, emotion, speed_choice):